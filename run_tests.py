@@ -15,6 +15,24 @@ def main():
         'tests/test_integration.py',
         'tests/test_kbs_editor.py',
         'tests/test_user_interaction.py',
+        'tests/test_catalog_store.py',
+        'tests/test_course_index.py',
+        'tests/test_seat_allocator.py',
+        'tests/test_compiled_catalog.py',
+        'tests/test_sqlite_store.py',
+        'tests/test_scenarios.py',
+        'tests/test_demand_forecast.py',
+        'tests/test_rete_engine.py',
+        'tests/test_course_search.py',
+        'tests/test_shared_catalog.py',
+        'tests/test_prerequisites.py',
+        'tests/test_speculative_advisor.py',
+        'tests/test_paging.py',
+        'tests/test_recommendation_cache.py',
+        'tests/test_ui_benchmark.py',
+        'tests/test_decision_trace.py',
+        'tests/test_transcripts.py',
+        'tests/test_impact.py',
         '-v',
         '--cov=src',
         '--cov-report=term-missing',
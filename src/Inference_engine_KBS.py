@@ -8,20 +8,152 @@ from frozendict_patch import *
 import pandas as pd
 from experta import *
 import re
+from integration.catalog_store import get_store
+from integration.compiled_catalog import CompiledCatalog, semester_bit
+from integration.decision_trace import (ALREADY_PASSED, COREQUISITES, COURSE_SHIFT, CREDIT_LIMIT, PREREQUISITES,
+                                        RETAKE, SELECTED, SEMESTER, get_trace_recorder)
+
+def credit_limit_rules(policies_df):
+    """Parse the "Credit Limit" policies into (predicate on CGPA, max credits) pairs"""
+    credit_policies = policies_df[policies_df["Category"].str.strip() == "Credit Limit"]
+    rules = []
+
+    for _, row in credit_policies.iterrows():
+        condition = str(row["Condition"])
+        max_credit = int(row["max"])
+        match = re.findall(r'(\d+\.\d+)', condition)
+
+        if "≥" in condition or ">=" in condition:
+            rules.append((lambda cgpa, val=float(match[0]): cgpa >= val, max_credit))
+        elif "≤" in condition and len(match) == 2:
+            l, u = float(match[0]), float(match[1])
+            rules.append((lambda cgpa, l=l, u=u: l <= cgpa < u, max_credit))
+        elif "<" in condition:
+            rules.append((lambda cgpa, val=float(match[0]): cgpa < val, max_credit))
+    return rules
+
+
+def credit_limit_for(cgpa, rules):
+    for rule, limit in rules:
+        if rule(cgpa):
+            return limit
+    return 12  # Default fallback
+
+
+def unmet_prerequisites(catalog, passed, course_id):
+    """The prerequisites of ``course_id`` not met by ``passed``, as text"""
+    return catalog.unmet_prerequisites(course_id, passed)
+
+
+def select_courses(catalog, passed, failed, semester, credit_limit, unmet=None, trace=None):
+    """Apply the advising rules to one student.
+
+    ``passed``/``failed`` are membership tables from ``catalog.mark``.
+    ``unmet`` optionally supplies precomputed ``unmet_prerequisites`` lists
+    per course id (see ``integration.scenarios``); otherwise they are computed
+    here. ``trace``, if given, is called with one packed record per decision
+    (see ``integration.decision_trace``). Returns the selected course ids,
+    their total credits and the explanation of every decision.
+    """
+    semester_flag = semester_bit(semester)
+    code_ids, codes = catalog.course_code_ids, catalog.codes
+    credits, semesters = catalog.credits, catalog.semesters
+    prereq_indptr, prereq_indices = catalog.prereq_indptr, catalog.prereq_indices
+    coreq_indptr, coreq_indices = catalog.coreq_indptr, catalog.coreq_indices
+    # Courses with and/or prerequisites; every other course keeps the plain scan
+    requirements = catalog.requirements
+    added = bytearray(len(codes))
+    selected, explanations = [], []
+    total_credits = 0
+
+    # Step 1: Prioritize failed courses
+    for course_id in range(len(catalog)):
+        code_id = code_ids[course_id]
+        if not failed[code_id]:
+            continue
+        code = codes[code_id]
+        if passed[code_id]:
+            explanations.append(f"{code} is not recommended because it was already passed.")
+            if trace is not None:
+                trace(course_id << COURSE_SHIFT | RETAKE | ALREADY_PASSED)
+            continue
+        if not semesters[course_id] & semester_flag:
+            explanations.append(f"{code} is unavailable this semester.")
+            if trace is not None:
+                trace(course_id << COURSE_SHIFT | RETAKE | SEMESTER)
+            continue
+        if unmet is not None:
+            missing = unmet[course_id]
+        elif requirements and course_id in requirements:
+            missing = requirements[course_id].unmet(passed)
+        else:
+            missing = [codes[p] for p in prereq_indices[prereq_indptr[course_id]:prereq_indptr[course_id + 1]] if not passed[p]]
+        if missing:
+            explanations.append(f"{code} is not recommended due to unmet prerequisite(s): {', '.join(missing)}.")
+            if trace is not None:
+                trace(course_id << COURSE_SHIFT | RETAKE | PREREQUISITES)
+            continue
+        if total_credits + credits[course_id] > credit_limit:
+            explanations.append(f"{code} is not added because it would exceed the credit limit.")
+            if trace is not None:
+                trace(course_id << COURSE_SHIFT | RETAKE | CREDIT_LIMIT)
+            continue
+        selected.append(course_id)
+        added[code_id] = 1
+        total_credits += credits[course_id]
+        explanations.append(f"{code} is prioritized because you failed it previously and met its prerequisites.")
+        if trace is not None:
+            trace(course_id << COURSE_SHIFT | RETAKE | SELECTED)
+
+    # Recommend other eligible courses
+    for course_id in range(len(catalog)):
+        code_id = code_ids[course_id]
+        if passed[code_id] or added[code_id]:
+            continue
+        code = codes[code_id]
+        if not semesters[course_id] & semester_flag:
+            explanations.append(f"{code} is not offered in the {semester} semester.")
+            if trace is not None:
+                trace(course_id << COURSE_SHIFT | SEMESTER)
+            continue
+        if unmet is not None:
+            missing = unmet[course_id]
+        elif requirements and course_id in requirements:
+            missing = requirements[course_id].unmet(passed)
+        else:
+            missing = [codes[p] for p in prereq_indices[prereq_indptr[course_id]:prereq_indptr[course_id + 1]] if not passed[p]]
+        if missing:
+            explanations.append(f"{code} is not recommended due to unmet prerequisite(s): {', '.join(missing)}.")
+            if trace is not None:
+                trace(course_id << COURSE_SHIFT | PREREQUISITES)
+            continue
+        coreqs = coreq_indices[coreq_indptr[course_id]:coreq_indptr[course_id + 1]]
+        if any(not passed[c] and not added[c] for c in coreqs):
+            explanations.append(f"{code} is not recommended due to unmet co-requisite(s): {', '.join([codes[c] for c in coreqs if not passed[c]])}.")
+            if trace is not None:
+                trace(course_id << COURSE_SHIFT | COREQUISITES)
+            continue
+        if total_credits + credits[course_id] > credit_limit:
+            explanations.append(f"{code} is not added because it would exceed the credit limit.")
+            if trace is not None:
+                trace(course_id << COURSE_SHIFT | CREDIT_LIMIT)
+            continue
+        selected.append(course_id)
+        added[code_id] = 1
+        total_credits += credits[course_id]
+        if trace is not None:
+            trace(course_id << COURSE_SHIFT | SELECTED)
+        prereqs = prereq_indices[prereq_indptr[course_id]:prereq_indptr[course_id + 1]]
+        if requirements and course_id in requirements:
+            # Name the courses that satisfied the expression
+            prereqs = [p for p in prereqs if passed[p]]
+        if prereqs:
+            explanations.append(f"{code} is recommended because you passed {', '.join(codes[p] for p in prereqs)}, its prerequisite(s).")
+        else:
+            explanations.append(f"{code} is recommended because it has no prerequisites.")
+
+    return selected, total_credits, explanations
 
-courses_df = pd.read_csv("data/courses.csv").fillna("")
-policies_df = pd.read_csv("data/policies.csv").fillna("")
-
-# Student input
-student_input = {
-     "cgpa": 3.1,                      # Credit limit = 22
-    "semester": "FALL",
-    "passed_courses": ["UC1"],       # Only 1 course passed
-    "failed_courses": []
-}
-
-# Convert course list to dict
-all_courses = courses_df.to_dict(orient="records")
 
 # Define Fact model
 class StudentProfile(Fact):
@@ -29,118 +161,85 @@ class StudentProfile(Fact):
 
 # Inference engine
 class AdvisingEngine(KnowledgeEngine):
-    def __init__(self, courses, student_data, policies_df):
+    def __init__(self, courses, student_data, policies_df, recorder=None, catalog_version=0):
         super().__init__()
         self.courses = courses
+        # Course codes are interned to integer ids so the rule body below
+        # works on ints and flat arrays instead of comparing strings
+        self.catalog = courses if isinstance(courses, CompiledCatalog) else CompiledCatalog.from_records(courses)
         self.student_data = student_data
         self.policies_df = policies_df
         self.recommended_courses = []
         self.total_credits = 0
         self.explanations = []
         self.credit_limit = self.get_dynamic_credit_limit()
+        # Every decision is recorded if a trace directory is configured
+        # (KBS_DECISION_TRACE); see integration.decision_trace. Pass
+        # recorder=False for runs that advise no one, e.g. what-if comparisons
+        self.recorder = recorder if recorder is not None else get_trace_recorder()
+        self.catalog_version = catalog_version
+        # Reference of this run in the trace, "" if it is not traced
+        self.trace_reference = ""
 
     def get_dynamic_credit_limit(self):
-        credit_policies = self.policies_df[self.policies_df["Category"].str.strip() == "Credit Limit"]
-        rules = []
-
-        for _, row in credit_policies.iterrows():
-            condition = str(row["Condition"])
-            max_credit = int(row["max"])
-            match = re.findall(r'(\d+\.\d+)', condition)
-
-            if "≥" in condition or ">=" in condition:
-                rules.append((lambda cgpa, val=float(match[0]): cgpa >= val, max_credit))
-            elif "≤" in condition and len(match) == 2:
-                l, u = float(match[0]), float(match[1])
-                rules.append((lambda cgpa, l=l, u=u: l <= cgpa < u, max_credit))
-            elif "<" in condition:
-                rules.append((lambda cgpa, val=float(match[0]): cgpa < val, max_credit))
-
-        for rule, limit in rules:
-            if rule(self.student_data["cgpa"]):
-                return limit
-        return 12  # Default fallback
+        return credit_limit_for(self.student_data["cgpa"], credit_limit_rules(self.policies_df))
 
     @Rule(StudentProfile())
     def recommend_courses(self):
-        already_added = set()
-        passed = [c.strip() for c in self.student_data["passed_courses"]]
-        failed = [c.strip() for c in self.student_data["failed_courses"]]
-
-        # Step 1: Prioritize failed courses
-        for course in self.courses:
-            code = str(course["Course Code"]).strip()
-            offered = str(course["Semester Offered"]).strip().upper()
-            prereqs = [p.strip() for p in str(course["Prerequisites"]).split(",") if p.strip()]
-            credits = int(course["Credit Hours"])
-
-            if code not in failed:
-                continue
-            if code in passed:
-                self.explanations.append(f"{code} is not recommended because it was already passed.")
-                continue
-            if self.student_data["semester"].upper() not in offered and offered != "BOTH":
-                self.explanations.append(f"{code} is unavailable this semester.")
-                continue
-            if any(pr not in passed for pr in prereqs):
-                self.explanations.append(f"{code} is not recommended due to unmet prerequisite(s): {', '.join([pr for pr in prereqs if pr not in passed])}.")
-                continue
-            if self.total_credits + credits > self.credit_limit:
-                self.explanations.append(f"{code} is not added because it would exceed the credit limit.")
-                continue
-            self.recommended_courses.append(course)
-            already_added.add(code)
-            self.total_credits += credits
-            self.explanations.append(f"{code} is prioritized because you failed it previously and met its prerequisites.")
-
-        # Recommend other eligible courses
-        for course in self.courses:
-            code = str(course["Course Code"]).strip()
-            name = str(course["Course Name"]).strip()
-            offered = str(course["Semester Offered"]).strip().upper()
-            prereqs = [p.strip() for p in str(course["Prerequisites"]).split(",") if p.strip()]
-            coreqs = [c.strip() for c in str(course["Co-requisites"]).split(",") if c.strip()]
-            credits = int(course["Credit Hours"])
-
-            if code in passed or code in already_added:
-                continue
-            if self.student_data["semester"].upper() not in offered and offered != "BOTH":
-                self.explanations.append(f"{code} is not offered in the {self.student_data['semester']} semester.")
-                continue
-            if any(pr not in passed for pr in prereqs):
-                self.explanations.append(f"{code} is not recommended due to unmet prerequisite(s): {', '.join([pr for pr in prereqs if pr not in passed])}.")
-                continue
-            if any(cr not in passed and cr not in [c["Course Code"].strip() for c in self.recommended_courses] for cr in coreqs):
-                self.explanations.append(f"{code} is not recommended due to unmet co-requisite(s): {', '.join([cr for cr in coreqs if cr not in passed])}.")
-                continue
-            if self.total_credits + credits > self.credit_limit:
-                self.explanations.append(f"{code} is not added because it would exceed the credit limit.")
-                continue
-            self.recommended_courses.append(course)
-            already_added.add(code)
-            self.total_credits += credits
-            if prereqs:
-                self.explanations.append(f"{code} is recommended because you passed {', '.join(prereqs)}, its prerequisite(s).")
+        selected, total_credits, explanations = select_courses(
+            self.catalog,
+            self.catalog.mark(self.student_data["passed_courses"]),
+            self.catalog.mark(self.student_data["failed_courses"]),
+            self.student_data["semester"],
+            self.credit_limit,
+            trace=self.recorder.begin() if self.recorder else None,
+        )
+        if self.recorder:
+            self.trace_reference = self.recorder.end(self.catalog, self.student_data, self.credit_limit,
+                                                     self.catalog_version)
+        for course_id in selected:
+            if isinstance(self.courses, CompiledCatalog):
+                self.recommended_courses.append(self.catalog.course(course_id))
             else:
-                self.explanations.append(f"{code} is recommended because it has no prerequisites.")
-
-# Run the engine
-engine = AdvisingEngine(all_courses, student_input, policies_df)
-engine.reset()
-engine.declare(StudentProfile(**student_input))
-engine.run()
-
-# Show output
-recommended_df = pd.DataFrame(engine.recommended_courses)[["Course Code", "Course Name", "Credit Hours"]]
-if not recommended_df.empty:
-    recommended_df["Credit Hours"] = recommended_df["Credit Hours"].astype(int)
-    recommended_df.loc["Total"] = ["", "Total Credits", recommended_df["Credit Hours"].sum()]
-    print("Recommended Courses:")
-    print(recommended_df)
-else:
-    print("No courses could be recommended based on your profile.")
-
-# Show explanations
-print("\n--- Explanation of Decisions ---")
-for explanation in engine.explanations:
-    print("- " + explanation)
+                self.recommended_courses.append(self.courses[course_id])
+        self.total_credits += total_credits
+        self.explanations.extend(explanations)
+
+if __name__ == "__main__":
+    # Pin one version of the knowledge base for the whole run so a concurrent
+    # edit from the course management page cannot be observed half-way
+    with get_store("data/courses.csv").pin() as courses, get_store("data/policies.csv").pin() as policies:
+        courses_df = courses.df.fillna("")
+        policies_df = policies.df.fillna("")
+
+    # Student input
+    student_input = {
+         "cgpa": 3.1,                      # Credit limit = 22
+        "semester": "FALL",
+        "passed_courses": ["UC1"],       # Only 1 course passed
+        "failed_courses": []
+    }
+
+    # Convert course list to dict
+    all_courses = courses_df.to_dict(orient="records")
+
+    # Run the engine
+    engine = AdvisingEngine(all_courses, student_input, policies_df)
+    engine.reset()
+    engine.declare(StudentProfile(**student_input))
+    engine.run()
+
+    # Show output
+    recommended_df = pd.DataFrame(engine.recommended_courses)[["Course Code", "Course Name", "Credit Hours"]]
+    if not recommended_df.empty:
+        recommended_df["Credit Hours"] = recommended_df["Credit Hours"].astype(int)
+        recommended_df.loc["Total"] = ["", "Total Credits", recommended_df["Credit Hours"].sum()]
+        print("Recommended Courses:")
+        print(recommended_df)
+    else:
+        print("No courses could be recommended based on your profile.")
+
+    # Show explanations
+    print("\n--- Explanation of Decisions ---")
+    for explanation in engine.explanations:
+        print("- " + explanation)
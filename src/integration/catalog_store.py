@@ -0,0 +1,279 @@
+import hashlib
+import io
+import os
+import stat
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# How often a reader retries when a writer publishes while it is reading
+_MAX_READ_RETRIES = 5
+
+
+class CatalogConflictError(Exception):
+    """Raised when a writer publishes on top of a version it did not read"""
+
+
+class CatalogSnapshot:
+    """Immutable, versioned view of a CSV knowledge-base file.
+
+    Snapshots are shared between readers and must never be mutated; writers
+    take a private copy with ``to_frame()`` and publish it as a new version.
+    """
+
+    __slots__ = ("version", "digest", "df", "_stat_key")
+
+    def __init__(self, version: int, digest: str, df: pd.DataFrame, stat_key: Tuple):
+        self.version = version
+        self.digest = digest
+        self.df = df
+        self._stat_key = stat_key
+
+    def to_frame(self) -> pd.DataFrame:
+        """Return a private, writable copy of the snapshot data"""
+        return self.df.copy()
+
+    def __repr__(self):
+        return f"CatalogSnapshot(version={self.version}, rows={len(self.df)})"
+
+
+@contextmanager
+def _file_lock(lock_path: str) -> Iterator[None]:
+    """Hold an exclusive inter-process lock on ``lock_path``"""
+    with open(lock_path, "a+b") as fh:
+        if fcntl is not None:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+        else:
+            fh.seek(0)
+            msvcrt.locking(fh.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+            else:
+                fh.seek(0)
+                msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _parse_csv(raw: bytes) -> pd.DataFrame:
+    df = pd.read_csv(io.BytesIO(raw), encoding="utf-8-sig")
+    # The shipped catalog has headers such as "Course Code " with trailing spaces
+    df.columns = [str(c).strip() for c in df.columns]
+    return df
+
+
+class CatalogStore:
+    """Copy-on-write version store for one CSV file.
+
+    Readers pin the current snapshot for the duration of a request and never
+    wait on writers: a new version is written to a temporary file and swapped
+    in with ``os.replace``, so a reader always sees either the old or the new
+    file. Writers serialise through an exclusive lock on ``<path>.lock`` and
+    record the version number and content digest in ``<path>.version``.
+    Versions that are neither current nor pinned are dropped from memory.
+    """
+
+    def __init__(self, path: str):
+        self.path = os.path.abspath(path)
+        self.lock_path = self.path + ".lock"
+        self.version_path = self.path + ".version"
+        self._mutex = threading.RLock()
+        self._current: Optional[CatalogSnapshot] = None
+        self._snapshots: Dict[int, CatalogSnapshot] = {}
+        self._pins: Dict[int, int] = {}
+
+    # ------------------------------------------------------------------ reads
+
+    def current(self) -> CatalogSnapshot:
+        """Return the latest published snapshot, loading it if the file changed"""
+        st = os.stat(self.path)
+        key = (st.st_ino, st.st_size, st.st_mtime_ns)
+        with self._mutex:
+            if self._current is not None and self._current._stat_key == key:
+                return self._current
+        snapshot = self._load()
+        with self._mutex:
+            return self._install(snapshot)
+
+    @contextmanager
+    def pin(self) -> Iterator[CatalogSnapshot]:
+        """Pin the current snapshot so it stays alive until the block exits"""
+        snapshot = self.acquire()
+        try:
+            yield snapshot
+        finally:
+            self.release(snapshot)
+
+    def acquire(self) -> CatalogSnapshot:
+        """Pin and return the current snapshot; pair with ``release``"""
+        snapshot = self.current()
+        with self._mutex:
+            self._snapshots.setdefault(snapshot.version, snapshot)
+            self._pins[snapshot.version] = self._pins.get(snapshot.version, 0) + 1
+            return snapshot
+
+    def release(self, snapshot: CatalogSnapshot) -> None:
+        """Unpin a snapshot returned by ``acquire``"""
+        with self._mutex:
+            count = self._pins.get(snapshot.version, 0) - 1
+            if count > 0:
+                self._pins[snapshot.version] = count
+            else:
+                self._pins.pop(snapshot.version, None)
+            self._reclaim()
+
+    @property
+    def watch_paths(self) -> List[str]:
+        """Files whose changes mean a new version may be available"""
+        return [self.path]
+
+    def live_versions(self) -> Dict[int, int]:
+        """Return the versions held in memory mapped to their pin counts"""
+        with self._mutex:
+            return {v: self._pins.get(v, 0) for v in sorted(self._snapshots)}
+
+    # ----------------------------------------------------------------- writes
+
+    def publish(self, df: pd.DataFrame, expected_version: Optional[int] = None) -> CatalogSnapshot:
+        """Atomically publish ``df`` as the next version of the file.
+
+        If ``expected_version`` is given and another writer has published
+        since, ``CatalogConflictError`` is raised and nothing is written.
+        """
+        raw = df.to_csv(index=False).encode("utf-8")
+        with _file_lock(self.lock_path):
+            version, digest = self._read_stamp()
+            on_disk = self._read_raw()[1]
+            if hashlib.sha1(on_disk).hexdigest() != digest:
+                # The file was edited outside the store; that edit is a version too
+                version += 1
+            if expected_version is not None and expected_version != version:
+                raise CatalogConflictError(
+                    f"{os.path.basename(self.path)} is at version {version}, "
+                    f"expected {expected_version}"
+                )
+            self._atomic_write(self.path, raw)
+            version += 1
+            digest = hashlib.sha1(raw).hexdigest()
+            self._write_stamp(version, digest)
+            st = os.stat(self.path)
+        snapshot = CatalogSnapshot(version, digest, _parse_csv(raw),
+                                   (st.st_ino, st.st_size, st.st_mtime_ns))
+        with self._mutex:
+            return self._install(snapshot)
+
+    # --------------------------------------------------------------- helpers
+
+    def _load(self) -> CatalogSnapshot:
+        for _ in range(_MAX_READ_RETRIES):
+            stamp = self._read_stamp()
+            key, raw = self._read_raw()
+            if self._read_stamp() != stamp:
+                continue  # a writer published while we were reading
+            if hashlib.sha1(raw).hexdigest() == stamp[1]:
+                return CatalogSnapshot(stamp[0], stamp[1], _parse_csv(raw), key)
+            break
+        # Either a writer is mid-publish or the file was edited by hand.
+        # Settle it under the writer lock and stamp a new version if needed.
+        with _file_lock(self.lock_path):
+            version, digest = self._read_stamp()
+            key, raw = self._read_raw()
+            actual = hashlib.sha1(raw).hexdigest()
+            if actual != digest:
+                version += 1
+                digest = actual
+                self._write_stamp(version, digest)
+        return CatalogSnapshot(version, digest, _parse_csv(raw), key)
+
+    def _install(self, snapshot: CatalogSnapshot) -> CatalogSnapshot:
+        existing = self._snapshots.get(snapshot.version)
+        if existing is not None and existing.digest == snapshot.digest:
+            snapshot = existing
+        if self._current is None or snapshot.version >= self._current.version:
+            self._current = snapshot
+        self._snapshots[snapshot.version] = snapshot
+        self._reclaim()
+        return snapshot
+
+    def _reclaim(self) -> None:
+        for version in list(self._snapshots):
+            if self._snapshots[version] is not self._current and not self._pins.get(version):
+                del self._snapshots[version]
+
+    def _read_raw(self) -> Tuple[Tuple, bytes]:
+        with open(self.path, "rb") as fh:
+            st = os.fstat(fh.fileno())
+            return (st.st_ino, st.st_size, st.st_mtime_ns), fh.read()
+
+    def _read_stamp(self) -> Tuple[int, str]:
+        try:
+            with open(self.version_path, "r") as fh:
+                version, digest = fh.read().split()
+            return int(version), digest
+        except (OSError, ValueError):
+            return 0, ""
+
+    def _write_stamp(self, version: int, digest: str) -> None:
+        self._atomic_write(self.version_path, f"{version} {digest}\n".encode("ascii"))
+
+    @staticmethod
+    def _atomic_write(path: str, raw: bytes) -> None:
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(raw)
+                fh.flush()
+                os.fsync(fh.fileno())
+            # mkstemp creates the file readable by its owner only
+            os.chmod(tmp, _file_mode(path))
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+
+def _file_mode(path: str) -> int:
+    """Permissions for a file that replaces ``path``: those of ``path``, or
+    0644 if there is none yet"""
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        return 0o644
+
+
+_stores: Dict[str, CatalogStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(path: str) -> CatalogStore:
+    """Return the process-wide store for ``path``.
+
+    With ``KBS_STORAGE=sqlite`` the file name selects a table of the SQLite
+    knowledge base instead (``data/courses.csv`` -> ``courses``).
+    """
+    from integration.sqlite_store import get_sqlite_store, storage_backend
+
+    if storage_backend() == "sqlite":
+        return get_sqlite_store(os.path.splitext(os.path.basename(path))[0])
+    return get_csv_store(path)
+
+
+def get_csv_store(path: str) -> CatalogStore:
+    """Return the process-wide CSV store for ``path``, whatever the configuration"""
+    key = os.path.abspath(path)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = _stores[key] = CatalogStore(key)
+        return store
@@ -0,0 +1,285 @@
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import pandas as pd
+
+from integration.catalog_store import CatalogSnapshot, get_store
+from integration.compiled_catalog import CompiledCatalog
+from integration.course_index import CatalogDiff, diff_catalogs
+from integration.shared_catalog import get_shared_catalog
+
+logger = logging.getLogger(__name__)
+
+# inotify(7) constants
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_EVENT = struct.Struct("iIII")
+
+
+def _inotify_libc():
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        libc.inotify_init1
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+class CatalogWatcher(threading.Thread):
+    """Background thread calling ``callback`` whenever a watched file changes.
+
+    Uses inotify on the parent directories where available (files are swapped
+    in with ``os.replace``, so the directory is what has to be watched) and
+    falls back to polling ``os.stat`` every ``interval`` seconds. Files
+    written in place count too: a SQLite writer that keeps its connection
+    open only appends to the ``-wal`` file, which is never closed or renamed.
+    """
+
+    def __init__(self, paths: List[str], callback: Callable[[], None],
+                 interval: float = 1.0, use_inotify: bool = True):
+        super().__init__(name="catalog-watcher", daemon=True)
+        self.paths = [os.path.abspath(p) for p in paths]
+        self.callback = callback
+        self.interval = interval
+        self._libc = _inotify_libc() if use_inotify else None
+        self._stop_event = threading.Event()
+
+    @property
+    def mode(self) -> str:
+        return "inotify" if self._libc is not None else "polling"
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    def run(self) -> None:
+        if self._libc is not None:
+            try:
+                self._run_inotify()
+                return
+            except OSError as e:
+                logger.warning("inotify unavailable (%s), falling back to polling", e)
+                self._libc = None
+        self._run_polling()
+
+    def _notify(self) -> None:
+        try:
+            self.callback()
+        except Exception:
+            logger.exception("Reloading the knowledge base failed; keeping the previous version")
+
+    def _run_polling(self) -> None:
+        last = self._stat_keys()
+        while not self._stop_event.wait(self.interval):
+            keys = self._stat_keys()
+            if keys != last:
+                last = keys
+                self._notify()
+
+    def _stat_keys(self) -> Dict[str, tuple]:
+        keys = {}
+        for path in self.paths:
+            try:
+                st = os.stat(path)
+                keys[path] = (st.st_ino, st.st_size, st.st_mtime_ns)
+            except OSError:
+                keys[path] = None
+        return keys
+
+    def _run_inotify(self) -> None:
+        fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        try:
+            names = {os.path.basename(p).encode() for p in self.paths}
+            mask = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE
+            for directory in {os.path.dirname(p) for p in self.paths}:
+                if self._libc.inotify_add_watch(fd, directory.encode(), mask) < 0:
+                    raise OSError(ctypes.get_errno(), f"cannot watch {directory}")
+            while not self._stop_event.is_set():
+                ready, _, _ = select.select([fd], [], [], self.interval)
+                if not ready:
+                    continue
+                # Let a burst of events (write + rename + stamp) settle first
+                self._stop_event.wait(0.05)
+                if any(name in names for name in self._read_events(fd)):
+                    self._notify()
+        finally:
+            os.close(fd)
+
+    @staticmethod
+    def _read_events(fd: int) -> List[bytes]:
+        names = []
+        while True:
+            try:
+                buf = os.read(fd, 64 * 1024)
+            except BlockingIOError:
+                return names
+            offset = 0
+            while offset < len(buf):
+                _, _, _, length = _IN_EVENT.unpack_from(buf, offset)
+                offset += _IN_EVENT.size
+                names.append(buf[offset:offset + length].rstrip(b"\0"))
+                offset += length
+
+
+class KnowledgeBaseSnapshot(NamedTuple):
+    """One consistent version of the catalog and the policies"""
+    catalog: CompiledCatalog
+    policies_df: pd.DataFrame
+    version: int
+    policies_version: int
+    # Content digests of the catalog and the policies
+    digests: Tuple[str, str]
+
+
+class LiveKnowledgeBase:
+    """Current catalog and policies, reloaded when a new version is published.
+
+    ``refresh`` picks up new versions from the catalog stores, diffs the old
+    and new catalog and tells listeners which courses changed, so they can
+    update what they derived from the old version instead of starting over.
+    Reloads are serialized: listeners see every diff once, in version order.
+    """
+
+    def __init__(self, courses_path: str = "data/courses.csv", policies_path: str = "data/policies.csv"):
+        self.courses_store = get_store(courses_path)
+        self.policies_store = get_store(policies_path)
+        self._courses: Optional[CatalogSnapshot] = None
+        self._policies: Optional[CatalogSnapshot] = None
+        self._policies_df = pd.DataFrame()
+        self._catalog: Optional[CompiledCatalog] = None
+        self._listeners: List[Callable[[CatalogDiff, bool], None]] = []
+        self._lock = threading.Lock()
+        # Held for a whole reload, listeners included
+        self._refresh_lock = threading.Lock()
+        self._watcher: Optional[CatalogWatcher] = None
+        self.refresh()
+
+    @property
+    def version(self) -> int:
+        return self._courses.version
+
+    @property
+    def policies_version(self) -> int:
+        return self._policies.version
+
+    @property
+    def digests(self) -> Tuple[str, str]:
+        """Content digests of the current catalog and policies"""
+        with self._lock:
+            return self._courses.digest, self._policies.digest
+
+    @property
+    def policies_df(self) -> pd.DataFrame:
+        return self._policies_df
+
+    def catalog(self) -> CompiledCatalog:
+        """Return the current version compiled to integer ids.
+
+        The compiled catalog is shared with the other processes on this host
+        through a memory-mapped image (see ``integration.shared_catalog``).
+        """
+        with self._lock:
+            return self._compiled()
+
+    def snapshot(self) -> KnowledgeBaseSnapshot:
+        """Return the current catalog and policies, read together"""
+        with self._lock:
+            return KnowledgeBaseSnapshot(self._compiled(), self._policies_df, self._courses.version,
+                                         self._policies.version, (self._courses.digest, self._policies.digest))
+
+    def _compiled(self) -> CompiledCatalog:
+        if self._catalog is None:
+            self._catalog = get_shared_catalog(self.courses_store, self._courses)
+        return self._catalog
+
+    def add_listener(self, callback: Callable[[CatalogDiff, bool], None]) -> None:
+        """Call ``callback(diff, policies_changed)`` after every reload"""
+        self._listeners.append(callback)
+
+    def refresh(self) -> Optional[CatalogDiff]:
+        """Load new catalog/policy versions if any; return the catalog diff"""
+        with self._refresh_lock:
+            # Read after any reload in progress has finished, so an older
+            # snapshot read by a slower caller is never installed over it
+            courses = _newest(self._courses, self.courses_store.current())
+            policies = _newest(self._policies, self.policies_store.current())
+            if courses is self._courses and policies is self._policies:
+                return None
+            diff = CatalogDiff((), (), ())
+            if courses is not self._courses:
+                diff = diff_catalogs(self._courses.df if self._courses else None, courses.df)
+            policies_changed = policies is not self._policies
+            with self._lock:
+                if courses is not self._courses:
+                    self._catalog = None
+                    self._courses = courses
+                if policies_changed:
+                    self._policies = policies
+                    self._policies_df = policies.df.fillna("")
+                listeners = list(self._listeners)
+            for listener in listeners:
+                listener(diff, policies_changed)
+            return diff
+
+    def watch(self, interval: float = 1.0) -> CatalogWatcher:
+        """Start reloading automatically when the CSV files change"""
+        if self._watcher is None or not self._watcher.is_alive():
+            paths = self.courses_store.watch_paths + self.policies_store.watch_paths
+            self._watcher = CatalogWatcher(sorted(set(paths)), self.refresh, interval=interval)
+            self._watcher.start()
+        return self._watcher
+
+    def stop(self) -> None:
+        if self._watcher is not None:
+            self._watcher.stop()
+            self._watcher.join()
+            self._watcher = None
+
+
+def _newest(current: Optional[CatalogSnapshot], loaded: CatalogSnapshot) -> CatalogSnapshot:
+    """``loaded`` unless it is older than the installed ``current``"""
+    if current is not None and loaded.version < current.version:
+        return current
+    return loaded
+
+
+_knowledge_bases: Dict[tuple, LiveKnowledgeBase] = {}
+_knowledge_bases_lock = threading.Lock()
+
+
+def get_knowledge_base(courses_path: str = "data/courses.csv",
+                       policies_path: str = "data/policies.csv") -> LiveKnowledgeBase:
+    """Return the process-wide, self-reloading knowledge base for the given files"""
+    key = (os.path.abspath(courses_path), os.path.abspath(policies_path))
+    with _knowledge_bases_lock:
+        kb = _knowledge_bases.get(key)
+        if kb is None:
+            kb = _knowledge_bases[key] = LiveKnowledgeBase(*key)
+            kb.watch()
+        return kb
+
+
+def forget_knowledge_base(courses_path: str = "data/courses.csv",
+                          policies_path: str = "data/policies.csv") -> None:
+    """Stop watching the given files and drop their process-wide knowledge
+    base, shutting down its speculative advisor"""
+    from integration.speculative_advisor import forget_speculative_advisor
+
+    key = (os.path.abspath(courses_path), os.path.abspath(policies_path))
+    with _knowledge_bases_lock:
+        kb = _knowledge_bases.pop(key, None)
+    if kb is not None:
+        kb.stop()
+        forget_speculative_advisor(kb)
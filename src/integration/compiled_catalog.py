@@ -0,0 +1,271 @@
+import sys
+from array import array
+from collections.abc import Mapping
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from integration.prerequisites import Requirement, compile_prerequisites
+
+SEMESTER_BITS = {"FALL": 1, "SPRING": 2, "SUMMER": 4}
+ALL_SEMESTERS = 7
+
+
+class UnknownSemesterError(ValueError):
+    """Raised when a student is advised for a semester that is not FALL, SPRING or SUMMER"""
+    pass
+
+
+def semester_bit(semester: str) -> int:
+    """Bit flag of the semester a student is advised for.
+
+    An unknown name would match no course, and the student would silently
+    get no advice, so it is rejected instead.
+    """
+    bit = SEMESTER_BITS.get(str(semester).strip().upper())
+    if bit is None:
+        raise UnknownSemesterError(f"Unknown semester {semester!r}; expected one of {', '.join(SEMESTER_BITS)}")
+    return bit
+
+
+def semester_mask(offered: str) -> int:
+    """Bit flags for a "Semester Offered" value; BOTH means every semester"""
+    offered = offered.strip().upper()
+    if offered == "BOTH":
+        return ALL_SEMESTERS
+    mask = 0
+    for name, bit in SEMESTER_BITS.items():
+        if name in offered:
+            mask |= bit
+    return mask
+
+
+def _clean(value) -> str:
+    if value is None or (isinstance(value, float) and value != value):
+        return ""
+    return str(value).strip()
+
+
+class CourseView(Mapping):
+    """Read-only view of one course in a ``CompiledCatalog``.
+
+    Behaves like the course dicts the engine used to receive, so
+    ``course["Course Code"]`` keeps working, but holds only the catalog and
+    an integer id.
+    """
+
+    __slots__ = ("_catalog", "id")
+
+    _KEYS = ("Course Code", "Course Name", "Credit Hours", "Semester Offered", "Prerequisites", "Co-requisites")
+
+    def __init__(self, catalog: "CompiledCatalog", course_id: int):
+        self._catalog = catalog
+        self.id = course_id
+
+    @property
+    def code(self) -> str:
+        return self._catalog.code(self.id)
+
+    @property
+    def name(self) -> str:
+        return self._catalog.names[self.id]
+
+    @property
+    def credits(self) -> int:
+        return self._catalog.credits[self.id]
+
+    @property
+    def offered(self) -> str:
+        return self._catalog.offered[self.id]
+
+    @property
+    def prerequisites(self) -> Tuple[str, ...]:
+        return self._catalog.codes_of(self._catalog.prerequisite_ids(self.id))
+
+    @property
+    def corequisites(self) -> Tuple[str, ...]:
+        return self._catalog.codes_of(self._catalog.corequisite_ids(self.id))
+
+    @property
+    def description(self) -> str:
+        return self._catalog.description(self.id)
+
+    def __getitem__(self, key):
+        if key == "Course Code":
+            return self.code
+        if key == "Course Name":
+            return self.name
+        if key == "Credit Hours":
+            return self.credits
+        if key == "Semester Offered":
+            return self.offered
+        if key == "Prerequisites":
+            requirement = self._catalog.requirements.get(self.id)
+            return requirement.text if requirement is not None else ", ".join(self.prerequisites)
+        if key == "Co-requisites":
+            return ", ".join(self.corequisites)
+        if key == "Description":
+            return self.description
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        # Description is reachable by key but not iterated, so building a
+        # DataFrame from views does not force the descriptions to load
+        return iter(self._KEYS)
+
+    def __len__(self) -> int:
+        return len(self._KEYS)
+
+    def __repr__(self):
+        return f"CourseView({self.code!r})"
+
+
+class CompiledCatalog:
+    """Course catalog packed into flat arrays indexed by integer ids.
+
+    Every course code (including codes only referenced as a prerequisite) is
+    interned once and given a code id; course ids are row positions. Credits
+    and semester flags live in ``array`` columns, prerequisites and
+    co-requisites are CSR index arrays of code ids, and descriptions are only
+    loaded when first asked for. Courses whose prerequisites are an and/or
+    expression rather than a list of required courses also have a compiled
+    ``Requirement`` in ``requirements``; their CSR row lists every course the
+    expression mentions.
+    """
+
+    def __init__(self, codes: List[str], course_code_ids: array, names: List[str], credits: array,
+                 offered: List[str], semesters: array, prereq_indptr: array, prereq_indices: array,
+                 coreq_indptr: array, coreq_indices: array,
+                 descriptions: Optional[Callable[[], Sequence[str]]] = None,
+                 requirements: Optional[Dict[int, Requirement]] = None):
+        self.codes = codes
+        self.code_ids: Dict[str, int] = {code: i for i, code in enumerate(codes)}
+        self.course_code_ids = course_code_ids
+        self.names = names
+        self.credits = credits
+        self.offered = offered
+        self.semesters = semesters
+        self.prereq_indptr = prereq_indptr
+        self.prereq_indices = prereq_indices
+        self.coreq_indptr = coreq_indptr
+        self.coreq_indices = coreq_indices
+        self.requirements: Dict[int, Requirement] = requirements or {}
+        self._description_loader = descriptions
+        self._descriptions: Optional[Sequence[str]] = None
+
+    @classmethod
+    def from_records(cls, records: Iterable[Mapping],
+                     descriptions: Optional[Callable[[], Sequence[str]]] = None) -> "CompiledCatalog":
+        """Compile engine-style course dicts"""
+        records = list(records)
+        codes: List[str] = []
+        code_ids: Dict[str, int] = {}
+
+        def intern(code: str) -> int:
+            code_id = code_ids.get(code)
+            if code_id is None:
+                code_id = code_ids[code] = len(codes)
+                codes.append(sys.intern(code))
+            return code_id
+
+        # Course codes first so they get the low ids, then referenced codes
+        course_code_ids = array("i", (intern(_clean(r["Course Code"])) for r in records))
+        names, offered = [], []
+        credits, semesters = array("H"), array("B")
+        prereq_indptr, prereq_indices = array("i", [0]), array("i")
+        coreq_indptr, coreq_indices = array("i", [0]), array("i")
+        requirements: Dict[int, Requirement] = {}
+        for course_id, record in enumerate(records):
+            names.append(_clean(record["Course Name"]))
+            semester = _clean(record["Semester Offered"]).upper()
+            offered.append(sys.intern(semester))
+            semesters.append(semester_mask(semester))
+            credits.append(int(record["Credit Hours"]))
+            prereqs, requirement = compile_prerequisites(_clean(record.get("Prerequisites", "")), intern)
+            prereq_indices.extend(prereqs)
+            prereq_indptr.append(len(prereq_indices))
+            if requirement is not None:
+                requirements[course_id] = requirement
+            for code in _clean(record.get("Co-requisites", "")).split(","):
+                if code.strip():
+                    coreq_indices.append(intern(code.strip()))
+            coreq_indptr.append(len(coreq_indices))
+
+        if descriptions is None and records and "Description" in records[0]:
+            descriptions = lambda: [_clean(r.get("Description", "")) for r in records]
+        return cls(codes, course_code_ids, names, credits, offered, semesters,
+                   prereq_indptr, prereq_indices, coreq_indptr, coreq_indices, descriptions, requirements)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, path: Optional[str] = None) -> "CompiledCatalog":
+        """Compile a catalog DataFrame.
+
+        With ``path`` the descriptions are re-read from that CSV on demand
+        instead of being kept in memory.
+        """
+        columns = [c for c in df.columns if c != "Description"]
+        catalog = cls.from_records(df[columns].to_dict(orient="records"))
+        if path is not None:
+            catalog._description_loader = lambda: [
+                _clean(d) for d in pd.read_csv(path, encoding="utf-8-sig",
+                                               usecols=lambda c: c.strip() == "Description").iloc[:, 0]
+            ]
+        elif "Description" in df.columns:
+            column = df["Description"]
+            catalog._description_loader = lambda: [_clean(d) for d in column]
+        return catalog
+
+    def __len__(self) -> int:
+        return len(self.course_code_ids)
+
+    def __iter__(self) -> Iterator[CourseView]:
+        return (CourseView(self, i) for i in range(len(self)))
+
+    def course(self, course_id: int) -> CourseView:
+        return CourseView(self, course_id)
+
+    def code(self, course_id: int) -> str:
+        return self.codes[self.course_code_ids[course_id]]
+
+    def codes_of(self, code_ids: Iterable[int]) -> Tuple[str, ...]:
+        return tuple(self.codes[i] for i in code_ids)
+
+    def prerequisite_ids(self, course_id: int) -> array:
+        return self.prereq_indices[self.prereq_indptr[course_id]:self.prereq_indptr[course_id + 1]]
+
+    def corequisite_ids(self, course_id: int) -> array:
+        return self.coreq_indices[self.coreq_indptr[course_id]:self.coreq_indptr[course_id + 1]]
+
+    def unmet_prerequisites(self, course_id: int, passed) -> List[str]:
+        """The prerequisites of ``course_id`` not met by a ``mark`` table, as text.
+
+        For a list of required courses these are the codes not passed; for an
+        and/or expression, the parts of it that are not satisfied.
+        """
+        requirement = self.requirements.get(course_id)
+        if requirement is not None:
+            return requirement.unmet(passed)
+        return [self.codes[p] for p in self.prerequisite_ids(course_id) if not passed[p]]
+
+    def mark(self, codes: Iterable[str]) -> bytearray:
+        """Return a membership table over code ids for a set of course codes"""
+        marks = bytearray(len(self.codes))
+        for code in codes:
+            code_id = self.code_ids.get(code.strip())
+            if code_id is not None:
+                marks[code_id] = 1
+        return marks
+
+    def description(self, course_id: int) -> str:
+        if self._descriptions is None:
+            self._descriptions = self._description_loader() if self._description_loader else []
+        if course_id < len(self._descriptions):
+            return self._descriptions[course_id]
+        return ""
+
+    def column(self, name: str) -> np.ndarray:
+        """Zero-copy NumPy view of an array column, e.g. ``column("credits")``"""
+        column = getattr(self, name)
+        # ``array`` columns, or ``memoryview`` columns of a shared catalog
+        return np.frombuffer(column, dtype=getattr(column, "typecode", None) or column.format)
@@ -0,0 +1,103 @@
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+import pandas as pd
+
+from integration.prerequisites import prerequisite_codes
+
+
+def _clean(value) -> str:
+    return "" if pd.isna(value) else str(value).strip()
+
+
+def course_record(row) -> Dict:
+    """Build the engine-ready course dict for one catalog row"""
+    return {
+        "Course Code": _clean(row["Course Code"]),
+        "Course Name": _clean(row["Course Name"]),
+        "Credit Hours": int(row["Credit Hours"]),
+        "Semester Offered": _clean(row["Semester Offered"]).upper(),
+        "Prerequisites": _clean(row["Prerequisites"]),
+        "Co-requisites": _clean(row["Co-requisites"]),
+    }
+
+
+class CatalogDiff(NamedTuple):
+    """Course codes that differ between two catalog versions"""
+    added: Tuple[str, ...]
+    removed: Tuple[str, ...]
+    changed: Tuple[str, ...]
+
+    @property
+    def touched(self) -> Set[str]:
+        return set(self.added) | set(self.removed) | set(self.changed)
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed)
+
+
+def _row_hashes(df: Optional[pd.DataFrame]) -> pd.Series:
+    if df is None or df.empty:
+        return pd.Series([], dtype="uint64")
+    codes = df["Course Code"].astype(str).str.strip()
+    hashes = pd.Series(pd.util.hash_pandas_object(df, index=False).values, index=codes.values)
+    return hashes[~hashes.index.duplicated()]
+
+
+def diff_catalogs(old_df: Optional[pd.DataFrame], new_df: Optional[pd.DataFrame]) -> CatalogDiff:
+    """Compare two catalog versions row by row, keyed by course code"""
+    old, new = _row_hashes(old_df), _row_hashes(new_df)
+    added = new.index.difference(old.index)
+    removed = old.index.difference(new.index)
+    common = new.index.intersection(old.index)
+    changed = common[new.loc[common].values != old.loc[common].values]
+    return CatalogDiff(tuple(added), tuple(removed), tuple(changed))
+
+
+class CourseIndex:
+    """Parsed course records plus the prerequisite graph, updated in place.
+
+    ``apply`` only re-parses the rows named in a ``CatalogDiff``; records of
+    untouched courses are kept as-is, so a one-row edit costs one row parse.
+    """
+
+    def __init__(self):
+        self.records: Dict[str, Dict] = {}
+        self.prerequisites: Dict[str, Tuple[str, ...]] = {}
+        self.dependents: Dict[str, Set[str]] = {}
+        self.order: List[str] = []
+
+    def build(self, df: pd.DataFrame) -> CatalogDiff:
+        """Index a catalog from scratch"""
+        diff = diff_catalogs(None, df)
+        self.apply(diff, df)
+        return diff
+
+    def apply(self, diff: CatalogDiff, new_df: pd.DataFrame) -> None:
+        """Bring the index up to date with ``new_df`` given the diff to it"""
+        for code in diff.removed + diff.changed:
+            self._unlink(code)
+            self.records.pop(code, None)
+
+        updated = set(diff.added) | set(diff.changed)
+        if updated:
+            codes = new_df["Course Code"].astype(str).str.strip()
+            rows = new_df[codes.isin(updated) & ~codes.duplicated()]
+            for _, row in rows.iterrows():
+                record = course_record(row)
+                code = record["Course Code"]
+                self.records[code] = record
+                self.prerequisites[code] = prerequisite_codes(record["Prerequisites"])
+                for prereq in self.prerequisites[code]:
+                    self.dependents.setdefault(prereq, set()).add(code)
+
+        if diff.added or diff.removed or not self.order:
+            codes = new_df["Course Code"].astype(str).str.strip()
+            self.order = codes[~codes.duplicated()].tolist()
+
+    def _unlink(self, code: str) -> None:
+        for prereq in self.prerequisites.pop(code, ()):
+            dependents = self.dependents.get(prereq)
+            if dependents is not None:
+                dependents.discard(code)
+                if not dependents:
+                    del self.dependents[prereq]
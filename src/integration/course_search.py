@@ -0,0 +1,241 @@
+import bisect
+import math
+import re
+import threading
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+import pandas as pd
+
+from integration.course_index import CatalogDiff, diff_catalogs
+
+# How much a token counts depending on the field it was found in
+FIELD_WEIGHTS = (("Course Code", 3.0), ("Course Name", 2.0), ("Description", 1.0))
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_CODE_PARTS = re.compile(r"[a-z]+|[0-9]+")
+
+
+def tokenize(text) -> List[str]:
+    """Lowercase alphanumeric tokens of ``text``"""
+    if text is None or (isinstance(text, float) and text != text):
+        return []
+    return _TOKEN.findall(str(text).lower())
+
+
+def _code_tokens(code: str) -> List[str]:
+    # "CSE014" is also found as "cse" and "014"
+    tokens = tokenize(code)
+    for token in list(tokens):
+        parts = _CODE_PARTS.findall(token)
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+
+class SearchHit(NamedTuple):
+    code: str
+    name: str
+    score: float
+
+
+class CourseSearchIndex:
+    """Token inverted index over course codes, names and descriptions.
+
+    Every token maps to the courses containing it and its weight there (the
+    weight of the best field it appears in). The vocabulary is kept sorted,
+    so prefix queries are a ``bisect`` range scan. Like ``CourseIndex``,
+    ``apply`` only re-indexes the rows named in a ``CatalogDiff``;
+    ``derive`` does the same on a copy that shares the untouched postings,
+    leaving this index as it is.
+    """
+
+    def __init__(self):
+        self.postings: Dict[str, Dict[str, float]] = {}
+        self.vocabulary: List[str] = []
+        self.names: Dict[str, str] = {}
+        self.order: List[str] = []
+        self._position: Dict[str, int] = {}
+        self._terms: Dict[str, Dict[str, float]] = {}
+        # Tokens whose postings are shared with the index this one was
+        # derived from; they are copied before the first change
+        self._shared: Set[str] = set()
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    def build(self, df: pd.DataFrame) -> CatalogDiff:
+        """Index a catalog from scratch"""
+        diff = diff_catalogs(None, df)
+        self.apply(diff, df)
+        return diff
+
+    def derive(self, diff: CatalogDiff, new_df: pd.DataFrame) -> "CourseSearchIndex":
+        """A new index for ``new_df`` given the diff to it; this one is not changed"""
+        index = CourseSearchIndex()
+        with self._lock:
+            index.postings = dict(self.postings)
+            index.vocabulary = list(self.vocabulary)
+            index.names = dict(self.names)
+            index.order = self.order
+            index._position = self._position
+            index._terms = dict(self._terms)
+        index._shared = set(index.postings)
+        index.apply(diff, new_df)
+        return index
+
+    def apply(self, diff: CatalogDiff, new_df: pd.DataFrame) -> None:
+        """Bring the index up to date with ``new_df`` given the diff to it"""
+        with self._lock:
+            for code in diff.removed + diff.changed:
+                self._remove(code)
+
+            updated = set(diff.added) | set(diff.changed)
+            if updated:
+                codes = new_df["Course Code"].astype(str).str.strip()
+                rows = new_df[codes.isin(updated) & ~codes.duplicated()]
+                for row in rows.to_dict(orient="records"):
+                    self._add(row)
+
+            if diff.added or diff.removed or not self.order:
+                codes = new_df["Course Code"].astype(str).str.strip()
+                self.order = codes[~codes.duplicated()].tolist()
+                self._position = {code: i for i, code in enumerate(self.order)}
+
+    def _add(self, row) -> None:
+        code = str(row["Course Code"]).strip()
+        terms: Dict[str, float] = {}
+        for field, weight in FIELD_WEIGHTS:
+            tokens = _code_tokens(code) if field == "Course Code" else tokenize(row.get(field))
+            for token in tokens:
+                if terms.get(token, 0.0) < weight:
+                    terms[token] = weight
+        for token, weight in terms.items():
+            posting = self._posting(token)
+            if posting is None:
+                posting = self.postings[token] = {}
+                bisect.insort(self.vocabulary, token)
+            posting[code] = weight
+        self._terms[code] = terms
+        name = row.get("Course Name")
+        self.names[code] = "" if name is None or (isinstance(name, float) and name != name) else str(name).strip()
+
+    def _remove(self, code: str) -> None:
+        for token in self._terms.pop(code, {}):
+            posting = self._posting(token)
+            posting.pop(code, None)
+            if not posting:
+                del self.postings[token]
+                del self.vocabulary[bisect.bisect_left(self.vocabulary, token)]
+        self.names.pop(code, None)
+
+    def _posting(self, token: str) -> Optional[Dict[str, float]]:
+        """The posting of ``token``, safe to change"""
+        posting = self.postings.get(token)
+        if posting is not None and token in self._shared:
+            posting = self.postings[token] = dict(posting)
+            self._shared.discard(token)
+        return posting
+
+    def _expand(self, token: str) -> Iterable[str]:
+        """Vocabulary terms starting with ``token``"""
+        vocabulary = self.vocabulary
+        for i in range(bisect.bisect_left(vocabulary, token), len(vocabulary)):
+            if not vocabulary[i].startswith(token):
+                break
+            yield vocabulary[i]
+
+    def search(self, query: str, limit: Optional[int] = 20, offset: int = 0) -> List[SearchHit]:
+        """Courses matching every token of ``query``, best first.
+
+        Query tokens match whole tokens or token prefixes ("prog" finds
+        "Programming"); a prefix match counts for less the less of the token
+        it covers. Rarer tokens and code/name matches score
+        higher, and an exact course code always comes first.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        with self._lock:
+            return self._search(tokens, str(query), limit, offset)
+
+    def _search(self, tokens, query, limit, offset):
+        n_courses = max(len(self.order), 1)
+        scores: Optional[Dict[str, float]] = None
+        for token in dict.fromkeys(tokens):
+            token_scores: Dict[str, float] = {}
+            for term in self._expand(token):
+                posting = self.postings[term]
+                factor = math.log(1.0 + n_courses / len(posting)) * (0.5 + 0.5 * len(token) / len(term))
+                for code, weight in posting.items():
+                    score = weight * factor
+                    if score > token_scores.get(code, 0.0):
+                        token_scores[code] = score
+            if scores is None:
+                scores = token_scores
+            else:
+                scores = {code: score + token_scores[code] for code, score in scores.items() if code in token_scores}
+            if not scores:
+                return []
+
+        exact = re.sub(r"\s+", "", query).upper()
+        if exact in scores:
+            scores[exact] += 1000.0
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], self._position.get(item[0], 0)))
+        end = None if limit is None else offset + limit
+        return [SearchHit(code, self.names.get(code, ""), score) for code, score in ranked[offset:end]]
+
+    def options(self, query: str = "", keep: Sequence[str] = (), limit: int = 50) -> List[str]:
+        """Course codes to offer in a selector.
+
+        The codes in ``keep`` (e.g. the current selection) come first, then
+        the best matches for ``query``, up to ``limit`` codes in total. With
+        an empty query the whole catalog follows, so that no course is out
+        of reach of a selector that is not being searched.
+        """
+        options = list(dict.fromkeys(keep))
+        if query.strip():
+            found = [hit.code for hit in self.search(query, limit=limit)]
+            total = max(limit, len(keep))
+        else:
+            found = self.order
+            total = len(keep) + len(found)
+        seen = set(options)
+        for code in found:
+            if len(options) >= total:
+                break
+            if code not in seen:
+                options.append(code)
+                seen.add(code)
+        return options
+
+
+_indexes: Dict[tuple, Tuple[object, CourseSearchIndex]] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_search_index(store, snapshot=None) -> CourseSearchIndex:
+    """Return the search index of ``snapshot`` (default: the current version)
+    of ``store``'s catalog.
+
+    Each version gets its own index, which is never changed afterwards, so
+    callers can search it without holding any lock while other sessions
+    move on to newer versions. The index is built once per process; later
+    versions are derived from the newest one with the diff between them,
+    so an edit re-indexes only the rows it touched.
+    """
+    if snapshot is None:
+        snapshot = store.current()
+    key = (store.path, getattr(store, "table", None))
+    with _indexes_lock:
+        indexed, index = _indexes.get(key, (None, None))
+        if indexed is snapshot:
+            return index
+        if index is None:
+            index = CourseSearchIndex()
+            index.build(snapshot.df)
+        else:
+            index = index.derive(diff_catalogs(indexed.df, snapshot.df), snapshot.df)
+        if indexed is None or snapshot.version >= indexed.version:
+            _indexes[key] = (snapshot, index)
+        return index
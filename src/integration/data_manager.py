@@ -1,6 +1,9 @@
 import pandas as pd
 import os
 from typing import Dict, List, Optional
+from integration.catalog_store import get_store
+from integration.compiled_catalog import CompiledCatalog
+from integration.prerequisites import prerequisite_codes
 
 class DataManager:
     def __init__(self, test_mode=False):
@@ -8,6 +11,7 @@ class DataManager:
         self.policies_df = None
         self.cyber_courses_df = None
         self.test_mode = test_mode
+        self._compiled = None
         self._load_data()
 
     def _load_data(self) -> None:
@@ -19,12 +23,23 @@ class DataManager:
                 self.policies_df = pd.DataFrame(TEST_POLICIES)
                 self.cyber_courses_df = pd.DataFrame([])  # Empty DataFrame for testing
             else:
-                self.courses_df = pd.read_csv("courses.csv", encoding='latin1')
-                self.policies_df = pd.read_csv("policies.csv", encoding='latin1')
+                # Goes through the configured storage backend (CSV or SQLite)
+                self.courses_df = get_store("courses.csv").current().df
+                self.policies_df = get_store("policies.csv").current().df
                 self.cyber_courses_df = pd.read_csv("Cyber Security Courses.csv", encoding='latin1')
         except Exception as e:
             raise Exception(f"Error loading data files: {str(e)}")
 
+    def _catalog(self) -> CompiledCatalog:
+        """``courses_df`` compiled, so prerequisite expressions are parsed once"""
+        if self._compiled is None or self._compiled[0] is not self.courses_df:
+            self._compiled = (self.courses_df, CompiledCatalog.from_frame(self.courses_df.reset_index(drop=True)))
+        return self._compiled[1]
+
+    def _unmet_prerequisites(self, position: int, passed_courses: List[str]) -> List[str]:
+        catalog = self._catalog()
+        return catalog.unmet_prerequisites(position, catalog.mark(passed_courses))
+
     def get_course_info(self, course_code: str) -> Optional[Dict]:
         """Get detailed information about a specific course"""
         if self.courses_df is None:
@@ -42,8 +57,7 @@ class DataManager:
         if course.empty:
             return []
             
-        prereqs = str(course.iloc[0]["Prerequisites"]).split(",")
-        return [p.strip() for p in prereqs if p.strip()]
+        return list(prerequisite_codes(str(course.iloc[0]["Prerequisites"])))
 
     def get_credit_limit(self, cgpa: float, semester: str) -> int:
         """Get credit hour limit based on CGPA"""
@@ -68,19 +82,17 @@ class DataManager:
 
     def validate_course_selection(self, course_code: str, passed_courses: List[str], semester: str) -> Dict:
         """Validate if a course can be taken"""
-        course = self.courses_df[self.courses_df["Course Code"] == course_code]
-        if course.empty:
+        matches = (self.courses_df["Course Code"] == course_code).to_numpy().nonzero()[0]
+        if not len(matches):
             return {"valid": False, "reason": f"Course {course_code} not found"}
             
-        course = course.iloc[0]
+        course = self.courses_df.iloc[matches[0]]
         offered = str(course["Semester Offered"]).strip().upper()
         if semester.upper() not in offered and offered != "BOTH":
             return {"valid": False, "reason": f"Course {course_code} is not offered in {semester} semester"}
             
-        prereqs = str(course["Prerequisites"]).split(",")
-        prereqs = [p.strip() for p in prereqs if p.strip()]
-        if any(p not in passed_courses for p in prereqs):
-            missing = [p for p in prereqs if p not in passed_courses]
+        missing = self._unmet_prerequisites(matches[0], passed_courses)
+        if missing:
             return {"valid": False, "reason": f"Missing prerequisites: {', '.join(missing)}"}
             
         return {"valid": True, "reason": "Course can be taken"}
@@ -88,7 +100,7 @@ class DataManager:
     def get_available_courses(self, passed_courses: List[str], semester: str, cgpa: float) -> List[Dict]:
         """Get available courses for a student based on their profile"""
         available = []
-        for _, course in self.courses_df.iterrows():
+        for position, (_, course) in enumerate(self.courses_df.iterrows()):
             code = str(course["Course Code"]).strip()
             offered = str(course["Semester Offered"]).strip().upper()
             
@@ -97,9 +109,7 @@ class DataManager:
                 continue
                 
             # Check prerequisites
-            prereqs = str(course["Prerequisites"]).split(",")
-            prereqs = [p.strip() for p in prereqs if p.strip()]
-            if any(p not in passed_courses for p in prereqs):
+            if self._unmet_prerequisites(position, passed_courses):
                 continue
                 
             available.append(course.to_dict())
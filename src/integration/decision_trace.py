@@ -0,0 +1,521 @@
+import argparse
+import atexit
+import glob
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Callable, Dict, Iterator, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+# Add src/ to sys.path so this also runs as a script
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# A decision is one unsigned 32-bit record:
+#   bits 0-2   the check that decided it (the failed one, or SELECTED)
+#   bit  3     set in the failed-course (retake) pass
+#   bits 4-31  course id in the catalog
+# Credits so far are not stored: the reader adds up the credit hours of the
+# selected courses, which are saved with the catalog's course codes.
+ALREADY_PASSED = 0
+SEMESTER = 1
+PREREQUISITES = 2
+COREQUISITES = 3
+CREDIT_LIMIT = 4
+SELECTED = 5
+RETAKE = 8
+COURSE_SHIFT = 4
+
+CHECKS = ("already passed", "semester", "prerequisites", "co-requisites", "credit limit", "selected")
+
+DEFAULT_CAPACITY = 1 << 17           # records held in memory between flushes
+DEFAULT_SEGMENT_BYTES = 16 << 20     # start a new segment past this size
+DEFAULT_SEGMENTS = 8                 # segments kept in the directory
+DEFAULT_FLUSH_INTERVAL = 5.0         # seconds a finished run may wait in memory
+
+# Index entries. A catalog table is followed by the credit hours of every
+# course (uint16) and the NUL-separated course codes; a run is followed by
+# its semester and student id. A hit (advice served from a cache) is
+# followed by its semester, student id and the reference of the run that
+# computed the advice.
+_TABLE = struct.Struct("<BIII")       # kind, table, courses, bytes of codes
+_RUN = struct.Struct("<BQIIddHBH")    # kind, offset, count, catalog version, time, cgpa, credit limit,
+                                      # bytes of semester, bytes of student id
+_HIT = struct.Struct("<BIddBHB")      # kind, catalog version, time, cgpa, bytes of semester,
+                                      # bytes of student id, bytes of reference
+_TABLE_KIND, _RUN_KIND, _HIT_KIND = 1, 2, 3
+# Credit limit of runs without one (the cohort eligibility pass)
+NO_LIMIT = 0xFFFF
+
+# Recent catalogs whose table was written to the current segment
+_TABLE_CACHE = 8
+
+
+class Decision(NamedTuple):
+    code: str
+    check: str
+    retake: bool
+    credits: int    # credits selected so far, after this decision
+
+    @property
+    def selected(self) -> bool:
+        return self.check == "selected"
+
+    def describe(self, semester: str = "") -> str:
+        """The decision as the engine explains it"""
+        if self.check == "already passed":
+            return f"{self.code} is not recommended because it was already passed."
+        if self.check == "semester":
+            return f"{self.code} is unavailable this semester." if self.retake \
+                else f"{self.code} is not offered in the {semester} semester."
+        if self.check in ("prerequisites", "co-requisites"):
+            return f"{self.code} is not recommended due to unmet {self.check[:-1]}(s)."
+        if self.check == "credit limit":
+            return f"{self.code} is not added because it would exceed the credit limit."
+        if self.retake:
+            return f"{self.code} is prioritized because you failed it previously and met its prerequisites."
+        return f"{self.code} is recommended."
+
+
+class TraceRun(NamedTuple):
+    student_id: str
+    catalog_version: int
+    time: float
+    cgpa: float
+    semester: str
+    credit_limit: int
+    decisions: List[Decision]
+    # "<segment>#<n>", the n-th run of the segment
+    reference: str = ""
+    # For advice served from a cache, the reference of the run that computed
+    # it; ``decisions`` are that run's, or empty once its segment is deleted
+    served_from: Optional[str] = None
+
+
+def decode(records: Sequence[int], codes: Sequence[str], credits: Sequence[int]) -> List[Decision]:
+    """The decisions of one run, with the credits selected so far"""
+    decisions, total = [], 0
+    for record in records:
+        course_id, check = record >> COURSE_SHIFT, record & 7
+        if check == SELECTED:
+            total += credits[course_id]
+        decisions.append(Decision(codes[course_id], CHECKS[check], bool(record & RETAKE), total))
+    return decisions
+
+
+class TraceRecorder:
+    """Records every decision of advising runs to a rotating binary log.
+
+    ``begin`` returns the ``append`` of a per-thread list that
+    ``select_courses`` feeds one small integer per decision, which is all
+    the advising loop pays for. ``end`` copies the run into a preallocated
+    array of ``capacity`` records with one slice assignment and packs a
+    fixed-size index entry; the array and the index are written out in one
+    call each when the array is full, at most ``flush_interval`` seconds
+    after a run ended (a timer flushes an idle recorder), or on ``close``.
+    ``end`` returns the run's reference; ``hit`` records that advice
+    computed by that run was served again, e.g. from a cache.
+
+    Each recorder writes its own segments, ``<directory>/<start>-<pid>.rec``
+    for the records and ``.idx`` next to it for the index: the codes and
+    credit hours of each catalog advised against (once per segment) and an
+    entry per run with the student id, catalog version, profile summary and
+    the position of its records. A segment is closed past
+    ``segment_bytes`` and the recorder keeps its newest ``segments``;
+    segments of other processes are only deleted once those have exited.
+    """
+
+    def __init__(self, directory: str, capacity: int = DEFAULT_CAPACITY,
+                 segment_bytes: int = DEFAULT_SEGMENT_BYTES, segments: int = DEFAULT_SEGMENTS,
+                 flush_interval: float = DEFAULT_FLUSH_INTERVAL):
+        self.directory = os.path.abspath(directory)
+        self.segment_bytes = segment_bytes
+        self.segments = segments
+        self.flush_interval = flush_interval
+        os.makedirs(self.directory, exist_ok=True)
+        self._buffer = array("I", bytes(4 * capacity))
+        self._used = 0
+        self._index = bytearray()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._records = None
+        self._idx = None
+        self._written = 0
+        self._runs = 0
+        self._segment = ""
+        # This recorder's segments, oldest first
+        self._segments: List[str] = []
+        self._tables: "OrderedDict[int, Tuple[object, int]]" = OrderedDict()
+        self._table_ids: Dict[Tuple[str, ...], int] = {}
+        self._last_flush = time.monotonic()
+        self._timer: Optional[threading.Timer] = None
+        self._open_segment()
+
+    def begin(self) -> Callable[[int], None]:
+        """Start a run on this thread; returns the function to record with"""
+        run = getattr(self._local, "run", None)
+        if run is None:
+            run = self._local.run = []
+        run.clear()
+        return run.append
+
+    def end(self, catalog, student_data: Mapping, credit_limit: int, catalog_version: int = 0) -> str:
+        """Finish this thread's run of ``student_data`` against ``catalog``;
+        returns the run's reference"""
+        run = self._local.run
+        semester = student_data["semester"].encode("utf-8")
+        student = str(student_data.get("student_id", "")).encode("utf-8")
+        with self._lock:
+            if self._records is None:
+                run.clear()
+                return ""
+            if self._used + len(run) > len(self._buffer):
+                self._flush()
+            # After the flush, which may have started a new segment
+            table = self._table(catalog)
+            offset = self._written + self._used
+            if len(run) > len(self._buffer):
+                self._write(array("I", run))
+            else:
+                self._buffer[self._used:self._used + len(run)] = array("I", run)
+                self._used += len(run)
+            self._index += _RUN.pack(_RUN_KIND, offset, len(run), catalog_version, time.time(),
+                                     student_data["cgpa"], NO_LIMIT if credit_limit >= NO_LIMIT else int(credit_limit),
+                                     len(semester), len(student))
+            self._index += semester + student + bytes([table])
+            reference = self._reference()
+            self._written_entry()
+        run.clear()
+        return reference
+
+    def hit(self, reference: str, student_data: Mapping, catalog_version: int = 0) -> None:
+        """Record that the advice of run ``reference`` was served to ``student_data``"""
+        if not reference:
+            return
+        semester = student_data["semester"].encode("utf-8")
+        student = str(student_data.get("student_id", "")).encode("utf-8")
+        raw = reference.encode("utf-8")
+        with self._lock:
+            if self._records is None:
+                return
+            self._index += _HIT.pack(_HIT_KIND, catalog_version, time.time(), student_data["cgpa"],
+                                     len(semester), len(student), len(raw))
+            self._index += semester + student + raw
+            self._written_entry()
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._records is not None:
+                self._flush()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if self._records is None:
+                return
+            self._flush()
+            self._records.close()
+            self._idx.close()
+            self._records = self._idx = None
+
+    # --------------------------------------------------------------- helpers
+
+    def _reference(self) -> str:
+        self._runs += 1
+        return f"{self._segment}#{self._runs - 1}"
+
+    def _written_entry(self) -> None:
+        # Called with the lock held after an index entry was added
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self._flush()
+        elif self._timer is None:
+            self._timer = threading.Timer(self.flush_interval, self._flush_idle)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _flush_idle(self) -> None:
+        with self._lock:
+            self._timer = None
+            if self._records is not None and (self._used or self._index):
+                self._flush()
+
+    def _table(self, catalog) -> int:
+        # Decisions hold course ids; the reader needs that catalog's codes
+        entry = self._tables.get(id(catalog))
+        if entry is not None and entry[0] is catalog:
+            self._tables.move_to_end(id(catalog))
+            return entry[1]
+        codes = tuple(catalog.code(i) for i in range(len(catalog)))
+        table = self._table_ids.get(codes)
+        if table is None:
+            if len(self._table_ids) == 256:
+                # One byte per run names the table; start afresh
+                self._flush(rotate=True)
+            table = self._table_ids[codes] = len(self._table_ids)
+            raw = "\0".join(codes).encode("utf-8")
+            credits = array("H", [min(int(c), 0xFFFF) for c in catalog.credits])
+            if sys.byteorder != "little":
+                credits.byteswap()
+            self._index += _TABLE.pack(_TABLE_KIND, table, len(codes), len(raw)) + credits.tobytes() + raw
+        self._tables[id(catalog)] = (catalog, table)
+        while len(self._tables) > _TABLE_CACHE:
+            self._tables.popitem(last=False)
+        return table
+
+    def _write(self, records: array) -> None:
+        if sys.byteorder != "little":
+            records = array("I", records)
+            records.byteswap()
+        self._records.write(records)
+        self._written += len(records)
+
+    def _flush(self, rotate: bool = False) -> None:
+        if self._used:
+            self._write(self._buffer[:self._used])
+            self._used = 0
+        self._records.flush()
+        if self._index:
+            # Index entries go after the records they point to
+            self._idx.write(self._index)
+            self._index.clear()
+        self._idx.flush()
+        self._last_flush = time.monotonic()
+        if rotate or self._written * 4 >= self.segment_bytes:
+            self._records.close()
+            self._idx.close()
+            self._open_segment()
+
+    def _open_segment(self) -> None:
+        self._segment = f"{time.time_ns():020d}-{os.getpid()}"
+        name = os.path.join(self.directory, self._segment)
+        self._records = open(name + ".rec", "ab")
+        self._idx = open(name + ".idx", "ab")
+        self._written = 0
+        self._runs = 0
+        self._tables.clear()
+        self._table_ids.clear()
+        self._segments.append(name)
+        # Other recorders, in this or other processes, may still be writing
+        # to the rest of the directory: delete only this recorder's closed
+        # segments and those left behind by processes that have exited
+        stale = self._segments[:-self.segments]
+        del self._segments[:-self.segments]
+        others = [old for old in segment_names(self.directory)[:-self.segments]
+                  if old not in self._segments and not _process_alive(old)]
+        for old in stale + others:
+            for path in (old + ".rec", old + ".idx"):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+
+def _process_alive(segment: str) -> bool:
+    """Whether the process that wrote ``segment`` may still be writing to it"""
+    try:
+        pid = int(segment.rsplit("-", 1)[1])
+    except (IndexError, ValueError):
+        return True
+    if pid == os.getpid():
+        # Another recorder of this process; it prunes its own segments
+        return True
+    if os.name != "posix":
+        # There is no harmless existence check elsewhere; keep the segment
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        pass
+    return True
+
+
+def segment_names(directory: str) -> List[str]:
+    """Segments in ``directory``, oldest first (paths without the extension)"""
+    return sorted(path[:-4] for path in glob.glob(os.path.join(directory, "*.idx")))
+
+
+def _entry_size(raw: bytes, position: int) -> Optional[int]:
+    """Size of the index entry at ``position``, or None if it is cut off"""
+    kind = raw[position]
+    header = {_TABLE_KIND: _TABLE, _RUN_KIND: _RUN, _HIT_KIND: _HIT}.get(kind)
+    if header is None or position + header.size > len(raw):
+        return None
+    fields = header.unpack_from(raw, position)
+    if kind == _TABLE_KIND:
+        size = header.size + 2 * fields[2] + fields[3]
+    elif kind == _HIT_KIND:
+        size = header.size + sum(fields[-3:])
+    else:
+        # Followed by the table byte
+        size = header.size + sum(fields[-2:]) + 1
+    return size if position + size <= len(raw) else None
+
+
+def _read_index(raw: bytes) -> Iterator[tuple]:
+    """Decode the entries of an index file.
+
+    A recorder that is still writing, or was killed while writing, can
+    leave a partial entry at the end; reading stops before it.
+    """
+    position = 0
+    while position < len(raw):
+        if _entry_size(raw, position) is None:
+            return
+        if raw[position] == _TABLE_KIND:
+            _, table, n_courses, n_bytes = _TABLE.unpack_from(raw, position)
+            position += _TABLE.size
+            credits = array("H")
+            credits.frombytes(raw[position:position + 2 * n_courses])
+            if sys.byteorder != "little":
+                credits.byteswap()
+            position += 2 * n_courses
+            codes = raw[position:position + n_bytes].decode("utf-8").split("\0") if n_courses else []
+            position += n_bytes
+            yield _TABLE_KIND, table, codes, credits
+        elif raw[position] == _HIT_KIND:
+            _, version, when, cgpa, n_semester, n_student, n_reference = _HIT.unpack_from(raw, position)
+            position += _HIT.size
+            semester = raw[position:position + n_semester].decode("utf-8")
+            position += n_semester
+            student = raw[position:position + n_student].decode("utf-8")
+            position += n_student
+            reference = raw[position:position + n_reference].decode("utf-8")
+            position += n_reference
+            yield _HIT_KIND, student, version, when, cgpa, semester, reference
+        else:
+            _, offset, count, version, when, cgpa, limit, n_semester, n_student = _RUN.unpack_from(raw, position)
+            position += _RUN.size
+            semester = raw[position:position + n_semester].decode("utf-8")
+            position += n_semester
+            student = raw[position:position + n_student].decode("utf-8")
+            position += n_student
+            table = raw[position]
+            position += 1
+            yield _RUN_KIND, student, version, when, cgpa, limit, semester, table, offset, count
+
+
+def _read_segment(segment: str, student_id: Optional[str] = None, catalog_version: Optional[int] = None,
+                  run_number: Optional[int] = None) -> Iterator[Tuple[int, tuple]]:
+    """(run number, entry) of the matching runs and hits of one segment,
+    with the records of runs decoded"""
+    try:
+        with open(segment + ".idx", "rb") as fh:
+            raw = fh.read()
+    except OSError:
+        return
+    tables, wanted, number = {}, [], 0
+    for entry in _read_index(raw):
+        if entry[0] == _TABLE_KIND:
+            tables[entry[1]] = entry[2:]
+            continue
+        if entry[0] == _RUN_KIND:
+            number += 1
+            if run_number is not None and number - 1 != run_number:
+                continue
+        elif run_number is not None:
+            continue
+        if (student_id is None or entry[1] == student_id) and (catalog_version is None or entry[2] == catalog_version):
+            wanted.append((number - 1, entry))
+    if not wanted:
+        return
+    with open(segment + ".rec", "rb") as fh:
+        for number, entry in wanted:
+            if entry[0] == _HIT_KIND:
+                yield number, entry
+                continue
+            student, version, when, cgpa, limit, semester, table, offset, count = entry[1:]
+            fh.seek(offset * 4)
+            records = array("I")
+            records.frombytes(fh.read(count * 4))
+            if sys.byteorder != "little":
+                records.byteswap()
+            codes, credits = tables[table]
+            yield number, (_RUN_KIND, student, version, when, cgpa, limit, semester,
+                           decode(records, codes, credits))
+
+
+def find_run(directory: str, reference: str) -> Optional[TraceRun]:
+    """The run with the reference ``reference``, if its segment is still kept"""
+    segment, _, number = reference.rpartition("#")
+    if not segment or not number.isdigit() or os.sep in segment or "/" in segment:
+        return None
+    for _, (_, student, version, when, cgpa, limit, semester, decisions) in _read_segment(
+            os.path.join(directory, segment), run_number=int(number)):
+        return TraceRun(student, version, when, cgpa, semester, limit, decisions, reference)
+    return None
+
+
+def read_runs(directory: str, student_id: Optional[str] = None,
+              catalog_version: Optional[int] = None) -> Iterator[TraceRun]:
+    """Runs recorded in ``directory``, oldest first, optionally only one
+    student's or one catalog version's.
+
+    Advice served from a cache shows up as a run too, with ``served_from``
+    set and the decisions of the run that computed it.
+    """
+    for segment in segment_names(directory):
+        name = os.path.basename(segment)
+        for number, entry in _read_segment(segment, student_id, catalog_version):
+            if entry[0] == _RUN_KIND:
+                student, version, when, cgpa, limit, semester, decisions = entry[1:]
+                yield TraceRun(student, version, when, cgpa, semester, limit, decisions, f"{name}#{number}")
+                continue
+            student, version, when, cgpa, semester, reference = entry[1:]
+            original = find_run(directory, reference)
+            yield TraceRun(student, version, when, cgpa, semester,
+                           original.credit_limit if original is not None else 0,
+                           original.decisions if original is not None else [], "", reference)
+
+
+_recorders: Dict[str, TraceRecorder] = {}
+_recorders_lock = threading.Lock()
+
+
+def get_trace_recorder(directory: Optional[str] = None) -> Optional[TraceRecorder]:
+    """Return the process-wide recorder for ``directory`` (default:
+    ``KBS_DECISION_TRACE``), or None if tracing is not configured"""
+    directory = directory if directory is not None else os.environ.get("KBS_DECISION_TRACE", "")
+    if not directory.strip():
+        return None
+    key = os.path.abspath(directory)
+    with _recorders_lock:
+        recorder = _recorders.get(key)
+        if recorder is None:
+            recorder = _recorders[key] = TraceRecorder(key)
+            atexit.register(recorder.close)
+        return recorder
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Show the recorded decisions of advising runs")
+    parser.add_argument("directory", help="the KBS_DECISION_TRACE directory")
+    parser.add_argument("--student", help="only this student id")
+    parser.add_argument("--catalog-version", type=int, help="only runs against this catalog version")
+    parser.add_argument("--last", type=int, default=1, help="how many of the latest matching runs to show")
+    args = parser.parse_args(argv)
+
+    runs = list(read_runs(args.directory, args.student, args.catalog_version))
+    if not runs:
+        print("No matching runs.")
+        return
+    for run in runs[-args.last:]:
+        when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(run.time))
+        print(f"{when}  student {run.student_id or '-'}  catalog v{run.catalog_version}  "
+              f"CGPA {run.cgpa}  {run.semester}  "
+              f"{'no credit limit' if run.credit_limit == NO_LIMIT else f'limit {run.credit_limit} credits'}")
+        if run.served_from is not None:
+            print(f"       served from the cache; computed by run {run.served_from}"
+                  f"{'' if run.decisions else ' (no longer kept)'}")
+        for i, decision in enumerate(run.decisions, 1):
+            print(f"{i:5d}  {decision.credits:3d} cr  {decision.describe(run.semester)}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
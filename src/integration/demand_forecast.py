@@ -0,0 +1,194 @@
+import argparse
+import os
+import re
+import sys
+import time
+from typing import Dict, Iterable, List, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+
+# Add src/ to sys.path so this also runs as a script
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from integration.compiled_catalog import CompiledCatalog, semester_bit
+from integration.prerequisites import Requirement
+
+# Students are processed in blocks of this size to bound memory use
+DEFAULT_CHUNK_SIZE = 5000
+
+
+def split_courses(value) -> List[str]:
+    """Split a cohort-file course list ("MAT111; CSE014" or "MAT111,CSE014")"""
+    if value is None or (isinstance(value, float) and value != value):
+        return []
+    return [c.strip() for c in re.split(r"[;,]", str(value)) if c.strip()]
+
+
+def load_cohort(path: str) -> List[Dict]:
+    """Read a cohort CSV with student_id, cgpa, semester, passed_courses, failed_courses"""
+    df = pd.read_csv(path, dtype={"student_id": str})
+    df.columns = [str(c).strip() for c in df.columns]
+    return [
+        {
+            "student_id": row["student_id"],
+            "cgpa": float(row["cgpa"]),
+            "semester": str(row["semester"]).strip().split()[0].upper(),
+            "passed_courses": split_courses(row.get("passed_courses")),
+            "failed_courses": split_courses(row.get("failed_courses")),
+        }
+        for row in df.to_dict(orient="records")
+    ]
+
+
+def _membership(catalog: CompiledCatalog, lists: List[List[str]]) -> np.ndarray:
+    rows, cols = [], []
+    for i, codes in enumerate(lists):
+        for code in codes:
+            code_id = catalog.code_ids.get(code.strip())
+            if code_id is not None:
+                rows.append(i)
+                cols.append(code_id)
+    matrix = np.zeros((len(lists), len(catalog.codes)), dtype=bool)
+    matrix[rows, cols] = True
+    return matrix
+
+
+def _requirement_met(requirement: Requirement, passed: np.ndarray) -> np.ndarray:
+    """``Requirement.satisfied`` for every column of a (codes x students) table"""
+    rows = passed[list(requirement.code_ids)].astype(np.int64)
+    met = np.ones(passed.shape[1], dtype=bool)
+    for clause in requirement.clauses:
+        clause_met = np.zeros_like(met)
+        for mask, need in clause:
+            bits = [i for i in range(len(requirement.code_ids)) if mask >> i & 1]
+            clause_met |= rows[bits].sum(axis=0) >= need
+        met &= clause_met
+    return met
+
+
+def _forecast_chunk(catalog: CompiledCatalog, students: List[Mapping], limits: np.ndarray,
+                    eligible: np.ndarray) -> np.ndarray:
+    """Advise one block of students at once.
+
+    Adds the block's eligible counts to ``eligible`` and returns the
+    (courses x students) matrix of recommendations.
+
+    The loops run over courses, in the engine's order, with every check done
+    for all students of the block in one NumPy operation; the result per
+    student is the same as ``select_courses``.
+    """
+    n_courses = len(catalog)
+    code_ids = catalog.column("course_code_ids")
+    credits = catalog.column("credits").astype(np.int64)
+    # Course-major layout: each per-course check below reads one contiguous row
+    passed = np.ascontiguousarray(_membership(catalog, [s["passed_courses"] for s in students]).T)
+    failed = np.ascontiguousarray(_membership(catalog, [s["failed_courses"] for s in students]).T)
+    semester_bits = np.array([semester_bit(s["semester"]) for s in students], dtype=np.uint8)
+    open_courses = (catalog.column("semesters")[:, None] & semester_bits[None, :]) != 0
+    open_courses &= ~passed[code_ids]
+    for course_id in range(n_courses):
+        requirement = catalog.requirements.get(course_id)
+        if requirement is not None:
+            open_courses[course_id] &= _requirement_met(requirement, passed)
+            continue
+        prereqs = catalog.prerequisite_ids(course_id)
+        if len(prereqs):
+            open_courses[course_id] &= passed[list(prereqs)].all(axis=0)
+    eligible += open_courses.sum(axis=1)
+
+    total = np.zeros(len(students), dtype=np.int64)
+    added = np.zeros_like(passed)
+    chosen = np.zeros((n_courses, len(students)), dtype=bool)
+    # Step 1: failed courses first
+    for course_id in np.flatnonzero(failed[code_ids].any(axis=1)):
+        code_id = code_ids[course_id]
+        take = failed[code_id] & open_courses[course_id] & (total + credits[course_id] <= limits)
+        total += take * credits[course_id]
+        added[code_id] |= take
+        chosen[course_id] |= take
+    # Step 2: every other eligible course, in catalog order
+    for course_id in range(n_courses):
+        code_id = code_ids[course_id]
+        take = open_courses[course_id] & ~added[code_id] & (total + credits[course_id] <= limits)
+        for coreq in catalog.corequisite_ids(course_id):
+            take &= passed[coreq] | added[coreq]
+        total += take * credits[course_id]
+        added[code_id] |= take
+        chosen[course_id] |= take
+    return chosen
+
+
+def forecast_demand(catalog: CompiledCatalog, students: Iterable[Mapping], policies_df: pd.DataFrame,
+                    chunk_size: int = DEFAULT_CHUNK_SIZE) -> pd.DataFrame:
+    """Per-course eligible and recommended counts for a whole cohort.
+
+    "Eligible" means offered in the student's semester, not yet passed and
+    with its prerequisites met; "Recommended" is what the advising rules
+    would pick within the student's credit limit. Recommended counts are also
+    broken down by the credit-limit band from ``policies_df``.
+    """
+    from Inference_engine_KBS import credit_limit_for, credit_limit_rules
+
+    rules = credit_limit_rules(policies_df)
+    bands = sorted({limit for _, limit in rules} | {credit_limit_for(float("nan"), rules)})
+    n_courses = len(catalog)
+    eligible = np.zeros(n_courses, dtype=np.int64)
+    by_band = {band: np.zeros(n_courses, dtype=np.int64) for band in bands}
+    students_per_band = dict.fromkeys(bands, 0)
+    limit_cache: Dict[float, int] = {}
+
+    students = list(students)
+    for start in range(0, len(students), chunk_size):
+        chunk = students[start:start + chunk_size]
+        for student in chunk:
+            if student["cgpa"] not in limit_cache:
+                limit_cache[student["cgpa"]] = credit_limit_for(student["cgpa"], rules)
+        limits = np.array([limit_cache[s["cgpa"]] for s in chunk], dtype=np.int64)
+        recommended = _forecast_chunk(catalog, chunk, limits, eligible)
+        for band in bands:
+            in_band = limits == band
+            by_band[band] += recommended[:, in_band].sum(axis=1)
+            students_per_band[band] += int(in_band.sum())
+
+    report = pd.DataFrame({
+        "Course Code": [catalog.code(i) for i in range(n_courses)],
+        "Course Name": catalog.names,
+        "Credit Hours": catalog.column("credits"),
+        "Semester Offered": catalog.offered,
+        "Eligible": eligible,
+        "Recommended": sum(by_band.values()),
+    })
+    for band in bands:
+        report[f"Recommended ({band} credit limit)"] = by_band[band]
+    report.attrs["students_per_band"] = students_per_band
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Forecast course demand for a cohort of students")
+    parser.add_argument("cohort", help="CSV with student_id, cgpa, semester, passed_courses, failed_courses")
+    parser.add_argument("--courses", default="data/courses.csv")
+    parser.add_argument("--policies", default="data/policies.csv")
+    parser.add_argument("--output", default="demand_forecast.csv")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    from integration.catalog_store import get_store
+    from integration.shared_catalog import get_shared_catalog
+
+    started = time.perf_counter()
+    catalog = get_shared_catalog(get_store(args.courses))
+    policies_df = get_store(args.policies).current().df.fillna("")
+    students = load_cohort(args.cohort)
+    report = forecast_demand(catalog, students, policies_df, chunk_size=args.chunk_size)
+    report.to_csv(args.output, index=False)
+    elapsed = time.perf_counter() - started
+
+    print(f"Forecast for {len(students)} students written to {args.output} in {elapsed:.2f}s")
+    for band, count in report.attrs["students_per_band"].items():
+        print(f"  {count} students with a {band} credit limit")
+
+
+if __name__ == "__main__":
+    main()
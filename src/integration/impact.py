@@ -0,0 +1,216 @@
+import argparse
+import os
+import sys
+import time
+from typing import Dict, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Add src/ to sys.path so this also runs as a script
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from integration.compiled_catalog import CompiledCatalog, semester_bit
+from integration.course_index import CatalogDiff, diff_catalogs
+from integration.demand_forecast import _requirement_met
+
+IMPACT_COLUMNS = ["Student", "Semester", "CGPA", "Because of", "Added", "Dropped", "Credits before",
+                  "Credits after"]
+
+
+class DependencyIndex:
+    """Reverse index from courses to the stored profiles that depend on them.
+
+    The engine reads a course's row (semester, prerequisites, co-requisites,
+    credits) for every student who has not passed it; for the others it
+    stops at "already passed". The index keeps, per course code, the
+    profiles that passed it, so ``dependents(code)`` are all the others.
+    """
+
+    def __init__(self, profiles: Sequence[Mapping]):
+        self.profiles = list(profiles)
+        self.semester_bits = np.array([semester_bit(p["semester"]) for p in self.profiles], dtype=np.uint8)
+        passed_by: Dict[str, List[int]] = {}
+        for i, profile in enumerate(self.profiles):
+            for code in profile["passed_courses"]:
+                passed_by.setdefault(code.strip(), []).append(i)
+        self.passed_by = {code: np.unique(np.array(rows, dtype=np.int64)) for code, rows in passed_by.items()}
+
+    def __len__(self) -> int:
+        return len(self.profiles)
+
+    def dependents(self, code: str) -> np.ndarray:
+        """Indices of the profiles whose eligibility depends on ``code``'s row"""
+        passed = self.passed_by.get(code)
+        everyone = np.arange(len(self.profiles))
+        return everyone if passed is None else np.setdiff1d(everyone, passed, assume_unique=True)
+
+    def passed_matrix(self, catalog: CompiledCatalog, rows: np.ndarray) -> np.ndarray:
+        """(codes x profiles) membership table of the passed courses of the profiles ``rows``"""
+        matrix = np.zeros((len(catalog.codes), len(rows)), dtype=bool)
+        for code, passed in self.passed_by.items():
+            code_id = catalog.code_ids.get(code)
+            if code_id is not None:
+                matrix[code_id] = np.isin(rows, passed, assume_unique=True)
+        return matrix
+
+
+class ImpactReport(NamedTuple):
+    diff: CatalogDiff
+    profiles: int
+    # Profiles whose eligibility or credits changed and were advised again
+    affected: int
+    # One row per student whose recommendations changed
+    changes: pd.DataFrame
+
+    def describe(self) -> str:
+        return (f"{len(self.diff.touched)} courses changed; {self.affected} of {self.profiles} students "
+                f"re-advised, {len(self.changes)} get different recommendations")
+
+
+def _course_ids(catalog: CompiledCatalog) -> Dict[str, int]:
+    return {catalog.code(course_id): course_id for course_id in range(len(catalog))}
+
+
+def reordered(old_catalog: CompiledCatalog, new_catalog: CompiledCatalog) -> bool:
+    """Whether the courses in both catalogs are listed in a different order"""
+    old_ids, new_ids = _course_ids(old_catalog), _course_ids(new_catalog)
+    return [c for c in old_ids if c in new_ids] != [c for c in new_ids if c in old_ids]
+
+
+def _open(catalog: CompiledCatalog, course_id: int, passed: np.ndarray, semester_bits: np.ndarray) -> np.ndarray:
+    """Whether the course passes the semester and prerequisite checks, per profile"""
+    open_course = (int(catalog.semesters[course_id]) & semester_bits) != 0
+    open_course &= ~passed[catalog.course_code_ids[course_id]]
+    requirement = catalog.requirements.get(course_id)
+    if requirement is not None:
+        open_course &= _requirement_met(requirement, passed)
+    else:
+        prereqs = catalog.prerequisite_ids(course_id)
+        if len(prereqs):
+            open_course &= passed[list(prereqs)].all(axis=0)
+    return open_course
+
+
+def affected_profiles(index: DependencyIndex, old_catalog: CompiledCatalog, new_catalog: CompiledCatalog,
+                      diff: CatalogDiff) -> Dict[int, List[str]]:
+    """Profiles whose advice may differ between the two catalogs, with the
+    changed courses that cause it.
+
+    Only the dependents of a changed course are checked. The advice is
+    decided by which courses are open to the student (semester and
+    prerequisites) and by the credits and co-requisites of the open ones,
+    so a profile is affected when a changed course opens or closes for it,
+    or stays open with other credits or co-requisites. A change of the
+    catalog order affects everyone.
+    """
+    if reordered(old_catalog, new_catalog):
+        return {i: ["catalog order"] for i in range(len(index))}
+
+    old_ids, new_ids = _course_ids(old_catalog), _course_ids(new_catalog)
+    causes: Dict[int, List[str]] = {}
+    for code in sorted(diff.touched):
+        rows = index.dependents(code)
+        if not len(rows):
+            continue
+        bits = index.semester_bits[rows]
+        states = []
+        for catalog, ids in ((old_catalog, old_ids), (new_catalog, new_ids)):
+            course_id = ids.get(code)
+            if course_id is None:
+                states.append((np.zeros(len(rows), dtype=bool), None))
+                continue
+            passed = index.passed_matrix(catalog, rows)
+            detail = (int(catalog.credits[course_id]), catalog.codes_of(catalog.corequisite_ids(course_id)))
+            states.append((_open(catalog, course_id, passed, bits), detail))
+        (old_open, old_detail), (new_open, new_detail) = states
+        changed = old_open != new_open
+        if old_detail is not None and new_detail is not None and old_detail != new_detail:
+            changed |= old_open & new_open
+        for i in rows[changed]:
+            causes.setdefault(int(i), []).append(code)
+    return causes
+
+
+def _recommend(catalog: CompiledCatalog, profile: Mapping, policies_df: pd.DataFrame) -> Tuple[List[str], int]:
+    from Inference_engine_KBS import AdvisingEngine, StudentProfile
+
+    # A what-if comparison, not advice anyone is given: not traced
+    engine = AdvisingEngine(catalog, profile, policies_df, recorder=False)
+    engine.reset()
+    engine.declare(StudentProfile(**profile))
+    engine.run()
+    return [course["Course Code"] for course in engine.recommended_courses], engine.total_credits
+
+
+def catalog_impact(old_df: pd.DataFrame, new_df: pd.DataFrame, profiles, policies_df: pd.DataFrame,
+                   old_catalog: Optional[CompiledCatalog] = None,
+                   new_catalog: Optional[CompiledCatalog] = None) -> ImpactReport:
+    """Advise again only the students a catalog change can affect and
+    report how their recommendations differ.
+
+    ``profiles`` is a ``DependencyIndex`` or a list of student profiles.
+    """
+    index = profiles if isinstance(profiles, DependencyIndex) else DependencyIndex(profiles)
+    diff = diff_catalogs(old_df, new_df)
+    old_catalog = old_catalog if old_catalog is not None else CompiledCatalog.from_frame(old_df)
+    new_catalog = new_catalog if new_catalog is not None else CompiledCatalog.from_frame(new_df)
+    causes = affected_profiles(index, old_catalog, new_catalog, diff) if diff else {}
+
+    rows = []
+    for i in sorted(causes):
+        profile = index.profiles[i]
+        before, credits_before = _recommend(old_catalog, profile, policies_df)
+        after, credits_after = _recommend(new_catalog, profile, policies_df)
+        if before == after and credits_before == credits_after:
+            continue
+        rows.append({
+            "Student": profile.get("student_id") or f"#{i + 1}",
+            "Semester": profile["semester"],
+            "CGPA": profile["cgpa"],
+            "Because of": ", ".join(causes[i]),
+            "Added": ", ".join(c for c in after if c not in before),
+            "Dropped": ", ".join(c for c in before if c not in after),
+            "Credits before": credits_before,
+            "Credits after": credits_after,
+        })
+    return ImpactReport(diff, len(index), len(causes), pd.DataFrame(rows, columns=IMPACT_COLUMNS))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Show whose recommendations a catalog change alters")
+    parser.add_argument("old", help="the catalog before the change (CSV)")
+    parser.add_argument("--new", default="data/courses.csv", help="the catalog after the change")
+    parser.add_argument("--policies", default="data/policies.csv")
+    parser.add_argument("--cohort", help="student profiles (CSV); default: the profiles in the recommendation cache")
+    parser.add_argument("--cache", help="recommendation cache to read profiles from")
+    parser.add_argument("--output", help="also write the changes to this CSV file")
+    args = parser.parse_args(argv)
+
+    from integration.catalog_store import _parse_csv, get_store
+    from integration.demand_forecast import load_cohort
+    from integration.recommendation_cache import get_recommendation_cache
+
+    started = time.perf_counter()
+    with open(args.old, "rb") as fh:
+        old_df = _parse_csv(fh.read())
+    new_df = get_store(args.new).current().df
+    policies_df = get_store(args.policies).current().df.fillna("")
+    if args.cohort:
+        profiles = load_cohort(args.cohort)
+    else:
+        cache = get_recommendation_cache(args.cache)
+        profiles = cache.profiles() if cache is not None else []
+    report = catalog_impact(old_df, new_df, profiles, policies_df)
+    elapsed = time.perf_counter() - started
+
+    if args.output:
+        report.changes.to_csv(args.output, index=False)
+    print(f"{report.describe()} in {elapsed:.2f}s")
+    if len(report.changes):
+        with pd.option_context("display.width", 200, "display.max_rows", None, "display.max_colwidth", 60):
+            print(report.changes.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
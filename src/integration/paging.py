@@ -0,0 +1,89 @@
+import math
+import re
+from typing import List, NamedTuple, Optional, Sequence, Union
+
+import pandas as pd
+
+DEFAULT_PAGE_SIZE = 50
+
+# Explanation groups in display order: (title, pattern after the course code,
+# whether the group starts expanded)
+EXPLANATION_GROUPS = (
+    ("Failed courses to retake", re.compile(r"is prioritized because"), True),
+    ("Recommended", re.compile(r"is recommended because"), True),
+    ("Already passed", re.compile(r"was already passed"), False),
+    ("Not offered this semester", re.compile(r"is unavailable this semester|is not offered in the"), False),
+    ("Unmet prerequisites", re.compile(r"unmet prerequisite"), False),
+    ("Unmet co-requisites", re.compile(r"unmet co-requisite"), False),
+    ("Over the credit limit", re.compile(r"exceed the credit limit"), False),
+)
+
+
+class Page(NamedTuple):
+    rows: Union[pd.DataFrame, Sequence]
+    number: int
+    pages: int
+    total: int
+    start: int
+
+    def describe(self, noun: str = "courses") -> str:
+        """E.g. 'Showing 51-100 of 230 courses'"""
+        if not self.total:
+            return f"No {noun}"
+        return f"Showing {self.start + 1}-{self.start + len(self.rows)} of {self.total} {noun}"
+
+
+def page_count(total: int, page_size: int = DEFAULT_PAGE_SIZE) -> int:
+    return max(1, math.ceil(total / page_size))
+
+
+def paginate(rows: Union[pd.DataFrame, Sequence], number: int, page_size: int = DEFAULT_PAGE_SIZE) -> Page:
+    """Page ``number`` (1-based, clamped to the valid range) of a DataFrame or list"""
+    pages = page_count(len(rows), page_size)
+    number = min(max(int(number), 1), pages)
+    start = (number - 1) * page_size
+    window = rows.iloc[start:start + page_size] if isinstance(rows, pd.DataFrame) else rows[start:start + page_size]
+    return Page(window, number, pages, len(rows), start)
+
+
+def sort_courses(df: pd.DataFrame, column: Optional[str] = None, descending: bool = False) -> pd.DataFrame:
+    """``df`` ordered by ``column`` (None keeps the current order)"""
+    if not column:
+        return df.iloc[::-1] if descending else df
+    if column == "Credit Hours":
+        key = lambda values: pd.to_numeric(values, errors="coerce")
+    else:
+        key = lambda values: values.astype(str).str.strip().str.lower()
+    return df.sort_values(column, ascending=not descending, kind="stable", key=key)
+
+
+class ExplanationGroup(NamedTuple):
+    title: str
+    codes: List[str]
+    explanations: List[str]
+    expanded: bool
+
+    def __len__(self) -> int:
+        return len(self.explanations)
+
+
+def group_explanations(explanations: Sequence[str]) -> List[ExplanationGroup]:
+    """Sort the engine's explanations into groups by decision, in display order.
+
+    Explanations start with the course code; the rest of the sentence says
+    which decision was taken. Groups keep the engine's order and empty
+    groups are left out.
+    """
+    buckets = [([], []) for _ in range(len(EXPLANATION_GROUPS) + 1)]
+    for explanation in explanations:
+        code, _, rest = explanation.partition(" ")
+        for i, (_, pattern, _) in enumerate(EXPLANATION_GROUPS):
+            if pattern.search(rest):
+                break
+        else:
+            i = len(EXPLANATION_GROUPS)
+        buckets[i][0].append(code)
+        buckets[i][1].append(explanation)
+    titles = [(title, expanded) for title, _, expanded in EXPLANATION_GROUPS] + [("Other", False)]
+    return [ExplanationGroup(title, codes, texts, expanded)
+            for (title, expanded), (codes, texts) in zip(titles, buckets) if texts]
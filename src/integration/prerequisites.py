@@ -0,0 +1,352 @@
+import itertools
+import logging
+import re
+from typing import Callable, List, Optional, Sequence, Tuple, Union
+
+# A parsed expression: a course code, ("and", parts), ("or", parts) or
+# ("of", n, codes) for "n of (codes)"
+Node = Union[str, tuple]
+
+logger = logging.getLogger(__name__)
+
+# Hint that a prerequisite string is more than a comma-separated list
+_EXPRESSION = re.compile(r"[()|&]|\b(?:and|or|of)\b", re.IGNORECASE)
+_TOKEN = re.compile(r"\s*(?:([(),|&])|([A-Za-z0-9_.\-]+)|(\S))")
+_KEYWORDS = {"AND": "&", "OR": "|", "OF": "of"}
+
+# Converting an OR of ANDs to clauses multiplies them out; refuse anything
+# bigger than this rather than compile it slowly
+MAX_CLAUSES = 64
+
+_popcount = getattr(int, "bit_count", lambda value: bin(value).count("1"))
+
+
+class PrerequisiteSyntaxError(ValueError):
+    """A prerequisite expression that cannot be parsed"""
+    pass
+
+
+def _tokenize(text: str) -> List[str]:
+    tokens = []
+    for symbol, word, other in _TOKEN.findall(text):
+        if other:
+            raise PrerequisiteSyntaxError(f"unexpected '{other}'")
+        if word:
+            tokens.append(_KEYWORDS.get(word.upper(), word))
+        elif symbol:
+            tokens.append(symbol)
+    return tokens
+
+
+class _Parser:
+    # expr   := any ("," any)*
+    # any    := all ("or" all)*
+    # all    := factor ("and" factor)*
+    # factor := CODE | "(" expr ")" | N "of" "(" CODE ("," CODE)* ")"
+
+    def __init__(self, tokens: List[str]):
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self) -> Optional[str]:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def take(self, expected: Optional[str] = None) -> str:
+        token = self.peek()
+        if token is None:
+            raise PrerequisiteSyntaxError(f"expected {repr(expected) if expected else 'a course code'} at the end")
+        if expected is not None and token != expected:
+            raise PrerequisiteSyntaxError(f"expected '{expected}' before '{token}'")
+        self.pos += 1
+        return token
+
+    def code(self) -> str:
+        token = self.take()
+        if token in ("(", ")", ",", "|", "&", "of"):
+            raise PrerequisiteSyntaxError(f"expected a course code before '{token}'")
+        return token
+
+    def expr(self) -> Node:
+        parts = [self.any()]
+        while self.peek() == ",":
+            self.take()
+            parts.append(self.any())
+        return _join("and", parts)
+
+    def any(self) -> Node:
+        parts = [self.all()]
+        while self.peek() == "|":
+            self.take()
+            parts.append(self.all())
+        return _join("or", parts)
+
+    def all(self) -> Node:
+        parts = [self.factor()]
+        while self.peek() == "&":
+            self.take()
+            parts.append(self.factor())
+        return _join("and", parts)
+
+    def factor(self) -> Node:
+        token = self.peek()
+        if token == "(":
+            self.take()
+            node = self.expr()
+            self.take(")")
+            return node
+        if token is not None and token.isdigit() and self.pos + 1 < len(self.tokens) \
+                and self.tokens[self.pos + 1] == "of":
+            self.pos += 2
+            self.take("(")
+            codes = [self.code()]
+            while self.peek() == ",":
+                self.take()
+                codes.append(self.code())
+            self.take(")")
+            n = int(token)
+            if len(set(codes)) != len(codes):
+                raise PrerequisiteSyntaxError(f"a course is listed twice in '{n} of (...)'")
+            if not 1 <= n <= len(codes):
+                raise PrerequisiteSyntaxError(f"'{n} of (...)' needs between 1 and {len(codes)} courses")
+            return ("of", n, tuple(codes))
+        return self.code()
+
+
+def _join(op: str, parts: List[Node]) -> Node:
+    if len(parts) == 1:
+        return parts[0]
+    flat = []
+    for part in parts:
+        flat.extend(part[1] if isinstance(part, tuple) and part[0] == op else (part,))
+    return (op, tuple(flat))
+
+
+def parse_prerequisites(text: str) -> Optional[Node]:
+    """Parse a prerequisite expression; None if it is empty.
+
+    Commas (or "and") join courses that are all required, "or" joins
+    alternatives and "2 of (A, B, C)" asks for any two of the listed courses.
+    "and" binds tighter than "or", but a comma binds looser, so every
+    comma-separated entry is required: "A, B or C" is A and (B or C), while
+    "A and B or C" is (A and B) or C. Parentheses group. Keywords are case
+    insensitive.
+    """
+    tokens = _tokenize(text or "")
+    if not tokens:
+        return None
+    parser = _Parser(tokens)
+    node = parser.expr()
+    if parser.peek() is not None:
+        raise PrerequisiteSyntaxError(f"unexpected '{parser.peek()}'")
+    return node
+
+
+def referenced_codes(node: Optional[Node]) -> Tuple[str, ...]:
+    """Every course code in the expression, once each, in order"""
+    codes: List[str] = []
+
+    def visit(node):
+        if isinstance(node, str):
+            codes.append(node)
+        elif node[0] == "of":
+            codes.extend(node[2])
+        else:
+            for part in node[1]:
+                visit(part)
+
+    if node is not None:
+        visit(node)
+    return tuple(dict.fromkeys(codes))
+
+
+def render(node: Node, parent: Optional[str] = None) -> str:
+    """Canonical text of a parsed expression"""
+    if isinstance(node, str):
+        return node
+    if node[0] == "of":
+        return f"{node[1]} of ({', '.join(node[2])})"
+    text = (", " if node[0] == "and" else " or ").join(render(part, node[0]) for part in node[1])
+    return f"({text})" if parent is not None else text
+
+
+def is_plain(node: Optional[Node]) -> bool:
+    """True for the classic form: no prerequisites, or courses that are all required"""
+    return node is None or isinstance(node, str) or (
+        node[0] == "and" and all(isinstance(part, str) for part in node[1]))
+
+
+# A clause is satisfied if any of its (mask, need) terms is: at least
+# ``need`` of the courses whose bits are set in ``mask`` are passed
+Clause = Tuple[Tuple[int, int], ...]
+
+
+def _normalize(terms) -> Clause:
+    # Single-course alternatives fold into one "any of" term
+    any_mask, rest = 0, set()
+    for mask, need in terms:
+        if need == 1:
+            any_mask |= mask
+        else:
+            rest.add((mask, need))
+    if any_mask:
+        rest = {(mask, need) for mask, need in rest if mask & ~any_mask}
+        rest.add((any_mask, 1))
+    return tuple(sorted(rest))
+
+
+def _clauses(node: Node, bits) -> List[Clause]:
+    """Conjunctive normal form over (mask, need) terms"""
+    if isinstance(node, str):
+        return [((bits[node], 1),)]
+    if node[0] == "of":
+        mask = 0
+        for code in node[2]:
+            mask |= bits[code]
+        return [((mask, node[1]),)]
+    if node[0] == "and":
+        if all(isinstance(part, str) for part in node[1]):
+            # All of a list of courses is one term
+            mask = 0
+            for code in node[1]:
+                mask |= bits[code]
+            return [((mask, _popcount(mask)),)]
+        return [clause for part in node[1] for clause in _clauses(part, bits)]
+    clauses: List[Clause] = [()]
+    for part in node[1]:
+        clauses = [_normalize(a + b) for a, b in itertools.product(clauses, _clauses(part, bits))]
+        if len(clauses) > MAX_CLAUSES:
+            raise PrerequisiteSyntaxError("expression is too complex; simplify the alternatives")
+    return list(dict.fromkeys(clauses))
+
+
+def _term_source(mask: int, need: int) -> str:
+    if need == 1:
+        return f"b & {mask}"
+    if need == _popcount(mask):
+        return f"b & {mask} == {mask}"
+    return f"_popcount(b & {mask}) >= {need}"
+
+
+def _part_source(clauses: Sequence[Clause]) -> str:
+    return " and ".join("(" + " or ".join(_term_source(*term) for term in clause) + ")" for clause in clauses)
+
+
+class Requirement:
+    """A prerequisite expression compiled against a catalog's code ids.
+
+    The courses it mentions get one bit each, in ``code_ids`` order, and the
+    expression becomes clauses of (mask, need) terms: a clause holds if, for
+    any of its terms, at least ``need`` of the courses in ``mask`` are
+    passed. The top-level parts ("MAT111, MAT112 or MAT113" has two) are
+    kept apart so an explanation can name only the unmet ones.
+
+    The clauses are also turned into two straight-line functions of a
+    ``CompiledCatalog.mark`` table, ``satisfied(passed)`` and
+    ``unmet(passed)`` (the text of the unmet parts), that gather the bits in
+    one expression and test each term with an AND (and a popcount for
+    "n of"), so a check costs about as much as scanning a plain list.
+    """
+
+    __slots__ = ("text", "code_ids", "parts", "satisfied", "unmet")
+
+    def __init__(self, node: Node, intern: Callable[[str], int]):
+        self.text = render(node)
+        codes = referenced_codes(node)
+        self.code_ids = tuple(intern(code) for code in codes)
+        bits = {code: 1 << i for i, code in enumerate(codes)}
+        parts = node[1] if node[0] == "and" else (node,)
+        # Parts are listed comma-separated, so alternatives get parentheses
+        parent = "and" if len(parts) > 1 else None
+        self.parts: Tuple[Tuple[str, List[Clause]], ...] = tuple(
+            (render(part, parent), _clauses(part, bits)) for part in parts)
+        self._compile()
+
+    def _compile(self) -> None:
+        # Only integers from the compiled clauses go into the source; the
+        # part texts are passed in as the ``texts`` constant
+        gather = " | ".join(f"p[{code_id}] << {i}" if i else f"p[{code_id}]"
+                            for i, code_id in enumerate(self.code_ids))
+        tests = [_part_source(clauses) for _, clauses in self.parts]
+        source = "\n".join([
+            "def satisfied(p):",
+            f"    b = {gather}",
+            f"    return bool({' and '.join(f'({test})' for test in tests)})",
+            "def unmet(p):",
+            f"    b = {gather}",
+            "    missing = []",
+            *(f"    if not ({test}): missing.append(texts[{i}])" for i, test in enumerate(tests)),
+            "    return missing",
+        ])
+        namespace = {"_popcount": _popcount, "texts": tuple(text for text, _ in self.parts)}
+        exec(compile(source, f"<prerequisites {self.text}>", "exec"), namespace)
+        self.satisfied = namespace["satisfied"]
+        self.unmet = namespace["unmet"]
+
+    @property
+    def clauses(self) -> List[Clause]:
+        return [clause for _, clauses in self.parts for clause in clauses]
+
+    def bits(self, passed) -> int:
+        """The expression's courses that are set in a membership table"""
+        bits, bit = 0, 1
+        for code_id in self.code_ids:
+            if passed[code_id]:
+                bits |= bit
+            bit <<= 1
+        return bits
+
+    def __repr__(self):
+        return f"Requirement({self.text!r})"
+
+
+def check_prerequisites(text: str) -> Tuple[str, ...]:
+    """Validate a prerequisite expression; returns the course codes it mentions.
+
+    Raises ``PrerequisiteSyntaxError`` for anything the catalog would not
+    compile, including expressions with too many alternatives.
+    """
+    node = parse_prerequisites(text)
+    if not is_plain(node):
+        Requirement(node, lambda code: 0)
+    return referenced_codes(node)
+
+
+def is_expression(text: str) -> bool:
+    """True if a "Prerequisites" value is an and/or expression rather than a
+    plain list of required courses"""
+    if not _EXPRESSION.search(text):
+        return False
+    try:
+        return not is_plain(parse_prerequisites(text))
+    except PrerequisiteSyntaxError:
+        return False
+
+
+def compile_prerequisites(text: str, intern: Callable[[str], int]) -> Tuple[List[int], Optional[Requirement]]:
+    """Code ids mentioned by a "Prerequisites" value, and its ``Requirement``.
+
+    A plain list of required courses needs no ``Requirement`` (None) and is
+    checked with the usual scan over the code ids. So is a value that does
+    not parse, which keeps the old comma-separated reading; that is logged,
+    as such a value usually names codes no course has and cannot be met.
+    """
+    node = None
+    if _EXPRESSION.search(text):
+        try:
+            node = parse_prerequisites(text)
+        except PrerequisiteSyntaxError as error:
+            logger.warning("Prerequisites %r do not parse (%s); reading them as a comma-separated list",
+                           text, error)
+            node = None
+    if node is None or is_plain(node):
+        codes = referenced_codes(node) if node is not None else [c.strip() for c in text.split(",") if c.strip()]
+        return [intern(code) for code in codes], None
+    requirement = Requirement(node, intern)
+    return list(requirement.code_ids), requirement
+
+
+def prerequisite_codes(text: str) -> Tuple[str, ...]:
+    """Course codes mentioned by a "Prerequisites" value"""
+    codes: List[str] = []
+    ids, _ = compile_prerequisites(text, lambda code: codes.append(code) or len(codes) - 1)
+    return tuple(codes[i] for i in ids)
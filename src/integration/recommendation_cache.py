@@ -0,0 +1,254 @@
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+# Add src/ to sys.path so this also runs as a script
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from integration.speculative_advisor import Advice
+
+DEFAULT_CACHE_PATH = "data/recommendations.sqlite3"
+DEFAULT_MAX_ENTRIES = 20000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS recommendations (
+    key TEXT PRIMARY KEY,
+    catalog TEXT NOT NULL,
+    policies TEXT NOT NULL,
+    profile TEXT NOT NULL,
+    advice TEXT NOT NULL,
+    used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_recommendations_used ON recommendations(used);
+CREATE INDEX IF NOT EXISTS idx_recommendations_versions ON recommendations(catalog, policies);
+"""
+
+# (courses digest, policies digest) of the knowledge base an advice was computed from
+Digests = Tuple[str, str]
+
+
+def normalize_profile(student_input: Mapping) -> Dict:
+    """The parts of a student's input that decide the advice, in a canonical form"""
+    return {
+        "cgpa": float(student_input["cgpa"]),
+        "semester": student_input["semester"].strip().upper(),
+        "passed_courses": sorted({c.strip() for c in student_input["passed_courses"] if c.strip()}),
+        "failed_courses": sorted({c.strip() for c in student_input["failed_courses"] if c.strip()}),
+    }
+
+
+def cache_key(digests: Digests, student_input: Mapping) -> str:
+    """Hash of the catalog and policies contents and the normalized profile"""
+    raw = json.dumps([digests[0], digests[1], normalize_profile(student_input)], sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def encode_advice(advice: Advice) -> str:
+    return json.dumps({
+        "recommended_courses": [dict(course) for course in advice.recommended_courses],
+        "explanations": list(advice.explanations),
+        "total_credits": advice.total_credits,
+        "credit_limit": advice.credit_limit,
+        "trace": advice.trace,
+    }, default=lambda value: value.item())
+
+
+def decode_advice(raw: str) -> Advice:
+    data = json.loads(raw)
+    return Advice(data["recommended_courses"], data["explanations"], data["total_credits"], data["credit_limit"],
+                  data.get("trace", ""))
+
+
+class RecommendationCache:
+    """Advice kept in a SQLite file so it survives restarts and deployments.
+
+    Entries are keyed by ``cache_key``: the content digests of the catalog
+    and the policies and the normalized profile, so an edit to either file
+    can never serve old advice. ``invalidate`` deletes the entries of every
+    other pair of digests, older or newer (a catalog can be reverted to an
+    earlier content), and returns their profiles, most recently used first,
+    so the caller can advise those students again against the current
+    knowledge base (``warm``). Advice an edit cannot have changed is first
+    re-filed under the new digests (``carry_over``). A process that is
+    behind on an edit may delete the advice of the newer contents too; it
+    gets those profiles back and re-advises them once it catches up. The
+    file holds at most ``max_entries`` entries; the least recently used are
+    evicted first. Each thread uses its own connection.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = os.path.abspath(path)
+        self.max_entries = max_entries
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def get(self, digests: Digests, student_input: Mapping) -> Optional[Advice]:
+        key = cache_key(digests, student_input)
+        conn = self._conn()
+        row = conn.execute("SELECT advice FROM recommendations WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        conn.execute("UPDATE recommendations SET used = ? WHERE key = ?", (time.time(), key))
+        return decode_advice(row[0])
+
+    def put(self, digests: Digests, student_input: Mapping, advice: Advice) -> None:
+        profile = json.dumps(normalize_profile(student_input), sort_keys=True)
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO recommendations (key, catalog, policies, profile, advice, used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (cache_key(digests, student_input), digests[0], digests[1], profile,
+                 encode_advice(advice), time.time()))
+            excess = conn.execute("SELECT COUNT(*) FROM recommendations").fetchone()[0] - self.max_entries
+            if excess > 0:
+                conn.execute("DELETE FROM recommendations WHERE key IN "
+                             "(SELECT key FROM recommendations ORDER BY used LIMIT ?)", (excess,))
+
+    def carry_over(self, old: Digests, new: Digests, unaffected: Callable[[Dict], bool]) -> int:
+        """Store the advice of ``old`` under ``new`` for the profiles ``unaffected`` accepts.
+
+        The entries of ``old`` stay until ``invalidate``. Returns how many
+        entries were carried over.
+        """
+        with self._transaction() as conn:
+            carried = []
+            for profile, advice, used in conn.execute(
+                    "SELECT profile, advice, used FROM recommendations WHERE catalog = ? AND policies = ?", old):
+                data = json.loads(profile)
+                if unaffected(data):
+                    carried.append((cache_key(new, data), new[0], new[1], profile, advice, used))
+            conn.executemany(
+                "INSERT OR IGNORE INTO recommendations (key, catalog, policies, profile, advice, used) "
+                "VALUES (?, ?, ?, ?, ?, ?)", carried)
+        return len(carried)
+
+    def invalidate(self, digests: Digests) -> List[Dict]:
+        """Delete the entries of any catalog and policies contents but ``digests``.
+
+        Returns the profiles of the deleted entries, most recently used
+        first. Only the process that deletes them gets them back, so when
+        several processes share the file only one re-advises them.
+        """
+        stale = "catalog != ? OR policies != ?"
+        with self._transaction() as conn:
+            rows = conn.execute(f"SELECT profile FROM recommendations WHERE {stale} ORDER BY used DESC",
+                                digests).fetchall()
+            conn.execute(f"DELETE FROM recommendations WHERE {stale}", digests)
+        return list({row[0]: json.loads(row[0]) for row in rows}.values())
+
+    def warm(self, digests: Digests, profiles: Iterable[Mapping], advise: Callable[[Mapping], Advice],
+             current: Optional[Callable[[], Digests]] = None,
+             pause: Optional[Callable[[], None]] = None) -> int:
+        """Advise the ``profiles`` that are not cached yet; returns how many were.
+
+        ``current`` returns the digests of the knowledge base in use; warming
+        stops as soon as they are no longer ``digests``. ``pause`` is called
+        before each profile and may block to let other work go first.
+        """
+        count = 0
+        for profile in profiles:
+            if pause is not None:
+                pause()
+            if current is not None and current() != digests:
+                break
+            if self.get(digests, profile) is None:
+                profile = normalize_profile(profile)
+                self.put(digests, profile, advise(profile))
+                count += 1
+        return count
+
+    def profiles(self) -> List[Dict]:
+        """The distinct stored profiles, most recently used first"""
+        rows = self._conn().execute("SELECT profile FROM recommendations ORDER BY used DESC").fetchall()
+        return list({row[0]: json.loads(row[0]) for row in rows}.values())
+
+    def __len__(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM recommendations").fetchone()[0]
+
+    def clear(self) -> None:
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM recommendations")
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+_caches: Dict[str, RecommendationCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_recommendation_cache(path: Optional[str] = None) -> Optional[RecommendationCache]:
+    """Return the process-wide cache for ``path`` (default: ``KBS_RECOMMENDATION_CACHE``).
+
+    Setting ``KBS_RECOMMENDATION_CACHE`` to an empty value turns the
+    persistent cache off (None).
+    """
+    path = path if path is not None else os.environ.get("KBS_RECOMMENDATION_CACHE", DEFAULT_CACHE_PATH)
+    if not path.strip():
+        return None
+    key = os.path.abspath(path)
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = _caches[key] = RecommendationCache(key)
+        return cache
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fill the recommendation cache for a cohort of students")
+    parser.add_argument("cohort", help="CSV with student_id, cgpa, semester, passed_courses, failed_courses")
+    parser.add_argument("--courses", default="data/courses.csv")
+    parser.add_argument("--policies", default="data/policies.csv")
+    parser.add_argument("--cache", default=DEFAULT_CACHE_PATH)
+    parser.add_argument("--max-entries", type=int, default=DEFAULT_MAX_ENTRIES)
+    args = parser.parse_args(argv)
+
+    from integration.catalog_watcher import LiveKnowledgeBase
+    from integration.demand_forecast import load_cohort
+    from integration.speculative_advisor import advise
+
+    started = time.perf_counter()
+    knowledge_base = LiveKnowledgeBase(args.courses, args.policies)
+    cache = RecommendationCache(args.cache, args.max_entries)
+    digests = knowledge_base.digests
+    dropped = len(cache.invalidate(digests))
+    students = load_cohort(args.cohort)
+    count = cache.warm(digests, students, lambda profile: advise(knowledge_base, profile))
+    elapsed = time.perf_counter() - started
+
+    print(f"Advised {count} of {len(students)} students in {elapsed:.2f}s "
+          f"({dropped} entries of another catalog dropped); {len(cache)} entries in {args.cache}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,478 @@
+import argparse
+import bisect
+import os
+import random
+import sys
+import time
+from typing import Dict, Iterable, List, Mapping, Tuple
+
+import pandas as pd
+
+# Add src/ to sys.path so this also runs as a script
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Inference_engine_KBS import (AdvisingEngine, StudentProfile, credit_limit_for, credit_limit_rules,
+                                  unmet_prerequisites)
+from experta import AS, MATCH, NOT, OR, TEST, DefFacts, Fact, KnowledgeEngine, Rule
+from experta.abstract import Strategy
+from integration.compiled_catalog import CompiledCatalog, semester_bit
+
+# Salience of each phase: derived eligibility facts are kept up to date
+# before any decision, and failed courses are decided before the others
+DERIVE, FAILED_FIRST, OTHERS = 30, 20, 10
+
+# ``Missing.code`` of a course whose prerequisite expression is not met
+UNMET = -1
+
+
+# Facts. Courses are referred to by their ``CompiledCatalog`` ids: ``course``
+# is a catalog row and ``code`` an interned course code.
+class Course(Fact):
+    """One catalog row: id, code, credits and semester bit flags"""
+    pass
+
+class Prerequisite(Fact):
+    pass
+
+class CoRequisite(Fact):
+    pass
+
+class Passed(Fact):
+    pass
+
+class Failed(Fact):
+    pass
+
+class Term(Fact):
+    """Bit flag of the semester being advised"""
+    pass
+
+class CreditLimit(Fact):
+    pass
+
+class Load(Fact):
+    """Credits selected so far"""
+    pass
+
+class Missing(Fact):
+    """A prerequisite of ``course`` that is not passed, or ``UNMET`` if
+    ``course`` has an and/or prerequisite expression that is not satisfied"""
+    pass
+
+class Pending(Fact):
+    """A co-requisite of ``course`` that is neither passed nor selected"""
+    pass
+
+class Added(Fact):
+    """A course code selected this run"""
+    pass
+
+class Decided(Fact):
+    """``course`` has been decided on in ``step`` (1: failed courses, 2: the rest)"""
+    pass
+
+
+class CatalogOrderStrategy(Strategy):
+    """Fire activations by salience, then in catalog order.
+
+    The advising rules are greedy: whether a course still fits the credit
+    limit depends on what was selected before it. Ordering the agenda by
+    course id gives the same order as the monolithic rule.
+    """
+
+    @staticmethod
+    def get_key(activation):
+        return (
+            activation.rule.salience,
+            -activation.context.get("course", -1),
+            activation.rule.__name__,
+            tuple(sorted(f["__factid__"] for f in activation.facts)),
+        )
+
+    def _update_agenda(self, agenda, added, removed):
+        for act in removed:
+            act.key = self.get_key(act)
+            idx = bisect.bisect_left(agenda.activations, act)
+            if idx < len(agenda.activations) and agenda.activations[idx] == act:
+                del agenda.activations[idx]
+        for act in added:
+            act.key = self.get_key(act)
+            bisect.insort(agenda.activations, act)
+
+
+_FAILED = (
+    Failed(code=MATCH.code),
+    Course(id=MATCH.course, code=MATCH.code, credits=MATCH.credits, semesters=MATCH.semesters),
+    NOT(Decided(step=1, course=MATCH.course)),
+)
+_FAILED_OPEN = _FAILED + (NOT(Passed(code=MATCH.code)), Term(bit=MATCH.bit))
+_OPEN = (
+    Course(id=MATCH.course, code=MATCH.code, credits=MATCH.credits, semesters=MATCH.semesters),
+    NOT(Passed(code=MATCH.code)),
+    NOT(Added(code=MATCH.code)),
+    NOT(Decided(step=2, course=MATCH.course)),
+    Term(bit=MATCH.bit),
+)
+_OFFERED = TEST(lambda semesters, bit: semesters & bit)
+_NOT_OFFERED = TEST(lambda semesters, bit: not semesters & bit)
+_LOAD = (Load(total=MATCH.total), CreditLimit(limit=MATCH.limit))
+_FITS = TEST(lambda total, credits, limit: total + credits <= limit)
+_EXCEEDS = TEST(lambda total, credits, limit: total + credits > limit)
+
+
+class ReteAdvisingEngine(KnowledgeEngine):
+    """The advising rules as fine-grained rules over individual facts.
+
+    Gives the same recommendations and explanations as ``AdvisingEngine``,
+    but courses, requisites, passed and failed courses are separate facts,
+    so experta's Rete network keeps partial matches between runs. Changing
+    the profile with ``add_passed``/``remove_passed`` (and friends) only
+    touches the matches of the courses involved; ``advise`` then replays
+    the credit-limit decisions over the updated agenda.
+
+    Opt-in only: nothing in the application uses it, because on the shipped
+    catalog it is slower than ``AdvisingEngine`` in every case (a full build
+    takes about 126 ms against 1.7 ms for a whole monolithic run, and one
+    profile update about 29 ms against 1.6 ms to advise from scratch).
+    Experta's join and negation nodes scan unindexed memories, which costs
+    more than the monolithic rule's array scan saves. Re-run the comparison
+    with ``python src/integration/rete_engine.py`` after changing either.
+    """
+
+    __strategy__ = CatalogOrderStrategy
+
+    def __init__(self, courses, student_data, policies_df):
+        super().__init__()
+        self.courses = courses
+        self.catalog = courses if isinstance(courses, CompiledCatalog) else CompiledCatalog.from_records(courses)
+        self.student_data = dict(student_data)
+        self.policies_df = policies_df
+        self._limit_rules = credit_limit_rules(policies_df)
+        self.credit_limit = credit_limit_for(self.student_data["cgpa"], self._limit_rules)
+        self._term = semester_bit(self.student_data["semester"])
+        self.passed = self.catalog.mark(self.student_data["passed_courses"])
+        self.failed = self.catalog.mark(self.student_data["failed_courses"])
+        self.recommended_courses = []
+        self.total_credits = 0
+        self.explanations = []
+        self._facts: Dict[tuple, Fact] = {}
+        # Missing(UNMET) facts by course; and/or expressions are evaluated
+        # here rather than in rules, when a course they mention changes
+        self._unmet: Dict[int, Fact] = {}
+        # One entry per decision, in firing order: (step, course), the facts
+        # it declared, and the credits and selections before it
+        self._log: List[Tuple[Tuple[int, int], List[Fact], int, int]] = []
+        self._replay_from = (0, -1)
+        self._rows: Dict[int, List[int]] = {}
+        self._dependents: Dict[int, List[int]] = {}
+        for course_id in range(len(self.catalog)):
+            self._rows.setdefault(self.catalog.course_code_ids[course_id], []).append(course_id)
+            for code_id in (*self.catalog.prerequisite_ids(course_id), *self.catalog.corequisite_ids(course_id)):
+                self._dependents.setdefault(code_id, []).append(course_id)
+
+    @DefFacts()
+    def knowledge_base(self):
+        catalog = self.catalog
+        for course_id in range(len(catalog)):
+            yield Course(id=course_id, code=catalog.course_code_ids[course_id],
+                         credits=catalog.credits[course_id], semesters=catalog.semesters[course_id])
+            requirement = catalog.requirements.get(course_id)
+            if requirement is not None:
+                if not requirement.satisfied(self.passed):
+                    yield Missing(course=course_id, code=UNMET)
+            else:
+                for code_id in catalog.prerequisite_ids(course_id):
+                    yield Prerequisite(course=course_id, code=code_id)
+            for code_id in catalog.corequisite_ids(course_id):
+                yield CoRequisite(course=course_id, code=code_id)
+        yield Term(bit=self._term)
+        yield CreditLimit(limit=self.credit_limit)
+        yield Load(total=0)
+        yield from (Passed(code=i) for i, flag in enumerate(self.passed) if flag)
+        yield from (Failed(code=i) for i, flag in enumerate(self.failed) if flag)
+
+    def reset(self, **kwargs):
+        super().reset(**kwargs)
+        self._facts = {}
+        for fact in self.facts.values():
+            if isinstance(fact, (Passed, Failed, Term, CreditLimit, Load)):
+                self._facts[(type(fact), fact.get("code"))] = fact
+        self._unmet = {fact["course"]: fact for fact in self.facts.values()
+                       if isinstance(fact, Missing) and fact["code"] == UNMET}
+        self._log = []
+        self._replay_from = (0, -1)
+
+    # Profile updates
+
+    def _touch(self, course_ids, failed_only=False):
+        """Decisions from the first of ``course_ids`` on must be replayed"""
+        for course_id in course_ids:
+            code_id = self.catalog.course_code_ids[course_id]
+            if self.failed[code_id] or failed_only:
+                self._replay_from = min(self._replay_from, (1, course_id))
+            else:
+                self._replay_from = min(self._replay_from, (2, course_id))
+
+    def _set(self, fact_type, code_id, present):
+        key = (fact_type, code_id)
+        if present and key not in self._facts:
+            self._facts[key] = self.declare(fact_type(code=code_id))
+        elif not present and key in self._facts:
+            self.retract(self._facts.pop(key))
+        else:
+            return
+        if fact_type is Passed:
+            self._touch(self._rows.get(code_id, ()))
+            self._touch(self._dependents.get(code_id, ()))
+            for course_id in self._dependents.get(code_id, ()):
+                if course_id in self.catalog.requirements:
+                    self._check_requirement(course_id)
+        else:
+            self._touch(self._rows.get(code_id, ()), failed_only=True)
+
+    def _check_requirement(self, course_id):
+        satisfied = self.catalog.requirements[course_id].satisfied(self.passed)
+        if not satisfied and course_id not in self._unmet:
+            self._unmet[course_id] = self.declare(Missing(course=course_id, code=UNMET))
+        elif satisfied and course_id in self._unmet:
+            self.retract(self._unmet.pop(course_id))
+
+    def _code_id(self, code):
+        return self.catalog.code_ids.get(code.strip())
+
+    def add_passed(self, code):
+        code_id = self._code_id(code)
+        if code_id is not None:
+            self.passed[code_id] = 1
+            self._set(Passed, code_id, True)
+
+    def remove_passed(self, code):
+        code_id = self._code_id(code)
+        if code_id is not None:
+            self.passed[code_id] = 0
+            self._set(Passed, code_id, False)
+
+    def add_failed(self, code):
+        code_id = self._code_id(code)
+        if code_id is not None:
+            self.failed[code_id] = 1
+            self._set(Failed, code_id, True)
+
+    def remove_failed(self, code):
+        code_id = self._code_id(code)
+        if code_id is not None:
+            self._set(Failed, code_id, False)
+            self.failed[code_id] = 0
+
+    def set_cgpa(self, cgpa):
+        self.student_data["cgpa"] = cgpa
+        self.credit_limit = credit_limit_for(cgpa, self._limit_rules)
+        key = (CreditLimit, None)
+        if self._facts[key]["limit"] != self.credit_limit:
+            self._facts[key] = self.modify(self._facts[key], limit=self.credit_limit)
+            self._replay_from = (0, -1)
+
+    def set_semester(self, semester):
+        bit = semester_bit(semester)
+        self.student_data["semester"] = semester
+        self._term = bit
+        key = (Term, None)
+        if self._facts[key]["bit"] != bit:
+            self._facts[key] = self.modify(self._facts[key], bit=bit)
+            self._replay_from = (0, -1)
+        elif self._log:
+            # Same flags, but the explanations name the semester
+            self._replay_from = (0, -1)
+
+    def advise(self):
+        """Run the rules for the current profile; returns ``recommended_courses``.
+
+        Decisions are greedy, so each depends only on the decisions before
+        it: those made before the first course touched by a profile update
+        are kept, and only the rest are retracted and replayed.
+        """
+        keep = bisect.bisect_left(self._log, (self._replay_from,))
+        if keep < len(self._log):
+            _, _, total, selected = self._log[keep]
+            for _, facts, _, _ in self._log[keep:]:
+                for fact in facts:
+                    self.retract(fact)
+            del self._log[keep:]
+            del self.explanations[keep:]
+            del self.recommended_courses[selected:]
+            if self.total_credits != total:
+                self._facts[(Load, None)] = self.modify(self._facts[(Load, None)], total=total)
+            self.total_credits = total
+        self._replay_from = (3, 0)
+        self.run()
+        return self.recommended_courses
+
+    # Decisions
+
+    def _decide(self, step, course, explanation, facts=()):
+        self._log.append(((step, course), [*facts, self.declare(Decided(step=step, course=course))],
+                          self.total_credits, len(self.recommended_courses)))
+        self.explanations.append(explanation)
+
+    def _select(self, step, course, code, credits, explanation):
+        added = self.declare(Added(code=code))
+        self._decide(step, course, explanation, [added] if added is not None else [])
+        self._facts[(Load, None)] = self.modify(self._facts[(Load, None)], total=self.total_credits + credits)
+        self.total_credits += credits
+        if isinstance(self.courses, CompiledCatalog):
+            self.recommended_courses.append(self.catalog.course(course))
+        else:
+            self.recommended_courses.append(self.courses[course])
+
+    def _missing(self, course):
+        return ", ".join(unmet_prerequisites(self.catalog, self.passed, course))
+
+    # Eligibility, maintained incrementally
+
+    @Rule(Prerequisite(course=MATCH.course, code=MATCH.code), NOT(Passed(code=MATCH.code)), salience=DERIVE)
+    def prerequisite_missing(self, course, code):
+        self.declare(Missing(course=course, code=code))
+
+    @Rule(AS.fact << Missing(code=MATCH.code), Passed(code=MATCH.code), salience=DERIVE)
+    def prerequisite_passed(self, fact):
+        self.retract(fact)
+
+    @Rule(CoRequisite(course=MATCH.course, code=MATCH.code), NOT(Passed(code=MATCH.code)),
+          NOT(Added(code=MATCH.code)), salience=DERIVE)
+    def corequisite_pending(self, course, code):
+        self.declare(Pending(course=course, code=code))
+
+    @Rule(AS.fact << Pending(code=MATCH.code), OR(Passed(code=MATCH.code), Added(code=MATCH.code)), salience=DERIVE)
+    def corequisite_met(self, fact):
+        self.retract(fact)
+
+    # Step 1: Prioritize failed courses
+
+    @Rule(*_FAILED, Passed(code=MATCH.code), salience=FAILED_FIRST)
+    def failed_already_passed(self, course, code):
+        self._decide(1, course, f"{self.catalog.codes[code]} is not recommended because it was already passed.")
+
+    @Rule(*_FAILED_OPEN, _NOT_OFFERED, salience=FAILED_FIRST)
+    def failed_unavailable(self, course, code):
+        self._decide(1, course, f"{self.catalog.codes[code]} is unavailable this semester.")
+
+    @Rule(*_FAILED_OPEN, _OFFERED, Missing(course=MATCH.course), salience=FAILED_FIRST)
+    def failed_unmet_prerequisites(self, course, code):
+        self._decide(1, course, f"{self.catalog.codes[code]} is not recommended due to unmet prerequisite(s): {self._missing(course)}.")
+
+    @Rule(*_FAILED_OPEN, _OFFERED, NOT(Missing(course=MATCH.course)), *_LOAD, _EXCEEDS, salience=FAILED_FIRST)
+    def failed_over_limit(self, course, code):
+        self._decide(1, course, f"{self.catalog.codes[code]} is not added because it would exceed the credit limit.")
+
+    @Rule(*_FAILED_OPEN, _OFFERED, NOT(Missing(course=MATCH.course)), *_LOAD, _FITS, salience=FAILED_FIRST)
+    def failed_selected(self, course, code, credits):
+        self._select(1, course, code, credits,
+                     f"{self.catalog.codes[code]} is prioritized because you failed it previously and met its prerequisites.")
+
+    # Step 2: Recommend other eligible courses
+
+    @Rule(*_OPEN, _NOT_OFFERED, salience=OTHERS)
+    def not_offered(self, course, code):
+        self._decide(2, course, f"{self.catalog.codes[code]} is not offered in the {self.student_data['semester']} semester.")
+
+    @Rule(*_OPEN, _OFFERED, Missing(course=MATCH.course), salience=OTHERS)
+    def unmet_prerequisites(self, course, code):
+        self._decide(2, course, f"{self.catalog.codes[code]} is not recommended due to unmet prerequisite(s): {self._missing(course)}.")
+
+    @Rule(*_OPEN, _OFFERED, NOT(Missing(course=MATCH.course)), Pending(course=MATCH.course), salience=OTHERS)
+    def unmet_corequisites(self, course, code):
+        codes = self.catalog.codes
+        pending = ", ".join(codes[c] for c in self.catalog.corequisite_ids(course) if not self.passed[c])
+        self._decide(2, course, f"{codes[code]} is not recommended due to unmet co-requisite(s): {pending}.")
+
+    @Rule(*_OPEN, _OFFERED, NOT(Missing(course=MATCH.course)), NOT(Pending(course=MATCH.course)),
+          *_LOAD, _EXCEEDS, salience=OTHERS)
+    def over_limit(self, course, code):
+        self._decide(2, course, f"{self.catalog.codes[code]} is not added because it would exceed the credit limit.")
+
+    @Rule(*_OPEN, _OFFERED, NOT(Missing(course=MATCH.course)), NOT(Pending(course=MATCH.course)),
+          *_LOAD, _FITS, salience=OTHERS)
+    def recommended(self, course, code, credits):
+        codes = self.catalog.codes
+        prereqs = self.catalog.prerequisite_ids(course)
+        if course in self.catalog.requirements:
+            prereqs = [p for p in prereqs if self.passed[p]]
+        if prereqs:
+            explanation = f"{codes[code]} is recommended because you passed {', '.join(codes[p] for p in prereqs)}, its prerequisite(s)."
+        else:
+            explanation = f"{codes[code]} is recommended because it has no prerequisites."
+        self._select(2, course, code, credits, explanation)
+
+
+def benchmark(courses, student_data: Mapping, policies_df: pd.DataFrame, updates: Iterable[str],
+              repeat: int = 5) -> Dict[str, float]:
+    """Milliseconds per advising run for the monolithic and fine-grained rules.
+
+    ``updates`` are course codes passed one at a time, as in an advising
+    session where the student ticks courses off. The monolithic engine is
+    rebuilt for every update; the Rete engine is built once and updated.
+    """
+    updates = list(updates)
+    timings = {}
+
+    def monolithic(profile):
+        # Timing runs advise no one: not traced
+        engine = AdvisingEngine(courses, profile, policies_df, recorder=False)
+        engine.reset()
+        engine.declare(StudentProfile(**profile))
+        engine.run()
+        return engine
+
+    started = time.perf_counter()
+    for _ in range(repeat):
+        monolithic(student_data)
+    timings["monolithic: full run"] = (time.perf_counter() - started) / repeat * 1000
+
+    started = time.perf_counter()
+    for _ in range(repeat):
+        engine = ReteAdvisingEngine(courses, student_data, policies_df)
+        engine.reset()
+        engine.advise()
+    timings["rete: full run"] = (time.perf_counter() - started) / repeat * 1000
+
+    if updates:
+        started = time.perf_counter()
+        profile = dict(student_data, passed_courses=list(student_data["passed_courses"]))
+        for code in updates:
+            profile["passed_courses"].append(code)
+            monolithic(profile)
+        timings["monolithic: per update"] = (time.perf_counter() - started) / len(updates) * 1000
+
+        engine = ReteAdvisingEngine(courses, student_data, policies_df)
+        engine.reset()
+        engine.advise()
+        started = time.perf_counter()
+        for code in updates:
+            engine.add_passed(code)
+            engine.advise()
+        timings["rete: per update"] = (time.perf_counter() - started) / len(updates) * 1000
+    return timings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the monolithic and fine-grained advising rules")
+    parser.add_argument("--courses", default="data/courses.csv")
+    parser.add_argument("--policies", default="data/policies.csv")
+    parser.add_argument("--semester", default="FALL")
+    parser.add_argument("--cgpa", type=float, default=3.0)
+    parser.add_argument("--updates", type=int, default=10, help="number of courses passed one at a time")
+    args = parser.parse_args(argv)
+
+    from integration.catalog_store import get_store
+
+    courses = get_store(args.courses).current().df.fillna("").to_dict(orient="records")
+    policies_df = get_store(args.policies).current().df.fillna("")
+    student = {"cgpa": args.cgpa, "semester": args.semester, "passed_courses": [], "failed_courses": []}
+    codes = [str(c["Course Code"]).strip() for c in courses]
+    updates = random.Random(0).sample(codes, min(args.updates, len(codes)))
+    for label, ms in benchmark(courses, student, policies_df, updates).items():
+        print(f"{label:<24} {ms:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
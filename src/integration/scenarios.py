@@ -0,0 +1,116 @@
+from typing import Dict, Iterable, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from integration.compiled_catalog import CompiledCatalog
+
+PROFILE_KEYS = ("cgpa", "semester", "passed_courses", "failed_courses")
+
+
+class ScenarioResult(NamedTuple):
+    """Advice for one what-if scenario"""
+    label: str
+    profile: Dict
+    credit_limit: int
+    recommended: Tuple[str, ...]
+    total_credits: int
+    explanations: List[str]
+
+
+def apply_variation(base_profile: Mapping, variation: Mapping) -> Dict:
+    """Build the student profile for one variation of ``base_profile``.
+
+    A variation overrides any of ``cgpa``, ``semester``, ``passed_courses``
+    and ``failed_courses``; ``also_passed`` lists courses to treat as passed
+    (and no longer failed) on top of the base profile.
+    """
+    profile = {k: base_profile[k] for k in PROFILE_KEYS}
+    profile.update({k: variation[k] for k in PROFILE_KEYS if k in variation})
+    also_passed = [c.strip() for c in variation.get("also_passed", ())]
+    if also_passed:
+        passed = [c.strip() for c in profile["passed_courses"]]
+        profile["passed_courses"] = passed + [c for c in also_passed if c not in passed]
+        profile["failed_courses"] = [c for c in profile["failed_courses"] if c.strip() not in also_passed]
+    return profile
+
+
+def _label(variation: Mapping) -> str:
+    if "label" in variation:
+        return variation["label"]
+    parts = [f"{k}={variation[k]}" for k in ("cgpa", "semester") if k in variation]
+    if variation.get("also_passed"):
+        parts.append("passed " + ", ".join(variation["also_passed"]))
+    for key in ("passed_courses", "failed_courses"):
+        if key in variation:
+            parts.append(f"{key.split('_')[0]}: {', '.join(variation[key]) or 'none'}")
+    return "; ".join(parts) or "Base"
+
+
+def _prerequisite_dependents(catalog: CompiledCatalog) -> Dict[int, List[int]]:
+    dependents: Dict[int, List[int]] = {}
+    for course_id in range(len(catalog)):
+        for code_id in catalog.prerequisite_ids(course_id):
+            dependents.setdefault(code_id, []).append(course_id)
+    return dependents
+
+
+def evaluate_scenarios(courses, base_profile: Mapping, variations: Iterable[Mapping],
+                       policies_df: pd.DataFrame) -> List[ScenarioResult]:
+    """Evaluate a base profile and its variations together.
+
+    The catalog is compiled, the credit-limit policies parsed and the unmet
+    prerequisites of every course computed once for the base profile. Each
+    variation then only recomputes what its inputs touch: the credit limit
+    for a new CGPA (cached per CGPA), and unmet prerequisites for courses
+    that require a course whose passed status differs from the base. The
+    results match running ``AdvisingEngine`` once per scenario; the first
+    result is the base profile itself.
+    """
+    from Inference_engine_KBS import credit_limit_for, credit_limit_rules, select_courses, unmet_prerequisites
+
+    catalog = courses if isinstance(courses, CompiledCatalog) else CompiledCatalog.from_records(courses)
+    rules = credit_limit_rules(policies_df)
+    limits: Dict[float, int] = {}
+    base_passed = catalog.mark(base_profile["passed_courses"])
+    base_passed_ids = {i for i, flag in enumerate(base_passed) if flag}
+    base_unmet = [unmet_prerequisites(catalog, base_passed, c) for c in range(len(catalog))]
+    dependents: Optional[Dict[int, List[int]]] = None
+
+    results = []
+    for variation in [{"label": "Base"}] + list(variations):
+        profile = apply_variation(base_profile, variation)
+        passed = catalog.mark(profile["passed_courses"])
+        changed = base_passed_ids.symmetric_difference(i for i, flag in enumerate(passed) if flag)
+        unmet = base_unmet
+        if changed:
+            if dependents is None:
+                dependents = _prerequisite_dependents(catalog)
+            unmet = list(base_unmet)
+            for course_id in {d for code_id in changed for d in dependents.get(code_id, ())}:
+                unmet[course_id] = unmet_prerequisites(catalog, passed, course_id)
+        cgpa = profile["cgpa"]
+        if cgpa not in limits:
+            limits[cgpa] = credit_limit_for(cgpa, rules)
+        selected, total_credits, explanations = select_courses(
+            catalog, passed, catalog.mark(profile["failed_courses"]),
+            profile["semester"], limits[cgpa], unmet,
+        )
+        results.append(ScenarioResult(
+            _label(variation), profile, limits[cgpa],
+            tuple(catalog.code(c) for c in selected), total_credits, explanations,
+        ))
+    return results
+
+
+def side_by_side(results: Sequence[ScenarioResult]) -> pd.DataFrame:
+    """Table of recommended courses (rows) per scenario (columns)"""
+    codes = list(dict.fromkeys(code for result in results for code in result.recommended))
+    table = pd.DataFrame(
+        {result.label: ["✓" if code in result.recommended else "" for code in codes] for result in results},
+        index=codes,
+    )
+    summary = pd.DataFrame(
+        {result.label: [result.credit_limit, result.total_credits] for result in results},
+        index=["Credit limit", "Total credits"],
+    )
+    return pd.concat([table, summary.astype(str)])
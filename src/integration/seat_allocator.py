@@ -0,0 +1,217 @@
+import heapq
+import sys
+from typing import (AbstractSet, Dict, FrozenSet, Iterable, List, Mapping, NamedTuple, Optional, Sequence, Set,
+                    Tuple, Union)
+
+import numpy as np
+import pandas as pd
+
+from integration.compiled_catalog import CompiledCatalog
+from integration.course_index import CourseIndex
+
+# Courses with no capacity entry are treated as unlimited
+UNLIMITED = sys.maxsize
+
+
+class CohortStudent(NamedTuple):
+    """One student's input to the cohort allocator"""
+    student_id: str
+    eligible: Tuple[str, ...]
+    failed: FrozenSet[str]
+    credit_limit: int
+
+
+class Allocation(NamedTuple):
+    """Result of ``allocate_seats``"""
+    assignments: Dict[str, List[Tuple[str, int]]]   # student -> [(course, section)]
+    unassigned: Dict[str, List[str]]                # student -> eligible courses not placed
+    seats_left: Dict[str, int]                      # course -> free seats after allocation
+
+
+def critical_path_values(index: CourseIndex) -> Dict[str, int]:
+    """Length of the longest chain of courses each course unlocks.
+
+    A course that opens a long prerequisite chain should be taken early, so
+    this is used to rank eligible courses after failed-course retakes.
+    """
+    values: Dict[str, int] = {}
+    for root in index.order:
+        if root in values:
+            continue
+        # Iterative post-order DFS; cycles in the catalog count as depth 0
+        stack = [(root, iter(index.dependents.get(root, ())))]
+        on_path = {root}
+        while stack:
+            code, children = stack[-1]
+            child = next(children, None)
+            if child is None:
+                stack.pop()
+                on_path.discard(code)
+                values[code] = max((values.get(d, 0) + 1 for d in index.dependents.get(code, ())
+                                    if d in values and d != code), default=0)
+            elif child not in values and child not in on_path:
+                on_path.add(child)
+                stack.append((child, iter(index.dependents.get(child, ()))))
+    return values
+
+
+def cohort_eligibility(courses: Union[List[Dict], CompiledCatalog], students: Iterable[Mapping],
+                       policies_df: pd.DataFrame, catalog_version: int = 0) -> List[CohortStudent]:
+    """Run the advising rules for each student without the credit cut-off.
+
+    ``students`` are engine inputs (``cgpa``, ``semester``, ``passed_courses``,
+    ``failed_courses``) plus a ``student_id``. The eligible set is what the
+    engine would recommend given an unlimited credit budget.
+    ``catalog_version`` is the catalog store version of ``courses``, as
+    recorded in the decision trace.
+    """
+    from Inference_engine_KBS import AdvisingEngine, StudentProfile
+
+    # Compiled once for the cohort instead of by every student's engine
+    catalog = courses if isinstance(courses, CompiledCatalog) else CompiledCatalog.from_records(courses)
+    cohort = []
+    for student in students:
+        profile = {k: student[k] for k in ("cgpa", "semester", "passed_courses", "failed_courses")}
+        engine = AdvisingEngine(catalog, dict(profile, student_id=str(student["student_id"])), policies_df,
+                                catalog_version=catalog_version)
+        credit_limit = engine.credit_limit
+        engine.credit_limit = float("inf")
+        engine.reset()
+        engine.declare(StudentProfile(**profile))
+        engine.run()
+        cohort.append(CohortStudent(
+            str(student["student_id"]),
+            tuple(str(c["Course Code"]).strip() for c in engine.recommended_courses),
+            frozenset(c.strip() for c in profile["failed_courses"]),
+            int(credit_limit),
+        ))
+    return cohort
+
+
+def _with_corequisites(code: str, corequisites: Mapping[str, Sequence[str]], eligible: AbstractSet[str]) -> List[str]:
+    """``code`` and, transitively, its co-requisites among ``eligible``"""
+    bundle, stack = [code], [code]
+    while stack:
+        for coreq in corequisites.get(stack.pop(), ()):
+            coreq = coreq.strip()
+            if coreq in eligible and coreq not in bundle:
+                bundle.append(coreq)
+                stack.append(coreq)
+    return bundle
+
+
+def allocate_seats(students: Sequence[CohortStudent],
+                   credits: Mapping[str, int],
+                   capacities: Mapping[str, Union[int, Sequence[int]]],
+                   critical_values: Optional[Mapping[str, int]] = None,
+                   corequisites: Optional[Mapping[str, Sequence[str]]] = None) -> Allocation:
+    """Assign section seats to a whole cohort.
+
+    Each student ranks their eligible courses: failed courses first, then by
+    critical-path value, then catalog order. Seats are handed out in rounds;
+    in every round each student proposes their best course that still has
+    seats and fits their credit limit, and proposals are accepted in order of
+    retake first, critical-path value, fewest seats already won, then a
+    rotating student order. A popular course is therefore shared across the
+    cohort instead of going to whoever happens to be advised first. The work
+    is one sort of at most one proposal per student per round, so roughly
+    O(P log S) for P eligible pairs and S students.
+
+    ``corequisites`` maps a course to its co-requisite codes. The engine
+    only finds a course eligible if each co-requisite is passed or eligible
+    too, so a course is placed together with its eligible co-requisites
+    (seats and credits for all of them) or not at all.
+    """
+    critical_values = critical_values or {}
+    corequisites = corequisites or {}
+    codes = sorted({c for s in students for c in s.eligible})
+    course_id = {c: i for i, c in enumerate(codes)}
+    credit_of = [int(credits[c]) for c in codes]
+    value_of = [critical_values.get(c, 0) for c in codes]
+    seats = [UNLIMITED] * len(codes)
+    sections: Dict[str, List[int]] = {}
+    for code, cap in capacities.items():
+        sections[code] = [int(cap)] if isinstance(cap, (int, np.integer)) else [int(c) for c in cap]
+        if code in course_id:
+            seats[course_id[code]] = sum(sections[code])
+
+    preferences, failed_ids, bundles = [], [], []
+    for student in students:
+        ranked = sorted(
+            enumerate(student.eligible),
+            key=lambda item: (item[1] not in student.failed, -critical_values.get(item[1], 0), item[0]),
+        )
+        preferences.append([course_id[code] for _, code in ranked])
+        failed_ids.append({course_id[c] for c in student.failed if c in course_id})
+        eligible = set(student.eligible)
+        bundles.append({course_id[code]: [course_id[c] for c in _with_corequisites(code, corequisites, eligible)]
+                        for code in eligible if corequisites.get(code)})
+
+    n_students = len(students)
+    pointer = [0] * n_students
+    used_credits = [0] * n_students
+    limits = [s.credit_limit for s in students]
+    won: List[List[int]] = [[] for _ in students]
+    held: List[Set[int]] = [set() for _ in students]
+    skipped: List[List[int]] = [[] for _ in students]
+    accepted: List[Tuple[int, int]] = []
+
+    def group(s_idx: int, c_idx: int) -> List[int]:
+        # The course plus the co-requisites the student does not hold yet
+        return [c for c in bundles[s_idx].get(c_idx, (c_idx,)) if c not in held[s_idx]]
+
+    active = list(range(n_students))
+    round_no = 0
+    while active:
+        proposals = []
+        for s_idx in active:
+            prefs, i = preferences[s_idx], pointer[s_idx]
+            while i < len(prefs):
+                if prefs[i] not in held[s_idx]:
+                    courses = group(s_idx, prefs[i])
+                    if (all(seats[c] > 0 for c in courses) and
+                            used_credits[s_idx] + sum(credit_of[c] for c in courses) <= limits[s_idx]):
+                        break
+                    skipped[s_idx].append(prefs[i])
+                # Courses already placed as a co-requisite are passed over
+                i += 1
+            pointer[s_idx] = i
+            if i < len(prefs):
+                c_idx = prefs[i]
+                proposals.append((c_idx not in failed_ids[s_idx], -value_of[c_idx], len(won[s_idx]),
+                                  (s_idx - round_no) % n_students, s_idx, c_idx))
+        proposals.sort()
+        active = []
+        for *_, s_idx, c_idx in proposals:
+            # A proposal that lost a seat this round is skipped next round
+            courses = group(s_idx, c_idx)
+            if all(seats[c] > 0 for c in courses):
+                for c in courses:
+                    seats[c] -= 1
+                    used_credits[s_idx] += credit_of[c]
+                    won[s_idx].append(c)
+                    held[s_idx].add(c)
+                    accepted.append((s_idx, c))
+                pointer[s_idx] += 1
+            active.append(s_idx)
+        round_no += 1
+
+    # Spread each course's students over its sections, emptiest section first
+    free = {code: [(-cap, i) for i, cap in enumerate(caps)] for code, caps in sections.items()}
+    for heap in free.values():
+        heapq.heapify(heap)
+    assignments: Dict[str, List[Tuple[str, int]]] = {s.student_id: [] for s in students}
+    for s_idx, c_idx in accepted:
+        code = codes[c_idx]
+        section = 0
+        heap = free.get(code)
+        if heap:
+            free_seats, section = heapq.heappop(heap)
+            if free_seats + 1 < 0:
+                heapq.heappush(heap, (free_seats + 1, section))
+        assignments[students[s_idx].student_id].append((code, section))
+
+    unassigned = {s.student_id: [codes[c] for c in skipped[i]] for i, s in enumerate(students)}
+    seats_left = {code: seats[course_id[code]] if code in course_id else sum(caps)
+                  for code, caps in sections.items()}
+    return Allocation(assignments, unassigned, seats_left)
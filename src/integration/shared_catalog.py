@@ -0,0 +1,190 @@
+import io
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from typing import Dict, Optional, Tuple
+
+import pandas as pd
+
+from integration.catalog_store import CatalogSnapshot, _file_lock, _file_mode
+from integration.compiled_catalog import CompiledCatalog
+from integration.prerequisites import Requirement, parse_prerequisites
+
+MAGIC = b"KBSCAT02"
+
+# magic, catalog version, digest (NUL padded), course count, code count
+_HEADER = struct.Struct("<8sQ64sQQ")
+
+# Array columns in file order, then the NUL-separated string tables
+_ARRAYS = ("course_code_ids", "credits", "semesters", "prereq_indptr", "prereq_indices",
+           "coreq_indptr", "coreq_indices")
+_TYPECODES = ("i", "H", "B", "i", "i", "i", "i")
+_STRINGS = ("codes", "names", "offered", "descriptions", "requirements")
+_SECTIONS = _ARRAYS + _STRINGS
+
+# Table of contents: (offset, length) in bytes of every section
+_TOC = struct.Struct("<" + "QQ" * len(_SECTIONS))
+
+_ALIGN = 8
+
+
+def catalog_path(store) -> str:
+    """Where the shared image of ``store``'s catalog lives"""
+    table = getattr(store, "table", None)
+    return f"{store.path}.{table}.catalog" if table else f"{store.path}.catalog"
+
+
+def read_header(path: str) -> Optional[Tuple[int, str]]:
+    """(version, digest) of the image at ``path``, or None if there is none"""
+    try:
+        with open(path, "rb") as fh:
+            raw = fh.read(_HEADER.size)
+    except OSError:
+        return None
+    if len(raw) < _HEADER.size:
+        return None
+    magic, version, digest, _, _ = _HEADER.unpack(raw)
+    if magic != MAGIC:
+        return None
+    return version, digest.rstrip(b"\0").decode("ascii")
+
+
+def _unique_rows(df: pd.DataFrame) -> pd.DataFrame:
+    # Same rows, in the same order, as the course index
+    return df[~df["Course Code"].astype(str).str.strip().duplicated()]
+
+
+def compile_snapshot(snapshot: CatalogSnapshot) -> CompiledCatalog:
+    """Compile a catalog snapshot in this process"""
+    return CompiledCatalog.from_frame(_unique_rows(snapshot.df))
+
+
+def encode_catalog(catalog: CompiledCatalog, version: int, digest: str) -> bytes:
+    """Serialize a compiled catalog into the shared image format"""
+    sections = [bytes(getattr(catalog, name)) for name in _ARRAYS]
+    descriptions = [catalog.description(i) for i in range(len(catalog))]
+    # The text of and/or prerequisite expressions, recompiled on attach
+    requirements = [catalog.requirements[i].text if i in catalog.requirements else "" for i in range(len(catalog))]
+    for strings in (catalog.codes, catalog.names, catalog.offered, descriptions, requirements):
+        sections.append("\0".join(strings).encode("utf-8"))
+
+    buffer = io.BytesIO()
+    buffer.write(_HEADER.pack(MAGIC, version, digest.encode("ascii"), len(catalog), len(catalog.codes)))
+    buffer.write(b"\0" * _TOC.size)
+    toc = []
+    for raw in sections:
+        buffer.write(b"\0" * (-buffer.tell() % _ALIGN))
+        toc.extend((buffer.tell(), len(raw)))
+        buffer.write(raw)
+    buffer.seek(_HEADER.size)
+    buffer.write(_TOC.pack(*toc))
+    return buffer.getvalue()
+
+
+class SharedCatalog:
+    """A compiled catalog attached read-only from a memory-mapped image.
+
+    The array columns of ``catalog`` are views straight into the mapping, so
+    every process attached to the same image shares one copy of them in the
+    page cache. Names and codes are decoded on attach; descriptions only when
+    first asked for. A new image is swapped in with ``os.replace``, which
+    leaves this mapping (and anything still using it) intact.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as fh:
+            self._mmap = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+        magic, version, digest, n_courses, n_codes = _HEADER.unpack_from(view)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a shared catalog image")
+        self.version = version
+        self.digest = digest.rstrip(b"\0").decode("ascii")
+        toc = _TOC.unpack_from(view, _HEADER.size)
+        sections = {name: view[toc[2 * i]:toc[2 * i] + toc[2 * i + 1]] for i, name in enumerate(_SECTIONS)}
+
+        def strings(name, count):
+            if not count:
+                return []
+            return str(sections[name], "utf-8").split("\0")
+
+        columns = {name: sections[name].cast(typecode) for name, typecode in zip(_ARRAYS, _TYPECODES)}
+        codes = strings("codes", n_codes)
+        code_ids = {code: i for i, code in enumerate(codes)}
+        requirements = {i: Requirement(parse_prerequisites(text), code_ids.__getitem__)
+                        for i, text in enumerate(strings("requirements", n_courses)) if text}
+        self.catalog = CompiledCatalog(
+            codes, columns["course_code_ids"], strings("names", n_courses),
+            columns["credits"], strings("offered", n_courses), columns["semesters"],
+            columns["prereq_indptr"], columns["prereq_indices"],
+            columns["coreq_indptr"], columns["coreq_indices"],
+            descriptions=lambda: strings("descriptions", n_courses),
+            requirements=requirements,
+        )
+
+    def is_stale(self) -> bool:
+        """True once a different image has been published at ``path``"""
+        return read_header(self.path) != (self.version, self.digest)
+
+
+def publish_catalog(snapshot: CatalogSnapshot, path: str) -> bool:
+    """Write the image of ``snapshot`` to ``path`` unless it is already there.
+
+    Returns False if a newer version has been published by another process,
+    in which case the file is left alone.
+    """
+    with _file_lock(path + ".lock"):
+        header = read_header(path)
+        if header == (snapshot.version, snapshot.digest):
+            return True
+        if header is not None and header[0] > snapshot.version:
+            return False
+        raw = encode_catalog(compile_snapshot(snapshot), snapshot.version, snapshot.digest)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(raw)
+            # Other users' processes map the image too; mkstemp makes it 0600
+            os.chmod(tmp, _file_mode(path))
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        return True
+
+
+_attached: Dict[str, SharedCatalog] = {}
+_attached_lock = threading.Lock()
+
+
+def get_shared_catalog(store, snapshot: Optional[CatalogSnapshot] = None) -> CompiledCatalog:
+    """Return the compiled catalog of ``snapshot`` (default: the current version).
+
+    The first process to need a version compiles it and publishes the image
+    next to the store; every other process, and every later call in this
+    one, just maps it. If the image cannot be shared (a newer version is
+    already published, or the file system refuses), the catalog is compiled
+    privately instead.
+    """
+    if snapshot is None:
+        snapshot = store.current()
+    path = catalog_path(store)
+    with _attached_lock:
+        shared = _attached.get(path)
+        if shared is not None and (shared.version, shared.digest) == (snapshot.version, snapshot.digest):
+            return shared.catalog
+        try:
+            if read_header(path) != (snapshot.version, snapshot.digest) and not publish_catalog(snapshot, path):
+                return compile_snapshot(snapshot)
+            shared = SharedCatalog(path)
+        except OSError:
+            return compile_snapshot(snapshot)
+        if (shared.version, shared.digest) != (snapshot.version, snapshot.digest):
+            # Replaced by another process between publishing and mapping
+            return compile_snapshot(snapshot)
+        _attached[path] = shared
+        return shared.catalog
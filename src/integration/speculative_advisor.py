@@ -0,0 +1,399 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Mapping, NamedTuple, Optional, Tuple
+
+from integration.catalog_watcher import KnowledgeBaseSnapshot, LiveKnowledgeBase
+from integration.compiled_catalog import CompiledCatalog
+from integration.course_index import CatalogDiff
+from integration.decision_trace import get_trace_recorder
+from integration.impact import reordered
+
+logger = logging.getLogger(__name__)
+
+# Inputs have to stay unchanged this long (seconds) before advising starts
+DEFAULT_SETTLE = 0.3
+DEFAULT_CACHE_SIZE = 256
+
+# (catalog version, policies version, cgpa, semester, passed, failed)
+AdviceKey = Tuple[int, int, float, str, Tuple[str, ...], Tuple[str, ...]]
+
+
+class Advice(NamedTuple):
+    recommended_courses: List
+    explanations: List[str]
+    total_credits: int
+    credit_limit: int
+    # Reference of the decision trace run that computed the advice
+    trace: str = ""
+
+
+def advise(knowledge_base: LiveKnowledgeBase, student_input: Mapping) -> Advice:
+    """Run the advising engine on the current version of the knowledge base"""
+    from Inference_engine_KBS import AdvisingEngine, StudentProfile
+
+    # Catalog, policies and version of one reload, even if another lands meanwhile
+    snapshot = knowledge_base.snapshot()
+    engine = AdvisingEngine(snapshot.catalog, student_input, snapshot.policies_df, catalog_version=snapshot.version)
+    engine.reset()
+    engine.declare(StudentProfile(**student_input))
+    engine.run()
+    return Advice(engine.recommended_courses, engine.explanations, engine.total_credits, engine.credit_limit,
+                  engine.trace_reference)
+
+
+class _Job:
+    __slots__ = ("session", "key", "student_input", "future", "cancelled", "running", "done")
+
+    def __init__(self, session: str, key: AdviceKey, student_input: Mapping):
+        self.session = session
+        self.key = key
+        self.student_input = dict(student_input)
+        # Set once the settle delay is over and the job is handed to the pool
+        self.future: Optional[Future] = None
+        self.cancelled = False
+        # Set by the worker when it starts advising
+        self.running = False
+        self.done = threading.Event()
+
+    def cancel(self) -> None:
+        self.cancelled = True
+        if self.future is not None:
+            self.future.cancel()
+        if not self.running:
+            self.done.set()
+
+
+class _Scheduler(threading.Thread):
+    """Hands jobs to the pool once their settle delay is over.
+
+    Waiting happens here, in one thread, so pool workers only ever advise.
+    Cancelled jobs are dropped when they come due.
+    """
+
+    def __init__(self, start: Callable[[_Job], None]):
+        super().__init__(name="speculative-advisor-scheduler", daemon=True)
+        self._start = start
+        self._queue: List[Tuple[float, int, _Job]] = []
+        self._order = itertools.count()
+        self._condition = threading.Condition()
+        self._stopped = False
+
+    def schedule(self, job: _Job, delay: float) -> None:
+        with self._condition:
+            heapq.heappush(self._queue, (time.monotonic() + delay, next(self._order), job))
+            self._condition.notify()
+
+    def stop(self) -> None:
+        with self._condition:
+            self._stopped = True
+            self._queue.clear()
+            self._condition.notify()
+
+    def run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._stopped and (not self._queue or self._queue[0][0] > time.monotonic()):
+                    self._condition.wait(self._queue[0][0] - time.monotonic() if self._queue else None)
+                if self._stopped:
+                    return
+                _, _, job = heapq.heappop(self._queue)
+            if not job.cancelled:
+                self._start(job)
+
+
+class SpeculativeAdvisor:
+    """Advises students in the background while they are still filling the form.
+
+    Every rerun of the page passes the current inputs to ``speculate``. A job
+    waits ``settle`` seconds and is cancelled if the same session sends
+    different inputs in the meantime, so only inputs that have stopped
+    changing get advised. The delay is kept by a scheduler thread, and a
+    job only takes a pool worker once it is due. Results are cached by the
+    inputs and the catalog and policies versions, and ``result`` (on
+    submit) returns the cached advice, waits for the job already running
+    for those inputs, or advises on the spot otherwise; a job still
+    waiting for its delay or for a worker is cancelled rather than waited
+    for, so a click never queues behind other sessions' speculation.
+    Advice that ``result`` did not compute itself is recorded in the
+    decision trace as served from the run that did.
+
+    With a ``store`` (a ``RecommendationCache``) advice is also looked up in
+    and saved to disk, behind the in-memory cache. Whenever the catalog or
+    policies change, and once at start-up, the store's entries for other
+    contents are dropped and those students are advised again in the
+    background, so a restart or an edit does not start cold. A catalog edit
+    only reaches the students who have not passed every course it touches;
+    the others keep their stored advice (see ``rewarm``). Re-advising runs on
+    a thread of its own and steps aside while any student is being
+    advised, so it never holds up interactive advice.
+    """
+
+    def __init__(self, knowledge_base: LiveKnowledgeBase, max_workers: int = 2,
+                 settle: float = DEFAULT_SETTLE, cache_size: int = DEFAULT_CACHE_SIZE, store=None):
+        self.knowledge_base = knowledge_base
+        self.settle = settle
+        self.cache_size = cache_size
+        self.store = store
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="speculative-advisor")
+        self._warm_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="recommendation-warmer")
+        self._cache: "OrderedDict[AdviceKey, Advice]" = OrderedDict()
+        self._jobs: Dict[str, _Job] = {}
+        self._lock = threading.Lock()
+        # Notified when no student is being advised (``_busy`` drops to 0)
+        self._idle = threading.Condition(self._lock)
+        self._busy = 0
+        self._closed = False
+        # Digests and catalog the store was last brought up to date with
+        self._basis: Optional[Tuple[Tuple[str, str], CompiledCatalog]] = None
+        self._rewarm_lock = threading.Lock()
+        self._scheduler = _Scheduler(self._start)
+        self._scheduler.start()
+        if store is not None:
+            knowledge_base.add_listener(self._reloaded)
+            self.rewarm()
+
+    def key(self, student_input: Mapping) -> AdviceKey:
+        # Course order does not change the advice, so it is not part of the key
+        return (self.knowledge_base.version, self.knowledge_base.policies_version,
+                float(student_input["cgpa"]), student_input["semester"].strip().upper(),
+                tuple(sorted({c.strip() for c in student_input["passed_courses"]})),
+                tuple(sorted({c.strip() for c in student_input["failed_courses"]})))
+
+    def cached(self, student_input: Mapping) -> Optional[Advice]:
+        key = self.key(student_input)
+        with self._lock:
+            advice = self._cache.get(key)
+            if advice is not None:
+                self._cache.move_to_end(key)
+            return advice
+
+    def speculate(self, session: str, student_input: Mapping) -> None:
+        """Start advising ``student_input`` for ``session`` once it settles.
+
+        A job of the same session for different inputs is cancelled.
+        """
+        key = self.key(student_input)
+        with self._lock:
+            job = self._jobs.get(session)
+            if job is not None:
+                if job.key == key and not job.cancelled:
+                    return
+                job.cancel()
+                del self._jobs[session]
+            if key in self._cache:
+                return
+            job = _Job(session, key, student_input)
+            self._jobs[session] = job
+        self._scheduler.schedule(job, self.settle)
+
+    def result(self, session: str, student_input: Mapping, timeout: Optional[float] = None) -> Advice:
+        """The advice for ``student_input``, as soon as it is available"""
+        key = self.key(student_input)
+        running = None
+        with self._lock:
+            advice = self._cache.get(key)
+            job = self._jobs.get(session) if advice is None else None
+            if advice is not None:
+                self._cache.move_to_end(key)
+            elif job is not None and job.key == key and job.running and not job.cancelled:
+                running = job
+            elif job is not None:
+                # Not started yet: advising here is quicker than waiting for a worker
+                job.cancel()
+                del self._jobs[session]
+        if advice is not None:
+            return self._served(advice, student_input)
+        if running is not None:
+            try:
+                advice = running.future.result(timeout)
+            except Exception:
+                logger.exception("Waiting for the speculative advice failed; advising again")
+                advice = None
+            if advice is not None:
+                return self._served(advice, student_input)
+        advice, fresh = self._advise(key, student_input)
+        return advice if fresh else self._served(advice, student_input)
+
+    def _served(self, advice: Advice, student_input: Mapping) -> Advice:
+        recorder = get_trace_recorder()
+        if recorder is not None:
+            recorder.hit(advice.trace, student_input, self.knowledge_base.version)
+        return advice
+
+    def cancel(self, session: str) -> None:
+        """Drop the pending job of ``session``, e.g. when its inputs are invalid"""
+        with self._lock:
+            job = self._jobs.pop(session, None)
+            if job is not None:
+                job.cancel()
+
+    def _start(self, job: _Job) -> None:
+        with self._lock:
+            if job.cancelled or self._closed or self._jobs.get(job.session) is not job:
+                return
+            job.future = self._executor.submit(self._run, job)
+
+    def _run(self, job: _Job) -> Optional[Advice]:
+        try:
+            with self._lock:
+                if job.cancelled:
+                    return None
+                job.running = True
+                advice = self._cache.get(job.key)
+            if advice is None:
+                advice, _ = self._advise(job.key, job.student_input)
+            return None if job.cancelled else advice
+        except Exception:
+            logger.exception("Speculative advising failed")
+            return None
+        finally:
+            with self._lock:
+                if self._jobs.get(job.session) is job:
+                    del self._jobs[job.session]
+            job.done.set()
+
+    def _reloaded(self, diff: CatalogDiff, policies_changed: bool) -> None:
+        self.rewarm(None if policies_changed else diff)
+
+    def rewarm(self, diff: Optional[CatalogDiff] = None) -> Optional[Future]:
+        """Drop stored advice of other catalog or policies contents and advise
+        those students again in the background.
+
+        ``diff`` is the change of the catalog since the last call, if the
+        policies stayed the same. The engine never reads the row of a course
+        the student has passed, so the advice of students who passed every
+        course in the diff is carried over to the new catalog instead.
+        """
+        with self._lock:
+            if self._closed:
+                return None
+        with self._rewarm_lock:
+            snapshot = self.knowledge_base.snapshot()
+            basis, self._basis = self._basis, (snapshot.digests, snapshot.catalog)
+            if diff is not None and basis is not None:
+                self._carry_over(basis, snapshot, diff)
+            profiles = self.store.invalidate(snapshot.digests)
+        if not profiles:
+            return None
+        with self._lock:
+            if self._closed:
+                return None
+            return self._warm_executor.submit(self._warm, snapshot.digests, profiles)
+
+    def _carry_over(self, basis: Tuple[Tuple[str, str], CompiledCatalog], snapshot: KnowledgeBaseSnapshot,
+                    diff: CatalogDiff) -> int:
+        digests, catalog = basis
+        if digests == snapshot.digests or digests[1] != snapshot.digests[1]:
+            return 0
+        # Explanations follow the catalog order, so reordering changes everyone's
+        if reordered(catalog, snapshot.catalog):
+            return 0
+        touched = diff.touched
+        return self.store.carry_over(digests, snapshot.digests,
+                                     lambda profile: touched <= set(profile["passed_courses"]))
+
+    def _warm(self, digests, profiles: List[Mapping]) -> int:
+        try:
+            return self.store.warm(digests, profiles, lambda profile: advise(self.knowledge_base, profile),
+                                   current=lambda: None if self._closed else self.knowledge_base.digests,
+                                   pause=self._wait_idle)
+        except Exception:
+            logger.exception("Warming the recommendation cache failed")
+            return 0
+
+    def _wait_idle(self) -> None:
+        with self._idle:
+            while self._busy and not self._closed:
+                self._idle.wait()
+
+    def _advise(self, key: AdviceKey, student_input: Mapping) -> Tuple[Advice, bool]:
+        """(advice, whether it was computed now rather than found in the store)"""
+        with self._lock:
+            self._busy += 1
+        try:
+            return self._advise_now(key, student_input)
+        finally:
+            with self._idle:
+                self._busy -= 1
+                if not self._busy:
+                    self._idle.notify_all()
+
+    def _advise_now(self, key: AdviceKey, student_input: Mapping) -> Tuple[Advice, bool]:
+        advice = None
+        if self.store is not None:
+            digests = self.knowledge_base.digests
+            advice = self.store.get(digests, student_input)
+        fresh = advice is None
+        if fresh:
+            advice = advise(self.knowledge_base, student_input)
+            if self.store is not None and self.knowledge_base.digests == digests:
+                self.store.put(digests, student_input, advice)
+        if self.key(student_input) != key:
+            # The catalog or policies were reloaded meanwhile; do not file
+            # this advice under the old versions
+            return advice, fresh
+        with self._lock:
+            self._cache[key] = advice
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return advice, fresh
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self._closed = True
+            for job in self._jobs.values():
+                job.cancel()
+            self._jobs.clear()
+            self._idle.notify_all()
+        self._scheduler.stop()
+        self._executor.shutdown(wait=True)
+        self._warm_executor.shutdown(wait=True)
+
+
+_advisors: Dict[tuple, SpeculativeAdvisor] = {}
+_advisors_lock = threading.Lock()
+
+
+def _advisor_key(knowledge_base: LiveKnowledgeBase) -> tuple:
+    return tuple((store.path, getattr(store, "table", None))
+                 for store in (knowledge_base.courses_store, knowledge_base.policies_store))
+
+
+def get_speculative_advisor(knowledge_base: LiveKnowledgeBase) -> SpeculativeAdvisor:
+    """Return the process-wide advisor (and thread pool) for ``knowledge_base``.
+
+    There is one advisor per pair of catalog and policies stores, like the
+    knowledge bases of ``get_knowledge_base``; an advisor left over from an
+    earlier knowledge base of the same stores is shut down and replaced.
+    It keeps its advice in the persistent recommendation cache
+    (``KBS_RECOMMENDATION_CACHE``) unless that is turned off.
+    """
+    from integration.recommendation_cache import get_recommendation_cache
+
+    key = _advisor_key(knowledge_base)
+    with _advisors_lock:
+        advisor = stale = _advisors.get(key)
+        if advisor is None or advisor.knowledge_base is not knowledge_base:
+            advisor = _advisors[key] = SpeculativeAdvisor(knowledge_base, store=get_recommendation_cache())
+        else:
+            stale = None
+    if stale is not None:
+        stale.shutdown()
+    return advisor
+
+
+def forget_speculative_advisor(knowledge_base: LiveKnowledgeBase) -> None:
+    """Shut down the process-wide advisor of ``knowledge_base``, if there is one"""
+    key = _advisor_key(knowledge_base)
+    with _advisors_lock:
+        advisor = _advisors.get(key)
+        if advisor is None or advisor.knowledge_base is not knowledge_base:
+            return
+        del _advisors[key]
+    advisor.shutdown()
@@ -0,0 +1,322 @@
+import argparse
+import hashlib
+import os
+import sqlite3
+import sys
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+import pandas as pd
+
+# Add src/ to sys.path so this also runs as a script
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from integration.catalog_store import CatalogConflictError, CatalogSnapshot, CatalogStore, get_csv_store
+from integration.course_index import diff_catalogs
+from integration.prerequisites import is_expression, prerequisite_codes
+
+DEFAULT_DATABASE = "data/kbs.sqlite3"
+
+COURSE_COLUMNS = ["Course Code", "Course Name", "Description", "Prerequisites",
+                  "Co-requisites", "Credit Hours", "Semester Offered"]
+POLICY_COLUMNS = ["Category", "Condition", "max", "Policy Description"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS courses (
+    code TEXT PRIMARY KEY,
+    name TEXT NOT NULL DEFAULT '',
+    description TEXT NOT NULL DEFAULT '',
+    credit_hours INTEGER NOT NULL,
+    semester_offered TEXT NOT NULL DEFAULT '',
+    position INTEGER NOT NULL,
+    prerequisite_expression TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_courses_semester ON courses(semester_offered);
+CREATE INDEX IF NOT EXISTS idx_courses_position ON courses(position);
+CREATE TABLE IF NOT EXISTS course_requisites (
+    course_code TEXT NOT NULL REFERENCES courses(code) ON DELETE CASCADE,
+    kind TEXT NOT NULL CHECK (kind IN ('pre', 'co')),
+    required_code TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (course_code, kind, position)
+);
+CREATE INDEX IF NOT EXISTS idx_requisites_required ON course_requisites(required_code, kind);
+CREATE TABLE IF NOT EXISTS policies (
+    id INTEGER PRIMARY KEY,
+    category TEXT NOT NULL,
+    condition TEXT NOT NULL DEFAULT '',
+    max TEXT NOT NULL DEFAULT '',
+    description TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_policies_category ON policies(category);
+"""
+
+
+def storage_backend() -> str:
+    """Configured storage backend: ``csv`` (default) or ``sqlite``"""
+    return os.environ.get("KBS_STORAGE", "csv").strip().lower()
+
+
+def _clean(value) -> str:
+    return "" if pd.isna(value) else str(value).strip()
+
+
+def _split_codes(value) -> List[str]:
+    return [c.strip() for c in _clean(value).split(",") if c.strip()]
+
+
+def connect(database: str) -> sqlite3.Connection:
+    """Open the knowledge-base database, creating the schema if needed"""
+    conn = sqlite3.connect(database, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    conn.executescript(SCHEMA)
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(courses)")}
+    if "prerequisite_expression" not in columns:
+        # Databases migrated before and/or prerequisites were supported
+        conn.execute("ALTER TABLE courses ADD COLUMN prerequisite_expression TEXT NOT NULL DEFAULT ''")
+    return conn
+
+
+@contextmanager
+def _transaction(conn: sqlite3.Connection) -> Iterator[sqlite3.Connection]:
+    # IMMEDIATE takes the write lock up front so the version check and the
+    # write cannot interleave with another writer
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+def _version(conn: sqlite3.Connection, table: str) -> int:
+    row = conn.execute("SELECT value FROM meta WHERE key = ?", (table,)).fetchone()
+    return row[0] if row else 0
+
+
+def _bump_version(conn: sqlite3.Connection, table: str) -> int:
+    version = _version(conn, table) + 1
+    conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (table, version))
+    return version
+
+
+def _insert_courses(conn: sqlite3.Connection, df: pd.DataFrame, codes) -> None:
+    codes = set(codes)
+    for position, row in enumerate(df.itertuples(index=False)):
+        row = dict(zip(df.columns, row))
+        code = _clean(row["Course Code"])
+        if code not in codes:
+            continue
+        # An and/or expression is kept as written; its requisite rows list
+        # every course it mentions so dependents() still finds them
+        prerequisites = _clean(row.get("Prerequisites"))
+        expression = prerequisites if is_expression(prerequisites) else ""
+        conn.execute(
+            "INSERT INTO courses (code, name, description, credit_hours, semester_offered, position, "
+            "prerequisite_expression) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (code, _clean(row.get("Course Name")), _clean(row.get("Description")),
+             int(row["Credit Hours"]), _clean(row.get("Semester Offered")), position, expression),
+        )
+        for kind, required in (("pre", prerequisite_codes(prerequisites)), ("co", _split_codes(row.get("Co-requisites")))):
+            conn.executemany(
+                "INSERT INTO course_requisites (course_code, kind, required_code, position) VALUES (?, ?, ?, ?)",
+                [(code, kind, required_code, i) for i, required_code in enumerate(required)],
+            )
+        codes.discard(code)
+
+
+def _read_courses(conn: sqlite3.Connection) -> pd.DataFrame:
+    courses = pd.read_sql_query(
+        "SELECT code, name, description, credit_hours, semester_offered, prerequisite_expression "
+        "FROM courses ORDER BY position", conn)
+    requisites = pd.read_sql_query(
+        "SELECT course_code, kind, required_code FROM course_requisites ORDER BY course_code, kind, position", conn)
+    joined = requisites.groupby(["course_code", "kind"])["required_code"].agg(", ".join)
+    pre = joined.xs("pre", level="kind") if "pre" in requisites["kind"].values else pd.Series(dtype=object)
+    co = joined.xs("co", level="kind") if "co" in requisites["kind"].values else pd.Series(dtype=object)
+    return pd.DataFrame({
+        "Course Code": courses["code"],
+        "Course Name": courses["name"],
+        "Description": courses["description"],
+        "Prerequisites": courses["prerequisite_expression"].where(
+            courses["prerequisite_expression"] != "", courses["code"].map(pre).fillna("")),
+        "Co-requisites": courses["code"].map(co).fillna(""),
+        "Credit Hours": courses["credit_hours"].astype(int),
+        "Semester Offered": courses["semester_offered"],
+    })
+
+
+def _read_policies(conn: sqlite3.Connection) -> pd.DataFrame:
+    df = pd.read_sql_query("SELECT category, condition, max, description FROM policies ORDER BY id", conn)
+    df.columns = POLICY_COLUMNS
+    return df
+
+
+def _replace_policies(conn: sqlite3.Connection, df: pd.DataFrame) -> None:
+    conn.execute("DELETE FROM policies")
+    conn.executemany(
+        "INSERT INTO policies (category, condition, max, description) VALUES (?, ?, ?, ?)",
+        [tuple(_clean(row.get(c)) for c in POLICY_COLUMNS) for row in df.to_dict(orient="records")],
+    )
+
+
+class SqliteCatalogStore(CatalogStore):
+    """``CatalogStore`` backed by a table of the SQLite knowledge base.
+
+    Reads and writes go through SQLite transactions (WAL mode, so readers
+    never wait for the editor) and the version lives in the ``meta`` table.
+    Publishing a course catalog only touches the rows that changed.
+    """
+
+    def __init__(self, database: str, table: str):
+        super().__init__(database)
+        if table not in ("courses", "policies"):
+            raise ValueError(f"Unknown knowledge-base table: {table}")
+        self.table = table
+        self._local = threading.local()
+
+    @property
+    def watch_paths(self) -> List[str]:
+        return [self.path, self.path + "-wal"]
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = connect(self.path)
+        return conn
+
+    def current(self) -> CatalogSnapshot:
+        conn = self._conn()
+        version = _version(conn, self.table)
+        with self._mutex:
+            if self._current is not None and self._current.version == version:
+                return self._current
+        conn.execute("BEGIN")
+        try:
+            version = _version(conn, self.table)
+            df = _read_courses(conn) if self.table == "courses" else _read_policies(conn)
+        finally:
+            conn.execute("COMMIT")
+        snapshot = CatalogSnapshot(version, self._digest(df), df, (version,))
+        with self._mutex:
+            return self._install(snapshot)
+
+    def publish(self, df: pd.DataFrame, expected_version: Optional[int] = None) -> CatalogSnapshot:
+        conn = self._conn()
+        with _transaction(conn):
+            version = _version(conn, self.table)
+            if expected_version is not None and expected_version != version:
+                raise CatalogConflictError(f"{self.table} is at version {version}, expected {expected_version}")
+            if self.table == "courses":
+                old = _read_courses(conn)
+                diff = diff_catalogs(old, df[COURSE_COLUMNS])
+                stale = diff.removed + diff.changed
+                conn.executemany("DELETE FROM courses WHERE code = ?", [(c,) for c in stale])
+                _insert_courses(conn, df, diff.added + diff.changed)
+                if diff.added or diff.removed:
+                    codes = df["Course Code"].astype(str).str.strip()
+                    conn.executemany("UPDATE courses SET position = ? WHERE code = ?",
+                                     [(i, c) for i, c in enumerate(codes)])
+                new_df = _read_courses(conn)
+            else:
+                _replace_policies(conn, df)
+                new_df = _read_policies(conn)
+            version = _bump_version(conn, self.table)
+        snapshot = CatalogSnapshot(version, self._digest(new_df), new_df, (version,))
+        with self._mutex:
+            return self._install(snapshot)
+
+    def get_course(self, code: str) -> Optional[Dict]:
+        """Indexed lookup of one course"""
+        row = self._conn().execute(
+            "SELECT code, name, description, credit_hours, semester_offered, prerequisite_expression "
+            "FROM courses WHERE code = ?",
+            (code.strip(),)).fetchone()
+        if row is None:
+            return None
+        requisites = self._conn().execute(
+            "SELECT kind, required_code FROM course_requisites WHERE course_code = ? ORDER BY kind, position",
+            (row[0],)).fetchall()
+        return {
+            "Course Code": row[0], "Course Name": row[1], "Description": row[2],
+            "Prerequisites": row[5] or ", ".join(r for k, r in requisites if k == "pre"),
+            "Co-requisites": ", ".join(r for k, r in requisites if k == "co"),
+            "Credit Hours": row[3], "Semester Offered": row[4],
+        }
+
+    def courses_offered(self, semester: str) -> List[str]:
+        """Codes of courses offered in ``semester`` (or in both semesters)"""
+        rows = self._conn().execute(
+            "SELECT code FROM courses WHERE semester_offered = ? OR semester_offered = 'BOTH' ORDER BY position",
+            (semester.strip().upper(),)).fetchall()
+        return [r[0] for r in rows]
+
+    def dependents(self, code: str, kind: str = "pre") -> List[str]:
+        """Courses that list ``code`` as a prerequisite (or co-requisite)"""
+        rows = self._conn().execute(
+            "SELECT course_code FROM course_requisites WHERE required_code = ? AND kind = ?",
+            (code.strip(), kind)).fetchall()
+        return [r[0] for r in rows]
+
+    @staticmethod
+    def _digest(df: pd.DataFrame) -> str:
+        return hashlib.sha1(df.to_csv(index=False).encode("utf-8")).hexdigest()
+
+
+_sqlite_stores: Dict[tuple, SqliteCatalogStore] = {}
+_sqlite_lock = threading.Lock()
+
+
+def get_sqlite_store(table: str, database: Optional[str] = None) -> SqliteCatalogStore:
+    """Return the process-wide store for one table of the configured database"""
+    database = os.path.abspath(database or os.environ.get("KBS_DATABASE", DEFAULT_DATABASE))
+    with _sqlite_lock:
+        store = _sqlite_stores.get((database, table))
+        if store is None:
+            store = _sqlite_stores[(database, table)] = SqliteCatalogStore(database, table)
+        return store
+
+
+def migrate_from_csv(courses_csv: str, policies_csv: str, database: str) -> Dict[str, int]:
+    """Load the CSV knowledge base into ``database``, replacing its contents"""
+    courses = get_csv_store(courses_csv).current().df
+    policies = get_csv_store(policies_csv).current().df
+    policies = policies[[c for c in POLICY_COLUMNS if c in policies.columns]]
+    conn = connect(database)
+    try:
+        with _transaction(conn):
+            conn.execute("DELETE FROM courses")
+            _insert_courses(conn, courses, courses["Course Code"].astype(str).str.strip())
+            _replace_policies(conn, policies)
+            _bump_version(conn, "courses")
+            _bump_version(conn, "policies")
+        return {
+            "courses": conn.execute("SELECT COUNT(*) FROM courses").fetchone()[0],
+            "requisites": conn.execute("SELECT COUNT(*) FROM course_requisites").fetchone()[0],
+            "policies": conn.execute("SELECT COUNT(*) FROM policies").fetchone()[0],
+        }
+    finally:
+        conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Migrate the CSV knowledge base to SQLite")
+    parser.add_argument("--courses", default="data/courses.csv")
+    parser.add_argument("--policies", default="data/policies.csv")
+    parser.add_argument("--database", default=DEFAULT_DATABASE)
+    args = parser.parse_args(argv)
+    counts = migrate_from_csv(args.courses, args.policies, args.database)
+    print(f"Migrated {counts['courses']} courses, {counts['requisites']} requisite edges "
+          f"and {counts['policies']} policies to {args.database}")
+    print("Set KBS_STORAGE=sqlite to use it.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+import argparse
+import csv
+import os
+import re
+import sys
+import time
+from typing import Dict, FrozenSet, Iterator, NamedTuple, Optional, Set, Tuple
+
+import pandas as pd
+
+# Add src/ to sys.path so this also runs as a script
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from integration.compiled_catalog import CompiledCatalog, semester_bit
+
+DEFAULT_CHUNK_SIZE = 100_000
+
+GRADE_POINTS = {
+    "A+": 4.0, "A": 4.0, "A-": 3.7, "B+": 3.3, "B": 3.0, "B-": 2.7, "C+": 2.3, "C": 2.0, "C-": 1.7,
+    "D+": 1.3, "D": 1.0, "F": 0.0,
+}
+# Passing grades that carry no grade points
+PASS_GRADES = {"P", "S"}
+# Withdrawals, incompletes and audits are not attempts
+IGNORED_GRADES = {"W", "I", "IP", "AU", "NR"}
+
+# Export columns and the names they go by
+COLUMNS = {
+    "student": ("student_id", "student"),
+    "course": ("course_code", "course"),
+    "term": ("term", "semester"),
+    "grade": ("grade",),
+    "credits": ("credits", "credit_hours"),
+}
+
+_SEASONS = (("WI", 0), ("SP", 1), ("SU", 2), ("FA", 3), ("AU", 3))
+_YEAR = re.compile(r"(?:19|20)\d\d")
+_SEPARATORS = re.compile(r"[\s\-_./]")
+
+
+class TranscriptOrderError(ValueError):
+    """A student's rows are not together although the export was said to be grouped by student"""
+    pass
+
+
+class RetakeRules(NamedTuple):
+    failing: FrozenSet[str]
+    # Grade points of a passed retake of a failed course are capped at this
+    cap: Optional[float]
+
+
+class IngestReport:
+    """What was read and what had to be skipped"""
+
+    def __init__(self):
+        self.rows = 0
+        self.students = 0
+        self.unknown_grades = 0
+        self.unknown_courses: Set[str] = set()
+
+    def __repr__(self):
+        return (f"IngestReport(rows={self.rows}, students={self.students}, "
+                f"unknown_grades={self.unknown_grades}, unknown_courses={len(self.unknown_courses)})")
+
+
+def retake_rules(policies_df: pd.DataFrame) -> RetakeRules:
+    """Read the "Retaking Failed Courses" policy, e.g. condition "Grade = F"
+    with max "B+": F fails, and a passed retake counts at most B+"""
+    failing, cap = set(), None
+    for _, row in policies_df[policies_df["Category"].str.strip() == "Retaking Failed Courses"].iterrows():
+        condition = str(row["Condition"])
+        if "=" in condition:
+            failing.update(g.strip().upper() for g in re.split(r",|\bor\b", condition.split("=", 1)[1]) if g.strip())
+        limit = str(row.get("max", "")).strip().upper()
+        if limit in GRADE_POINTS:
+            cap = GRADE_POINTS[limit]
+    return RetakeRules(frozenset(failing or {"F"}), cap)
+
+
+def term_key(term: str) -> Tuple[int, int]:
+    """Chronological sort key of a term name such as "Fall 2023" or "2024-SPRING" """
+    text = str(term).upper()
+    year = _YEAR.search(text)
+    letters = re.sub(r"[^A-Z]", "", text)
+    season = next((rank for prefix, rank in _SEASONS if letters.startswith(prefix)), 0)
+    return (int(year.group()) if year else 0, season)
+
+
+def normalize_code(code: str) -> str:
+    """Canonical form of a course code: "cse 014" and "CSE-014" are "CSE014" """
+    return _SEPARATORS.sub("", str(code)).upper()
+
+
+class CodeNormalizer:
+    """Maps the course codes of an export to the catalog's spelling"""
+
+    def __init__(self, catalog: CompiledCatalog):
+        self.codes: Dict[str, str] = {}
+        self.credits: Dict[str, int] = {}
+        for course_id in range(len(catalog)):
+            code = catalog.code(course_id)
+            self.codes.setdefault(normalize_code(code), code)
+            self.credits.setdefault(code, int(catalog.credits[course_id]))
+        self._cache: Dict[str, Tuple[str, bool]] = {}
+
+    def __call__(self, raw: str) -> Tuple[str, bool]:
+        """(code, whether it is in the catalog)"""
+        hit = self._cache.get(raw)
+        if hit is None:
+            code = normalize_code(raw)
+            known = code in self.codes
+            hit = self._cache[raw] = (self.codes[code] if known else code, known)
+        return hit
+
+
+class _Student:
+    __slots__ = ("student_id", "attempts")
+
+    def __init__(self, student_id: str):
+        self.student_id = student_id
+        # course -> (term key, row number, grade, credits, failed in an earlier term)
+        self.attempts: Dict[str, tuple] = {}
+
+    def add(self, code: str, key: tuple, grade: str, credits: float, failing: FrozenSet[str]) -> None:
+        attempt = self.attempts.get(code)
+        if attempt is None:
+            self.attempts[code] = (key, grade, credits, False)
+        elif key > attempt[0]:
+            # The latest attempt wins; remember whether an older one failed
+            self.attempts[code] = (key, grade, credits, attempt[3] or attempt[1] in failing)
+        else:
+            self.attempts[code] = attempt[:3] + (attempt[3] or grade in failing,)
+
+    def profile(self, semester: str, rules: RetakeRules, normalizer: CodeNormalizer,
+                report: IngestReport) -> Dict:
+        passed, failed = [], []
+        points = weight = 0.0
+        for code, (_, grade, credits, failed_before) in self.attempts.items():
+            code, known = normalizer(code)
+            if not known:
+                report.unknown_courses.add(code)
+            if grade in rules.failing:
+                failed.append(code)
+            else:
+                passed.append(code)
+            value = GRADE_POINTS.get(grade)
+            if value is None:
+                continue
+            if failed_before and rules.cap is not None and grade not in rules.failing:
+                value = min(value, rules.cap)
+            if credits != credits:  # NaN: fall back to the catalog
+                credits = normalizer.credits.get(code, 0) if known else 0
+            points += value * credits
+            weight += credits
+        report.students += 1
+        return {
+            "student_id": self.student_id,
+            "cgpa": round(points / weight, 2) if weight else 0.0,
+            "semester": semester,
+            "passed_courses": passed,
+            "failed_courses": failed,
+        }
+
+
+def _columns(header) -> Dict[str, str]:
+    names = {str(c).strip().lower(): c for c in header}
+    found = {}
+    for column, aliases in COLUMNS.items():
+        match = next((names[a] for a in aliases if a in names), None)
+        if match is None and column != "credits":
+            raise ValueError(f"The export has no {' or '.join(aliases)} column")
+        found[column] = match
+    return found
+
+
+def ingest_transcripts(source, catalog: CompiledCatalog, policies_df: pd.DataFrame, semester: str,
+                       chunk_size: int = DEFAULT_CHUNK_SIZE, grouped: bool = True,
+                       report: Optional[IngestReport] = None) -> Iterator[Dict]:
+    """Turn a per-attempt grade export into engine-ready student profiles.
+
+    ``source`` is a CSV path or file with one row per attempt: student,
+    course, term, grade and (optionally) credits. It is read
+    ``chunk_size`` rows at a time. For every course the latest term's
+    attempt decides whether it is passed or failed (withdrawals and
+    incompletes are not attempts), and the CGPA is computed over those
+    attempts, with a passed retake of a failed course capped as the
+    retake policy says. Course codes are matched to the catalog's spelling.
+    Profiles are for advising in ``semester``.
+
+    Registrar exports are sorted by student, so by default (``grouped``)
+    only the current student's attempts are kept and each profile is
+    yielded as soon as the next student starts; ``TranscriptOrderError``
+    is raised if a student turns up again later. With ``grouped=False``
+    any order is accepted and every student's latest attempts are held
+    until the end, one entry per student and course rather than per row.
+    """
+    rules = retake_rules(policies_df)
+    normalizer = CodeNormalizer(catalog)
+    report = report if report is not None else IngestReport()
+    # Reject a mistyped semester before reading the export
+    semester_bit(semester)
+    semester = semester.strip().upper()
+    students: Dict[str, _Student] = {}
+    finished: Set[str] = set()
+    current: Optional[_Student] = None
+    row_number = 0
+
+    reader = pd.read_csv(source, dtype=str, chunksize=chunk_size, keep_default_na=False, encoding="utf-8-sig")
+    for chunk in reader:
+        columns = _columns(chunk.columns)
+        credits = pd.to_numeric(chunk[columns["credits"]], errors="coerce") if columns["credits"] \
+            else pd.Series(float("nan"), index=chunk.index)
+        for student_id, course, term, grade, hours in zip(
+                chunk[columns["student"]].str.strip(), chunk[columns["course"]], chunk[columns["term"]],
+                chunk[columns["grade"]].str.strip().str.upper(), credits):
+            row_number += 1
+            if grade in IGNORED_GRADES:
+                continue
+            if grade not in GRADE_POINTS and grade not in PASS_GRADES and grade not in rules.failing:
+                report.unknown_grades += 1
+                continue
+            if grouped:
+                if current is None or current.student_id != student_id:
+                    if current is not None:
+                        finished.add(current.student_id)
+                        yield current.profile(semester, rules, normalizer, report)
+                    if student_id in finished:
+                        raise TranscriptOrderError(
+                            f"Rows of student {student_id} are not together (row {row_number}); "
+                            "sort the export by student or pass grouped=False")
+                    current = _Student(student_id)
+                student = current
+            else:
+                student = students.get(student_id)
+                if student is None:
+                    student = students[student_id] = _Student(student_id)
+            student.add(normalize_code(course), (term_key(term), row_number), grade, hours, rules.failing)
+        report.rows = row_number
+    if grouped and current is not None:
+        yield current.profile(semester, rules, normalizer, report)
+    for student in students.values():
+        yield student.profile(semester, rules, normalizer, report)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build advising profiles from a per-attempt grade export")
+    parser.add_argument("export", help="CSV with student_id, course_code, term, grade, credits")
+    parser.add_argument("--semester", required=True, help="semester to advise for, e.g. FALL")
+    parser.add_argument("--courses", default="data/courses.csv")
+    parser.add_argument("--policies", default="data/policies.csv")
+    parser.add_argument("--output", default="cohort.csv")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--unsorted", action="store_true", help="the export is not grouped by student")
+    args = parser.parse_args(argv)
+
+    from integration.catalog_store import get_store
+    from integration.shared_catalog import get_shared_catalog
+
+    started = time.perf_counter()
+    catalog = get_shared_catalog(get_store(args.courses))
+    policies_df = get_store(args.policies).current().df.fillna("")
+    report = IngestReport()
+    with open(args.output, "w", newline="", encoding="utf-8") as fh:
+        # The cohort format read by demand_forecast.load_cohort
+        writer = csv.writer(fh)
+        writer.writerow(["student_id", "cgpa", "semester", "passed_courses", "failed_courses"])
+        for profile in ingest_transcripts(args.export, catalog, policies_df, args.semester,
+                                          args.chunk_size, not args.unsorted, report):
+            writer.writerow([profile["student_id"], profile["cgpa"], profile["semester"],
+                             ";".join(profile["passed_courses"]), ";".join(profile["failed_courses"])])
+    elapsed = time.perf_counter() - started
+
+    print(f"{report.students} profiles from {report.rows} rows written to {args.output} in {elapsed:.2f}s")
+    if report.unknown_grades:
+        print(f"  {report.unknown_grades} rows with an unknown grade skipped")
+    if report.unknown_courses:
+        print(f"  {len(report.unknown_courses)} course codes not in the catalog: "
+              f"{', '.join(sorted(report.unknown_courses)[:10])}")
+
+
+if __name__ == "__main__":
+    main()
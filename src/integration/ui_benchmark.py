@@ -0,0 +1,254 @@
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+# Add src/ to sys.path so this also runs as a script
+SRC = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(SRC)
+
+ADVISOR_PAGE = os.path.join(SRC, "usrInteractModule.py")
+EDITOR_PAGE = os.path.join(SRC, "kbsEditor.py")
+
+DEFAULT_SIZES = (50, 500, 2000)
+DEFAULT_PASSED = 40
+DEFAULT_TIMEOUT = 120.0
+
+_DEPARTMENTS = ("CSE", "MAT", "PHY", "AIE", "BUS", "ENG")
+_TOPICS = ("Data", "Structures", "Algorithms", "Networks", "Calculus", "Systems", "Logic", "Design",
+           "Statistics", "Security", "Databases", "Learning", "Signals", "Economics", "Writing", "Physics")
+
+# Course added, edited and deleted again by the editor scenario
+NEW_COURSE = "ZZZ999"
+
+
+class UIBenchmarkError(Exception):
+    """Raised when a page raises or a scripted interaction does not do what it should"""
+
+
+def synthetic_catalog(n_courses: int, seed: int = 0) -> pd.DataFrame:
+    """A catalog of ``n_courses`` shaped like the real one.
+
+    Prerequisites refer to up to two of the 50 courses listed before, so the
+    first courses form a plausible transcript; every twentieth course has
+    the previous one as a co-requisite.
+    """
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n_courses):
+        code = f"{_DEPARTMENTS[i % len(_DEPARTMENTS)]}{100 + i // len(_DEPARTMENTS)}"
+        earlier = [row["Course Code"] for row in rows[-50:]]
+        prerequisites = rng.sample(earlier, min(len(earlier), rng.choice((0, 0, 1, 1, 2))))
+        name = " ".join(rng.sample(_TOPICS, 2))
+        rows.append({
+            "Course Code": code,
+            "Course Name": name,
+            "Description": f"Introduction to {name.lower()}",
+            "Prerequisites": ", ".join(prerequisites),
+            "Co-requisites": earlier[-1] if earlier and i % 20 == 0 else "",
+            "Credit Hours": rng.choice((2, 3, 3, 3, 4)),
+            "Semester Offered": rng.choice(("FALL", "SPRING", "BOTH")),
+        })
+    return pd.DataFrame(rows)
+
+
+@contextmanager
+def workspace(courses: pd.DataFrame, policies_path: str) -> Iterator[str]:
+    """Run the pages against ``courses`` in a scratch ``data/`` directory.
+
+    The pages open ``data/courses.csv`` relative to the working directory,
+    so this changes into a temporary directory for the duration.
+    """
+    policies_path = os.path.abspath(policies_path)
+    root = tempfile.mkdtemp(prefix="kbs-ui-benchmark-")
+    cwd = os.getcwd()
+    environ = {key: os.environ.get(key) for key in ("KBS_STORAGE", "KBS_RECOMMENDATION_CACHE")}
+    try:
+        os.makedirs(os.path.join(root, "data"))
+        courses.to_csv(os.path.join(root, "data", "courses.csv"), index=False)
+        shutil.copyfile(policies_path, os.path.join(root, "data", "policies.csv"))
+        os.environ["KBS_STORAGE"] = "csv"
+        os.environ.pop("KBS_RECOMMENDATION_CACHE", None)
+        os.chdir(root)
+        yield root
+    finally:
+        # The pages started watching the scratch files; stop before deleting them
+        from integration.catalog_watcher import forget_knowledge_base
+
+        forget_knowledge_base()
+        os.chdir(cwd)
+        for key, value in environ.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        shutil.rmtree(root, ignore_errors=True)
+
+
+class _Recorder:
+    """Times every rerun and counts the CSV files parsed while it ran"""
+
+    def __init__(self, trace_memory: bool = False):
+        self.trace_memory = trace_memory
+        self.samples: Dict[str, Dict[str, List[float]]] = {}
+        self.csv_parses = 0
+
+    def step(self, label: str, rerun: Callable[[], object]) -> None:
+        parses = self.csv_parses
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        at = rerun()
+        elapsed = time.perf_counter() - started
+        if at.exception:
+            raise UIBenchmarkError(f"{label}: {at.exception[0].value}")
+        sample = self.samples.setdefault(label, {"ms": [], "peak": [], "parses": []})
+        if self.trace_memory:
+            sample["peak"].append(tracemalloc.get_traced_memory()[1] - baseline)
+        else:
+            sample["ms"].append(elapsed * 1000)
+        sample["parses"].append(self.csv_parses - parses)
+
+
+def _expect(at, label: str) -> None:
+    if not at.success:
+        errors = "; ".join(e.value for e in at.error) or "nothing shown"
+        raise UIBenchmarkError(f"{label}: expected a success message ({errors})")
+
+
+def advisor_scenario(recorder: _Recorder, codes: Sequence[str], passed: int = DEFAULT_PASSED,
+                     timeout: float = DEFAULT_TIMEOUT) -> None:
+    """Open the advising page, pick the semester and CGPA, search and select
+    ``passed`` courses one at a time and ask for recommendations"""
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(ADVISOR_PAGE, default_timeout=timeout)
+    recorder.step("load", at.run)
+    recorder.step("select semester", lambda: at.selectbox[0].set_value(at.selectbox[0].options[1]).run())
+    recorder.step("enter CGPA", lambda: at.number_input[0].set_value(3.2).run())
+    for code in codes[:passed]:
+        recorder.step("search course", lambda: at.text_input(key="course_search").input(code).run())
+        recorder.step("select passed course", lambda: at.multiselect[0].select(code).run())
+    if len(at.multiselect[0].value) != min(passed, len(codes)):
+        raise UIBenchmarkError(f"select passed course: {len(at.multiselect[0].value)} courses selected")
+    recorder.step("get recommendations", lambda: at.button[0].click().run())
+    _expect(at, "get recommendations")
+
+
+def editor_scenario(recorder: _Recorder, codes: Sequence[str], timeout: float = DEFAULT_TIMEOUT) -> None:
+    """View and page the catalog, then add, edit and delete one course"""
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(EDITOR_PAGE, default_timeout=timeout)
+    recorder.step("load", at.run)
+    recorder.step("search catalog", lambda: at.text_input[0].input("data").run())
+    recorder.step("next page", lambda: at.number_input[0].set_value(2).run())
+
+    recorder.step("open add form", lambda: at.sidebar.radio[0].set_value("Add Course").run())
+    for i, value in enumerate((NEW_COURSE, "Benchmark Course", "Added by the UI benchmark", codes[0], "")):
+        at.text_input[i].input(value)
+    at.text_input[5].input("FALL")
+    at.number_input[0].set_value(3)
+    recorder.step("add course", lambda: at.button[0].click().run())
+    _expect(at, "add course")
+
+    recorder.step("open edit form", lambda: at.sidebar.radio[0].set_value("Edit Course").run())
+    recorder.step("find course", lambda: at.text_input[0].input(NEW_COURSE).run())
+    at.text_input[1].input("Benchmark Course (edited)")
+    recorder.step("edit course", lambda: at.button[0].click().run())
+    _expect(at, "edit course")
+
+    recorder.step("open delete form", lambda: at.sidebar.radio[0].set_value("Delete Course").run())
+    recorder.step("find course", lambda: at.text_input[0].input(NEW_COURSE).run())
+    recorder.step("delete course", lambda: at.button[0].click().run())
+    _expect(at, "delete course")
+
+
+@contextmanager
+def _count_csv_parses(recorder: _Recorder) -> Iterator[None]:
+    read_csv = pd.read_csv
+
+    def counting(*args, **kwargs):
+        recorder.csv_parses += 1
+        return read_csv(*args, **kwargs)
+
+    pd.read_csv = counting
+    try:
+        yield
+    finally:
+        pd.read_csv = read_csv
+
+
+def run_benchmark(sizes: Sequence[int] = DEFAULT_SIZES, policies_path: str = "data/policies.csv",
+                  passed: int = DEFAULT_PASSED, repeat: int = 3, trace_memory: bool = True,
+                  timeout: float = DEFAULT_TIMEOUT) -> pd.DataFrame:
+    """Script both pages against synthetic catalogs of each size.
+
+    Every scenario runs ``repeat`` times for the latencies, then once more
+    under ``tracemalloc`` (which slows Python down) for the peak memory
+    allocated during each rerun. One row per page, catalog size and step.
+    """
+    scenarios = (("advisor", lambda rec, codes: advisor_scenario(rec, codes, passed, timeout)),
+                 ("editor", lambda rec, codes: editor_scenario(rec, codes, timeout)))
+    rows = []
+    for size in sizes:
+        catalog = synthetic_catalog(size)
+        codes = catalog["Course Code"].tolist()
+        with workspace(catalog, policies_path):
+            for page, scenario in scenarios:
+                recorder = _Recorder()
+                with _count_csv_parses(recorder):
+                    for _ in range(repeat):
+                        scenario(recorder, codes)
+                    if trace_memory:
+                        recorder.trace_memory = True
+                        tracemalloc.start()
+                        try:
+                            scenario(recorder, codes)
+                        finally:
+                            tracemalloc.stop()
+                for step, sample in recorder.samples.items():
+                    ms = np.array(sample["ms"] or [np.nan])
+                    rows.append({
+                        "Page": page,
+                        "Courses": size,
+                        "Step": step,
+                        "Reruns": len(sample["parses"]),
+                        "Mean (ms)": ms.mean(),
+                        "P95 (ms)": np.percentile(ms, 95),
+                        "Max (ms)": ms.max(),
+                        "Peak memory (KiB)": max(sample["peak"]) / 1024 if sample["peak"] else np.nan,
+                        "CSV parses": sum(sample["parses"]),
+                    })
+    return pd.DataFrame(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure reruns of the Streamlit pages on synthetic catalogs")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="catalog sizes")
+    parser.add_argument("--policies", default="data/policies.csv")
+    parser.add_argument("--passed", type=int, default=DEFAULT_PASSED, help="courses the student selects")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    parser.add_argument("--output", help="also write the report to this CSV file")
+    args = parser.parse_args(argv)
+
+    report = run_benchmark(args.sizes, args.policies, args.passed, args.repeat, not args.no_memory)
+    if args.output:
+        report.to_csv(args.output, index=False)
+    with pd.option_context("display.width", 200, "display.max_rows", None):
+        print(report.to_string(index=False, float_format=lambda value: f"{value:.1f}"))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,16 @@
 import streamlit as st
 import pandas as pd
 import pathlib
+import sys
+import os
+
+# Add the current directory to sys.path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from integration.catalog_store import get_store, CatalogConflictError
+from integration.course_search import get_search_index
+from integration.paging import DEFAULT_PAGE_SIZE, paginate, sort_courses
+from integration.prerequisites import PrerequisiteSyntaxError, check_prerequisites
 
 st.markdown("""
     <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css">
@@ -9,7 +19,12 @@ st.markdown("""
 
 dataset = "data/courses.csv"
 
-df = pd.read_csv(dataset)
+# Work on a private copy of the current catalog version; edits are published
+# as a new version so advisors reading the old one are never disturbed
+store = get_store(dataset)
+snapshot = store.current()
+df = snapshot.to_frame()
+codes = df["Course Code"].astype(str).str.strip()
 
 st.markdown('<h1><i class="fa-solid fa-book-open" style="color: #f44747;"></i> Course Management System</h1>', unsafe_allow_html=True)
 action = st.sidebar.radio("Choose Action", ["View Courses", "Add Course", "Edit Course", "Delete Course"])
@@ -22,33 +37,77 @@ def validate_course(codes_string, existing_codes):
     invalid = [c for c in codes if c not in existing_codes]
     return invalid
 
+def validate_prerequisites(expression, existing_codes):
+    # Returns (syntax error or None, unknown course codes)
+    try:
+        mentioned = check_prerequisites(expression)
+    except PrerequisiteSyntaxError as e:
+        return str(e), []
+    return None, [c for c in mentioned if c not in existing_codes]
+
+PREREQ_HELP = "Comma-separated codes are all required. Use OR for alternatives, " \
+              "2 OF (A, B, C) for any two of a list, and parentheses to group."
+
+def select_course(label, key):
+    # Only the best matches are sent to the browser, not the whole catalog
+    query = st.text_input("Search courses", key=f"{key}_search", placeholder="Code, name or description")
+    options = get_search_index(store, snapshot).options(query)
+    if not options:
+        st.info("No matching courses.")
+        return None
+    return st.selectbox(label, options, key=key)
+
+def loaded_version(form, selection=None):
+    # Every rerun reads the current version, so remember the one the form was
+    # filled from (per selected course) and publish on top of that: an edit
+    # someone else published meanwhile is then reported, not overwritten
+    state = st.session_state.get(f"{form}_version")
+    if state is None or state[0] != selection:
+        state = st.session_state[f"{form}_version"] = (selection, snapshot.version)
+    return state[1]
+
+def publish(new_df, form):
+    selection, version = st.session_state[f"{form}_version"]
+    try:
+        published = store.publish(new_df, expected_version=version)
+    except CatalogConflictError:
+        # The next rerun fills the form from the current version
+        del st.session_state[f"{form}_version"]
+        st.error("The course catalog was changed by another editor. Check the course again and resubmit.")
+        return False
+    st.session_state[f"{form}_version"] = (selection, published.version)
+    return True
+
 if action == "Add Course":
     st.markdown('### <i class="fa-solid fa-plus" style="color: #f44747;"></i> Add Course', unsafe_allow_html=True)
+    loaded_version("add_course")
 
     with st.form("add_form", clear_on_submit=True):
         code = st.text_input("Course Code").strip().upper()
         name = st.text_input("Course Name")
         desc = st.text_input("Description")
-        prereq = st.text_input("Prerequisites").strip().upper()
+        prereq = st.text_input("Prerequisites", help=PREREQ_HELP).strip().upper()
         coreq = st.text_input("Co-requisites").strip().upper()
         hours = st.number_input("Credit Hours", min_value=0, step=1)
         semester = st.text_input("Semester Offered").strip().upper()
         submit = st.form_submit_button("Add")
 
         if submit:
-            existing_codes = df["Course Code"].tolist()
-            invalid_prereq = validate_course(prereq, existing_codes)
+            existing_codes = codes.tolist()
+            prereq_error, invalid_prereq = validate_prerequisites(prereq, existing_codes)
             invalid_coreq = validate_course(coreq, existing_codes)
             if not code.strip() or not name.strip() or not desc.strip() or not semester.strip():
 
                 st.error("All fields are required. Please fill in all fields.")
-            elif code.strip() in df["Course Code"].values:
+            elif code.strip() in codes.values:
                 st.error("Course code already exists. Please use a unique course code.")
 
             elif hours < 0:
                 st.error("Credit hours must be a positive number.")
             else:
-                if invalid_prereq or invalid_coreq:
+                if prereq_error or invalid_prereq or invalid_coreq:
+                    if prereq_error:
+                        st.error(f"Invalid prerequisites: {prereq_error}")
                     if invalid_prereq:
                         st.error(f"Invalid prerequisites: {', '.join(invalid_prereq)}")
                     if invalid_coreq:
@@ -64,16 +123,19 @@ if action == "Add Course":
                         "Semester Offered": semester
                     }
                     df.loc[len(df)] = new_course
-                    df.to_csv(dataset, index=False)
-                    st.success("Course added successfully!")
+                    if publish(df, "add_course"):
+                        st.success("Course added successfully!")
 
 elif action == "Edit Course":
     st.markdown('### <i class="fa-solid fa-pen" style="color: #f44747;"></i> Edit Course', unsafe_allow_html=True)
     if df.empty:
         st.info("No courses available.")
+        selected = None
     else:
-        selected = st.selectbox("Select course to edit", df["Course Code"])
-        course = df[df["Course Code"] == selected].iloc[0]
+        selected = select_course("Select course to edit", "edit_course")
+    if selected:
+        loaded_version("edit_course", selected)
+        course = df[codes == selected].iloc[0]
 
         prereq_val = "" if pd.isna(course["Prerequisites"]) else course["Prerequisites"]
         coreq_val = "" if pd.isna(course["Co-requisites"]) else course["Co-requisites"]
@@ -82,38 +144,42 @@ elif action == "Edit Course":
         with st.form("edit_form"):
             name = st.text_input("Course Name", course["Course Name"])
             desc = st.text_input("Description", course["Description"])
-            prereq = st.text_input("Prerequisites",prereq_val).strip().upper()
+            prereq = st.text_input("Prerequisites", prereq_val, help=PREREQ_HELP).strip().upper()
             coreq = st.text_input("Co-requisites", coreq_val).strip().upper()
             hours = st.number_input("Credit Hours", min_value=0, value=int(course["Credit Hours"]))
             semester = st.text_input("Semester Offered", course["Semester Offered"]).strip().upper()
             submit = st.form_submit_button("Update")
 
             if submit:
-                existing_codes = df["Course Code"].tolist()
+                existing_codes = codes.tolist()
                 existing_codes.remove(selected)  
-                invalid_prereq = validate_course(prereq, existing_codes)
+                prereq_error, invalid_prereq = validate_prerequisites(prereq, existing_codes)
                 invalid_coreq = validate_course(coreq, existing_codes)
 
                 if hours < 0:
                     st.error("Credit hours must be a positive number.")
-                elif invalid_prereq or invalid_coreq:
+                elif prereq_error or invalid_prereq or invalid_coreq:
+                    if prereq_error:
+                        st.error(f"Invalid prerequisites: {prereq_error}")
                     if invalid_prereq:
                         st.error(f"Invalid prerequisites: {', '.join(invalid_prereq)}")
                     if invalid_coreq:
                         st.error(f"Invalid co-requisites: {', '.join(invalid_coreq)}")
                 else:
-                    df.loc[df["Course Code"] == selected, ["Course Name", "Description", "Prerequisites", "Co-requisites", "Credit Hours", "Semester Offered"]] = \
+                    df.loc[codes == selected, ["Course Name", "Description", "Prerequisites", "Co-requisites", "Credit Hours", "Semester Offered"]] = \
                         [name, desc, prereq, coreq, int(hours), semester]
-                    df.to_csv(dataset, index=False)
-                    st.success("Course updated successfully!")
+                    if publish(df, "edit_course"):
+                        st.success("Course updated successfully!")
 
 elif action == "Delete Course":
     st.markdown('### <i class="fa-solid fa-trash-can" style="color: #f44747;"></i> Delete Course', unsafe_allow_html=True)
     if df.empty:
         st.info("No courses available.")
     else:
-        selected = st.selectbox("Select course to delete", df["Course Code"])
-        if st.button("Delete"):
+        selected = select_course("Select course to delete", "delete_course")
+        if selected:
+            loaded_version("delete_course", selected)
+        if selected and st.button("Delete"):
                 
                 prereq_course = df["Prerequisites"].astype(str).str.contains(rf'\b{selected}\b').any()
                 coreq_course = df["Co-requisites"].astype(str).str.contains(rf'\b{selected}\b').any()
@@ -121,10 +187,37 @@ elif action == "Delete Course":
                 if prereq_course or coreq_course:
                     st.error(f"Cannot delete course '{selected}' because it is used as a prerequisite or co-requisite.")
                 else:
-                    df = df[df["Course Code"] != selected]
-                    df.to_csv(dataset, index=False)
-                    st.success(f"Course '{selected}' deleted.")
+                    df = df[codes != selected]
+                    if publish(df, "delete_course"):
+                        st.success(f"Course '{selected}' deleted.")
 
 else:
     st.markdown('### <i class="fa-solid fa-list-ul" style="color: #f44747;"></i> Course List', unsafe_allow_html=True)
-    st.dataframe(df)
+    query = st.text_input("Search courses", placeholder="Code, name or description")
+    sort_col, order_col, size_col = st.columns(3)
+    # The same options whether or not there is a query, so typing one keeps
+    # the chosen sort; without a query "Relevance" falls back to catalog order
+    sort_by = sort_col.selectbox(
+        "Sort by", ["Relevance", "Catalog order", "Course Code", "Course Name", "Credit Hours", "Semester Offered"],
+        format_func=lambda option: option if option != "Relevance" or query.strip() else "Relevance (search first)",
+        key="sort_by")
+    descending = order_col.selectbox("Order", ["Ascending", "Descending"]) == "Descending"
+    page_size = size_col.selectbox("Rows per page", [25, DEFAULT_PAGE_SIZE, 100], index=1)
+
+    # Filtering, sorting and paging happen here; only the rows of the
+    # current page are sent to the browser
+    if query.strip():
+        hits = get_search_index(store, snapshot).search(query, limit=None)
+        position = {}
+        for i, code in enumerate(codes):
+            position.setdefault(code, i)
+        # Skip any hit that is not in this rerun's copy of the catalog
+        rows = df.iloc[[i for i in (position.get(hit.code) for hit in hits) if i is not None]]
+    else:
+        rows = df
+    rows = sort_courses(rows, None if sort_by in ("Relevance", "Catalog order") else sort_by, descending)
+    # No max_value: the page count changes with the search, and ``paginate``
+    # clamps the number anyway
+    page = paginate(rows, st.number_input("Page", min_value=1, step=1), page_size)
+    st.caption(page.describe("matching courses" if query.strip() else "courses") + f" (page {page.number} of {page.pages})")
+    st.dataframe(page.rows, hide_index=True)
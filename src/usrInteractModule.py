@@ -3,16 +3,23 @@ import pandas as pd
 from datetime import datetime
 import sys
 import os
+import uuid
 
 # Add the current directory to sys.path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from frozendict_patch import *
-from Inference_engine_KBS import AdvisingEngine, StudentProfile
+from integration.catalog_store import get_store
+from integration.catalog_watcher import get_knowledge_base
+from integration.course_search import get_search_index
+from integration.paging import DEFAULT_PAGE_SIZE, group_explanations, paginate
+from integration.speculative_advisor import get_speculative_advisor
 
 def load_courses():
     try:
-        courses_df = pd.read_csv('data/courses.csv')
+        # The snapshot is immutable, so this request keeps a consistent view
+        # of the catalog even if it is edited while we are advising
+        courses_df = get_store('data/courses.csv').current().df
         return courses_df
     except Exception as e:
         st.error(f"Error loading courses: {str(e)}")
@@ -40,6 +47,32 @@ def get_semester_options():
         semesters.extend([f"Fall {year}", f"Spring {year}"])
     return semesters
 
+EXPLANATIONS_PER_PAGE = 25
+
+def show_explanations(explanations):
+    # One collapsible section per kind of decision, titled with its count;
+    # long sections are paged so only the visible lines reach the browser
+    for group in group_explanations(explanations):
+        with st.expander(f"{group.title} ({len(group)})", expanded=group.expanded):
+            number = 1
+            if len(group) > EXPLANATIONS_PER_PAGE:
+                number = st.number_input("Page", min_value=1, step=1, key=f"explanations_{group.title}")
+            page = paginate(group.explanations, number, EXPLANATIONS_PER_PAGE)
+            if page.pages > 1:
+                st.caption(page.describe("decisions"))
+            st.markdown("\n".join(f"- {explanation}" for explanation in page.rows))
+
+def show_available_courses(catalog, semester_type):
+    # Can be most of the catalog; paged like the explanations
+    codes = [c["Course Code"] for c in catalog if semester_type in c["Semester Offered"]]
+    number = 1
+    if len(codes) > DEFAULT_PAGE_SIZE:
+        number = st.number_input("Page", min_value=1, step=1, key="available_courses")
+    page = paginate(codes, number)
+    st.write(f"Available courses in {semester_type}: {list(page.rows)}")
+    if page.pages > 1:
+        st.caption(page.describe())
+
 def main():
     st.set_page_config(
         page_title="Course Recommendation System",
@@ -61,6 +94,12 @@ def main():
     col1, col2 = st.columns(2)
 
     with col1:
+        student_id = st.text_input(
+            "Student ID",
+            key="student_id",
+            help="Optional; identifies your advice in the decision trace"
+        )
+
         semester = st.selectbox(
             "Select Current Semester",
             options=get_semester_options(),
@@ -80,15 +119,28 @@ def main():
 
 
     with col2:
+        # While searching, the selectors only get the best matches (plus what
+        # is already selected); with no search they offer the whole catalog
+        search_index = get_search_index(get_store('data/courses.csv'))
+        query = st.text_input(
+            "Search Courses",
+            key="course_search",
+            placeholder="Code, name or description",
+            help="Narrow the course lists below"
+        )
+
         passed_courses = st.multiselect(
             "Select Passed Courses",
-            options=courses_df['Course Code'].tolist(),
+            options=search_index.options(query, keep=st.session_state.get("passed_courses", [])),
+            key="passed_courses",
             help="Select all courses you have passed"
         )
 
         failed_courses = st.multiselect(
             "Select Failed Courses",
-            options=[course for course in courses_df['Course Code'].tolist() if course not in passed_courses],
+            options=[course for course in search_index.options(query, keep=st.session_state.get("failed_courses", []))
+                     if course not in passed_courses],
+            key="failed_courses",
             help="Select all courses you have failed"
         )
         
@@ -101,48 +153,47 @@ def main():
     if not is_valid_cgpa:
         st.error(cgpa_error)
 
-    
+    # The compiled catalog is kept up to date by the watcher and mapped from
+    # the image shared by all processes on this host, so nothing is re-parsed
+    # here unless the catalog changed
+    knowledge_base = get_knowledge_base()
+    advisor = get_speculative_advisor(knowledge_base)
+    session = st.session_state.setdefault("advice_session", uuid.uuid4().hex)
+    semester_type = semester.split()[0].upper()
+    student_input = {
+        "student_id": student_id.strip(),
+        "cgpa": float(cgpa),
+        "semester": semester_type,
+        "passed_courses": passed_courses,
+        "failed_courses": failed_courses
+    }
+
+    # Every change to the inputs reruns the page; advise in the background
+    # once they settle so the button usually finds the answer ready
+    if is_valid_cgpa:
+        advisor.speculate(session, student_input)
+    else:
+        advisor.cancel(session)
 
     if recommend_button:
         if not is_valid_cgpa:
             st.error("Please fix the CGPA input before proceeding.")
             return
+        # Paging through the explanations reruns the page; keep showing the
+        # results until the inputs change
+        st.session_state["advised_input"] = student_input
 
-
+    if is_valid_cgpa and st.session_state.get("advised_input") == student_input:
         with st.spinner("Processing your request..."):
             try:
-                semester_type = semester.split()[0].upper()  
-                student_input = {
-                    "cgpa": float(cgpa),
-                    "semester": semester_type,
-                    "passed_courses": passed_courses,
-                    "failed_courses": failed_courses
-                }
-
-                all_courses = []
-                for _, course in courses_df.iterrows():
-                    course_dict = {
-                        "Course Code": str(course["Course Code"]).strip(),
-                        "Course Name": str(course["Course Name"]).strip(),
-                        "Credit Hours": int(course["Credit Hours"]),
-                        "Semester Offered": str(course["Semester Offered"]).strip().upper(),
-                        "Prerequisites": str(course["Prerequisites"]).strip() if pd.notna(course["Prerequisites"]) else "",
-                        "Co-requisites": str(course["Co-requisites"]).strip() if pd.notna(course["Co-requisites"]) else ""
-                    }
-                    all_courses.append(course_dict)
-
-                policies_df = pd.read_csv("data/policies.csv").fillna("")
-
-                engine = AdvisingEngine(all_courses, student_input, policies_df)
-                engine.reset()
-                engine.declare(StudentProfile(**student_input))
-                engine.run()
-
-                if engine.recommended_courses:
+                advice = advisor.result(session, student_input)
+                all_courses = knowledge_base.catalog()
+
+                if advice.recommended_courses:
                     st.success("Here are your recommended courses:")
                     
                     # Display courses without the total row
-                    recommended_df = pd.DataFrame(engine.recommended_courses)[["Course Code", "Course Name", "Credit Hours"]]
+                    recommended_df = pd.DataFrame(advice.recommended_courses)[["Course Code", "Course Name", "Credit Hours"]]
                     recommended_df["Credit Hours"] = recommended_df["Credit Hours"].astype(int)
                     st.dataframe(recommended_df, hide_index=True)
                     
@@ -151,12 +202,11 @@ def main():
                     st.markdown(f"**Total Credits: {total_credits}**")
 
                     st.markdown("### Explanation of Decisions")
-                    for explanation in engine.explanations:
-                        st.write(f"- {explanation}")
+                    show_explanations(advice.explanations)
                 else:
                     st.warning("No courses could be recommended based on your profile.")
                     st.write(f"Number of available courses: {len(all_courses)}")
-                    st.write(f"Available courses in {semester_type}: {[c['Course Code'] for c in all_courses if semester_type in c['Semester Offered']]}")
+                    show_available_courses(all_courses, semester_type)
 
             except Exception as e:
                 st.error(f"An error occurred: {str(e)}")
@@ -0,0 +1,103 @@
+import unittest
+import pandas as pd
+import tempfile
+import threading
+import shutil
+import os
+from integration.catalog_store import CatalogStore, CatalogConflictError
+from tests.data.test_data import TEST_COURSES
+
+class TestCatalogStore(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.test_csv = os.path.join(self.temp_dir, "courses.csv")
+        pd.DataFrame(TEST_COURSES).to_csv(self.test_csv, index=False)
+        self.store = CatalogStore(self.test_csv)
+
+    def test_first_read_is_version_one(self):
+        """Test the first load stamps version 1"""
+        snapshot = self.store.current()
+        self.assertEqual(snapshot.version, 1)
+        self.assertEqual(len(snapshot.df), len(TEST_COURSES))
+        self.assertIs(self.store.current(), snapshot)
+
+    def test_headers_are_stripped(self):
+        """Test trailing spaces in CSV headers are removed"""
+        with open(self.test_csv, "w") as f:
+            f.write("Course Code ,Course Name\nMAT111 ,Mathematics I\n")
+        self.assertEqual(list(self.store.current().df.columns), ["Course Code", "Course Name"])
+
+    def test_publish_creates_new_version(self):
+        """Test publishing writes the file and bumps the version"""
+        snapshot = self.store.current()
+        df = snapshot.to_frame()
+        df = df[df["Course Code"] != "CSE015"]
+        published = self.store.publish(df, expected_version=snapshot.version)
+        self.assertEqual(published.version, snapshot.version + 1)
+        self.assertEqual(len(pd.read_csv(self.test_csv)), len(TEST_COURSES) - 1)
+        # The old snapshot is untouched
+        self.assertEqual(len(snapshot.df), len(TEST_COURSES))
+        # A fresh store in another process sees the same version
+        self.assertEqual(CatalogStore(self.test_csv).current().version, published.version)
+
+    @unittest.skipUnless(os.name == "posix", "POSIX file permissions")
+    def test_publish_keeps_file_permissions(self):
+        """Test a published file keeps the permissions of the file it replaces"""
+        os.chmod(self.test_csv, 0o640)
+        self.store.publish(self.store.current().to_frame())
+        self.assertEqual(os.stat(self.test_csv).st_mode & 0o777, 0o640)
+        # The version stamp did not exist before; it is readable by everyone
+        self.assertEqual(os.stat(self.store.version_path).st_mode & 0o777, 0o644)
+
+    def test_publish_conflict(self):
+        """Test a stale writer cannot overwrite a newer version"""
+        snapshot = self.store.current()
+        self.store.publish(snapshot.to_frame())
+        with self.assertRaises(CatalogConflictError):
+            self.store.publish(snapshot.to_frame(), expected_version=snapshot.version)
+
+    def test_pinned_version_is_kept_until_released(self):
+        """Test old versions are reclaimed once no reader pins them"""
+        with self.store.pin() as pinned:
+            self.store.publish(pinned.to_frame())
+            self.assertEqual(self.store.live_versions(), {1: 1, 2: 0})
+        self.assertEqual(self.store.live_versions(), {2: 0})
+
+    def test_external_edit_is_a_new_version(self):
+        """Test editing the file outside the store is detected"""
+        first = self.store.current()
+        pd.DataFrame(TEST_COURSES[:1]).to_csv(self.test_csv, index=False)
+        second = self.store.current()
+        self.assertEqual(second.version, first.version + 1)
+        self.assertEqual(len(second.df), 1)
+
+    def test_concurrent_readers_see_whole_versions(self):
+        """Test readers never observe a partially written catalog"""
+        errors = []
+        sizes = {}
+
+        def writer():
+            for n in range(1, 30):
+                self.store.publish(pd.DataFrame(TEST_COURSES * n))
+                sizes[n + 1] = len(TEST_COURSES) * n
+
+        def reader():
+            reader_store = CatalogStore(self.test_csv)
+            for _ in range(100):
+                with reader_store.pin() as snapshot:
+                    if len(snapshot.df) % len(TEST_COURSES):
+                        errors.append(len(snapshot.df))
+
+        threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader) for _ in range(3)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(self.store.current().version, 30)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    unittest.main()
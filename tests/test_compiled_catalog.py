@@ -0,0 +1,82 @@
+import unittest
+import pandas as pd
+import tempfile
+import shutil
+import os
+from integration.compiled_catalog import (CompiledCatalog, CourseView, semester_bit, semester_mask, ALL_SEMESTERS,
+                                         SEMESTER_BITS, UnknownSemesterError)
+from integration.demand_forecast import forecast_demand
+from tests.data.test_data import TEST_COURSES, TEST_POLICIES, TEST_STUDENT_PROFILES
+from Inference_engine_KBS import AdvisingEngine, StudentProfile
+
+class TestCompiledCatalog(unittest.TestCase):
+    def setUp(self):
+        self.catalog = CompiledCatalog.from_records(TEST_COURSES)
+
+    def test_semester_mask(self):
+        """Test semester strings map to bit flags"""
+        self.assertEqual(semester_mask("FALL"), SEMESTER_BITS["FALL"])
+        self.assertEqual(semester_mask(" both "), ALL_SEMESTERS)
+        self.assertEqual(semester_mask("FALL, SPRING"), SEMESTER_BITS["FALL"] | SEMESTER_BITS["SPRING"])
+        self.assertEqual(semester_mask(""), 0)
+
+    def test_unknown_semester_is_rejected(self):
+        """Test a semester no course can be offered in raises instead of advising nothing"""
+        self.assertEqual(semester_bit(" spring "), SEMESTER_BITS["SPRING"])
+        with self.assertRaisesRegex(UnknownSemesterError, "'Autumn'"):
+            semester_bit("Autumn")
+        student = dict(TEST_STUDENT_PROFILES[0], semester="WINTER")
+        engine = AdvisingEngine(TEST_COURSES, student, pd.DataFrame(TEST_POLICIES))
+        engine.reset()
+        engine.declare(StudentProfile(**student))
+        with self.assertRaises(UnknownSemesterError):
+            engine.run()
+        with self.assertRaises(UnknownSemesterError):
+            forecast_demand(self.catalog, [student], pd.DataFrame(TEST_POLICIES))
+
+    def test_codes_are_interned_to_ids(self):
+        """Test course codes get the low ids and referenced codes follow"""
+        catalog = CompiledCatalog.from_records(TEST_COURSES + [dict(TEST_COURSES[0], **{"Course Code": "X1", "Prerequisites": "EXT1"})])
+        self.assertEqual(catalog.codes, ["MAT111", "CSE014", "CSE015", "X1", "EXT1"])
+        self.assertEqual(list(catalog.prerequisite_ids(2)), [1])
+        self.assertEqual(list(catalog.prerequisite_ids(3)), [4])
+        self.assertEqual(list(catalog.column("credits")), [3, 3, 3, 3])
+
+    def test_course_view(self):
+        """Test views behave like the old course dicts"""
+        view = self.catalog.course(2)
+        self.assertIsInstance(view, CourseView)
+        self.assertEqual(view["Course Code"], "CSE015")
+        self.assertEqual(view["Prerequisites"], "CSE014")
+        self.assertEqual(view.credits, 3)
+        self.assertEqual(view["Description"], "OOP concepts")
+        self.assertFalse(hasattr(view, "__dict__"))
+        df = pd.DataFrame(list(self.catalog))
+        self.assertEqual(df["Course Code"].tolist(), ["MAT111", "CSE014", "CSE015"])
+
+    def test_descriptions_load_lazily_from_file(self):
+        """Test descriptions are read from the CSV on first access only"""
+        temp_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(temp_dir, "courses.csv")
+            pd.DataFrame(TEST_COURSES).to_csv(path, index=False)
+            catalog = CompiledCatalog.from_frame(pd.read_csv(path), path=path)
+            self.assertIsNone(catalog._descriptions)
+            self.assertEqual(catalog.description(1), "Introduction to programming")
+        finally:
+            shutil.rmtree(temp_dir)
+
+    def test_engine_accepts_compiled_catalog(self):
+        """Test the engine gives the same advice from a compiled catalog"""
+        for student in TEST_STUDENT_PROFILES:
+            results = []
+            for courses in (TEST_COURSES, self.catalog):
+                engine = AdvisingEngine(courses, student, pd.DataFrame(TEST_POLICIES))
+                engine.reset()
+                engine.declare(StudentProfile(**student))
+                engine.run()
+                results.append(([c["Course Code"] for c in engine.recommended_courses], engine.explanations))
+            self.assertEqual(results[0], results[1])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+import unittest
+import pandas as pd
+import tempfile
+import threading
+from unittest import mock
+import shutil
+import os
+from integration.catalog_store import CatalogStore
+from integration.course_index import CourseIndex, diff_catalogs
+from integration.catalog_watcher import CatalogWatcher, LiveKnowledgeBase
+from tests.data.test_data import TEST_COURSES, TEST_POLICIES
+
+class TestCourseIndex(unittest.TestCase):
+    def setUp(self):
+        self.df = pd.DataFrame(TEST_COURSES)
+        self.index = CourseIndex()
+        self.index.build(self.df)
+
+    def test_build(self):
+        """Test the index parses every course and the prerequisite graph"""
+        self.assertEqual(self.index.order, ["MAT111", "CSE014", "CSE015"])
+        self.assertEqual(self.index.prerequisites["CSE015"], ("CSE014",))
+        self.assertEqual(self.index.dependents["CSE014"], {"CSE015"})
+        self.assertEqual(self.index.records["MAT111"]["Credit Hours"], 3)
+
+    def test_diff(self):
+        """Test added, removed and changed rows are detected"""
+        new_df = self.df.copy()
+        new_df.loc[new_df["Course Code"] == "MAT111", "Credit Hours"] = 4
+        new_df = new_df[new_df["Course Code"] != "CSE015"]
+        new_df.loc[len(new_df)] = ["PHY101", "Physics", "Physics", "MAT111", "", 3, "FALL"]
+        diff = diff_catalogs(self.df, new_df)
+        self.assertEqual(diff.added, ("PHY101",))
+        self.assertEqual(diff.removed, ("CSE015",))
+        self.assertEqual(diff.changed, ("MAT111",))
+        self.assertFalse(diff_catalogs(self.df, self.df.copy()))
+
+    def test_incremental_apply(self):
+        """Test only changed rows are re-parsed and the graph is updated"""
+        untouched = self.index.records["CSE014"]
+        new_df = self.df.copy()
+        new_df.loc[new_df["Course Code"] == "CSE015", "Prerequisites"] = "MAT111"
+        diff = diff_catalogs(self.df, new_df)
+        self.index.apply(diff, new_df)
+        self.assertIs(self.index.records["CSE014"], untouched)
+        self.assertEqual(self.index.records["CSE015"]["Prerequisites"], "MAT111")
+        self.assertNotIn("CSE014", self.index.dependents)
+        self.assertEqual(self.index.dependents["MAT111"], {"CSE015"})
+
+class TestLiveKnowledgeBase(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.courses_csv = os.path.join(self.temp_dir, "courses.csv")
+        self.policies_csv = os.path.join(self.temp_dir, "policies.csv")
+        pd.DataFrame(TEST_COURSES).to_csv(self.courses_csv, index=False)
+        pd.DataFrame(TEST_POLICIES).to_csv(self.policies_csv, index=False)
+        self.kb = LiveKnowledgeBase(self.courses_csv, self.policies_csv)
+
+    def test_refresh_applies_diff(self):
+        """Test a published edit reaches the catalog and listeners"""
+        events = []
+        self.kb.add_listener(lambda diff, policies_changed: events.append((diff, policies_changed)))
+        self.assertIsNone(self.kb.refresh())
+        df = pd.DataFrame(TEST_COURSES)
+        df.loc[df["Course Code"] == "CSE015", "Semester Offered"] = "FALL"
+        CatalogStore(self.courses_csv).publish(df)
+        diff = self.kb.refresh()
+        self.assertEqual(diff.changed, ("CSE015",))
+        self.assertEqual(events, [(diff, False)])
+        self.assertEqual(self.kb.catalog().course(2)["Semester Offered"], "FALL")
+
+    def test_refresh_never_moves_backwards(self):
+        """Test a refresh that read an older snapshot keeps the newer one"""
+        old = self.kb.courses_store.current()
+        CatalogStore(self.courses_csv).publish(pd.DataFrame(TEST_COURSES[:2]))
+        self.kb.refresh()
+        with mock.patch.object(self.kb.courses_store, "current", return_value=old):
+            self.assertIsNone(self.kb.refresh())
+        self.assertEqual(self.kb.version, old.version + 1)
+        self.assertEqual(len(self.kb.catalog()), 2)
+
+    def test_concurrent_refreshes_notify_in_order(self):
+        """Test racing reloads reach listeners once per version, oldest first"""
+        versions = []
+        self.kb.add_listener(lambda diff, policies_changed: versions.append(self.kb.version))
+        threads = [threading.Thread(target=self.kb.refresh) for _ in range(8)]
+        for count, thread in enumerate(threads):
+            if count % 3 == 0:
+                CatalogStore(self.courses_csv).publish(pd.DataFrame(TEST_COURSES[:3 - count // 3]))
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.kb.refresh()
+        self.assertEqual(versions, sorted(set(versions)))
+        self.assertEqual(versions[-1], self.kb.version)
+
+    def test_watcher_polling(self):
+        """Test the polling fallback notices a replaced file"""
+        self._check_watcher(use_inotify=False)
+
+    def test_watcher_inotify(self):
+        """Test the inotify watcher notices a replaced file"""
+        self._check_watcher(use_inotify=True)
+
+    def _check_watcher(self, use_inotify):
+        changed = threading.Event()
+        watcher = CatalogWatcher([self.courses_csv], changed.set, interval=0.05, use_inotify=use_inotify)
+        watcher.start()
+        try:
+            # Give the watcher a moment to install its watch
+            changed.wait(0.2)
+            CatalogStore(self.courses_csv).publish(pd.DataFrame(TEST_COURSES[:1]))
+            self.assertTrue(changed.wait(5))
+        finally:
+            watcher.stop()
+            watcher.join()
+
+    def tearDown(self):
+        self.kb.stop()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import unittest
+import pandas as pd
+import tempfile
+import shutil
+import os
+from integration.catalog_store import CatalogStore
+from integration.course_index import diff_catalogs
+from integration.course_search import CourseSearchIndex, get_search_index, tokenize
+from tests.data.test_data import TEST_COURSES
+
+class TestCourseSearch(unittest.TestCase):
+    def setUp(self):
+        self.df = pd.DataFrame(TEST_COURSES)
+        self.index = CourseSearchIndex()
+        self.index.build(self.df)
+
+    def test_tokenize(self):
+        """Test text is split into lowercase alphanumeric tokens"""
+        self.assertEqual(tokenize("Object-Oriented Programming II"), ["object", "oriented", "programming", "ii"])
+        self.assertEqual(tokenize(float("nan")), [])
+
+    def test_prefix_matching_and_ranking(self):
+        """Test prefix queries find courses and name matches outrank descriptions"""
+        self.assertEqual([h.code for h in self.index.search("prog")], ["CSE014", "CSE015"])
+        self.assertEqual([h.code for h in self.index.search("cse")], ["CSE014", "CSE015"])
+        self.assertEqual([h.code for h in self.index.search("calc")], ["MAT111"])
+        self.assertEqual([h.code for h in self.index.search("object prog")], ["CSE015"])
+        self.assertEqual(self.index.search("programming xyz"), [])
+
+    def test_exact_code_first(self):
+        """Test an exact course code is ranked first"""
+        hits = self.index.search("cse015")
+        self.assertEqual(hits[0].code, "CSE015")
+        self.assertEqual(hits[0].name, "Object Oriented Programming")
+        self.assertEqual([h.code for h in self.index.search("014")], ["CSE014"])
+
+    def test_incremental_update(self):
+        """Test applying a diff gives the same index as a rebuild"""
+        new_df = self.df.copy()
+        new_df.loc[0, "Course Name"] = "Calculus"
+        new_df = new_df[new_df["Course Code"] != "CSE015"]
+        new_df.loc[len(new_df)] = ["PHY101", "Physics I", "Mechanics", "", "", 3, "FALL"]
+        self.index.apply(diff_catalogs(self.df, new_df), new_df)
+        rebuilt = CourseSearchIndex()
+        rebuilt.build(new_df)
+        self.assertEqual(self.index.postings, rebuilt.postings)
+        self.assertEqual(self.index.vocabulary, rebuilt.vocabulary)
+        self.assertEqual(self.index.order, ["MAT111", "CSE014", "PHY101"])
+        self.assertEqual([h.code for h in self.index.search("mech")], ["PHY101"])
+
+    def test_derive_leaves_the_index_unchanged(self):
+        """Test a derived index equals a rebuild and shares nothing it changed"""
+        postings = {token: dict(posting) for token, posting in self.index.postings.items()}
+        new_df = self.df.copy()
+        new_df.loc[0, "Description"] = "Limits and derivatives"
+        new_df.loc[len(new_df)] = ["PHY101", "Physics I", "Mechanics", "", "", 3, "FALL"]
+        derived = self.index.derive(diff_catalogs(self.df, new_df), new_df)
+        rebuilt = CourseSearchIndex()
+        rebuilt.build(new_df)
+        self.assertEqual(derived.postings, rebuilt.postings)
+        self.assertEqual(derived.vocabulary, rebuilt.vocabulary)
+        self.assertEqual(derived.order, rebuilt.order)
+        self.assertEqual(self.index.postings, postings)
+        self.assertEqual(self.index.order, ["MAT111", "CSE014", "CSE015"])
+
+    def test_options(self):
+        """Test selector options keep the selection and limit only search results"""
+        self.assertEqual(self.index.options("", limit=2), ["MAT111", "CSE014", "CSE015"])
+        self.assertEqual(self.index.options("", keep=["CSE015"], limit=1), ["CSE015", "MAT111", "CSE014"])
+        self.assertEqual(self.index.options("prog", keep=["MAT111"]), ["MAT111", "CSE014", "CSE015"])
+        self.assertEqual(self.index.options("prog", keep=["MAT111"], limit=2), ["MAT111", "CSE014"])
+
+    def test_index_follows_store_versions(self):
+        """Test the shared index is reused and updated on new versions"""
+        temp_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(temp_dir, "courses.csv")
+            self.df.to_csv(path, index=False)
+            store = CatalogStore(path)
+            first = store.current()
+            index = get_search_index(store)
+            self.assertIs(get_search_index(store), index)
+            edited = self.df.copy()
+            edited.loc[2, "Course Name"] = "Software Design"
+            store.publish(edited)
+            updated = get_search_index(store)
+            self.assertIs(get_search_index(store), updated)
+            self.assertEqual([h.code for h in updated.search("softw")], ["CSE015"])
+            # The index of the old version is not changed under its readers
+            self.assertEqual(index.search("softw"), [])
+            self.assertEqual(get_search_index(store, first).postings, index.postings)
+            self.assertIs(get_search_index(store), updated)
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,187 @@
+import unittest
+from unittest import mock
+import pandas as pd
+import tempfile
+import shutil
+import os
+import threading
+import time
+from integration.catalog_watcher import LiveKnowledgeBase
+from integration.compiled_catalog import CompiledCatalog
+from integration.decision_trace import TraceRecorder, main, read_runs, segment_names
+from integration.seat_allocator import cohort_eligibility
+from integration.speculative_advisor import SpeculativeAdvisor
+from tests.data.test_data import TEST_COURSES, TEST_POLICIES
+from Inference_engine_KBS import AdvisingEngine, StudentProfile
+
+COURSES = TEST_COURSES + [
+    {"Course Code": "PHY101", "Course Name": "Physics", "Description": "", "Prerequisites": "MAT111",
+     "Co-requisites": "", "Credit Hours": 4, "Semester Offered": "BOTH"},
+]
+
+class TestDecisionTrace(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.recorder = TraceRecorder(self.temp_dir)
+        self.catalog = CompiledCatalog.from_records(COURSES)
+
+    def tearDown(self):
+        self.recorder.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def advise(self, profile, catalog_version=3):
+        engine = AdvisingEngine(self.catalog, profile, pd.DataFrame(TEST_POLICIES),
+                                recorder=self.recorder, catalog_version=catalog_version)
+        engine.reset()
+        engine.declare(StudentProfile(**{k: profile[k] for k in ("cgpa", "semester", "passed_courses", "failed_courses")}))
+        engine.run()
+        return engine
+
+    def test_decisions_match_the_explanations(self):
+        """Test the recorded run replays every decision of the engine in order"""
+        profile = {"student_id": "s1", "cgpa": 1.5, "semester": "FALL",
+                   "passed_courses": ["MAT111"], "failed_courses": ["CSE014", "CSE015"]}
+        engine = self.advise(profile)
+        self.recorder.flush()
+        (run,) = read_runs(self.temp_dir, "s1")
+        self.assertEqual((run.catalog_version, run.cgpa, run.semester, run.credit_limit), (3, 1.5, "FALL", 12))
+        self.assertEqual([d.code for d in run.decisions], [e.split()[0] for e in engine.explanations])
+        self.assertEqual([d.code for d in run.decisions if d.selected], [c["Course Code"] for c in engine.recommended_courses])
+        self.assertEqual(run.decisions[-1].credits, engine.total_credits)
+        for decision, explanation in zip(run.decisions, engine.explanations):
+            if "unmet" not in explanation and decision.check != "selected" or decision.retake:
+                self.assertEqual(decision.describe(run.semester), explanation)
+        self.assertEqual([(d.check, d.retake) for d in run.decisions[:2]],
+                         [("selected", True), ("semester", True)])
+
+    def test_index_by_student_and_catalog_version(self):
+        """Test runs are found by student id and by catalog version"""
+        for version, student in ((1, "a"), (1, "b"), (2, "a")):
+            self.advise({"student_id": student, "cgpa": 3.0, "semester": "SPRING",
+                         "passed_courses": [], "failed_courses": []}, version)
+        other = CompiledCatalog.from_records(TEST_COURSES)
+        engine = AdvisingEngine(other, {"student_id": "c", "cgpa": 3.0, "semester": "FALL", "passed_courses": [],
+                                        "failed_courses": []}, pd.DataFrame(TEST_POLICIES), recorder=self.recorder)
+        engine.reset()
+        engine.declare(StudentProfile(cgpa=3.0, semester="FALL", passed_courses=[], failed_courses=[]))
+        engine.run()
+        self.recorder.close()
+        self.assertEqual([r.catalog_version for r in read_runs(self.temp_dir, "a")], [1, 2])
+        self.assertEqual([r.student_id for r in read_runs(self.temp_dir, catalog_version=1)], ["a", "b"])
+        (run,) = read_runs(self.temp_dir, "c")
+        self.assertEqual([d.code for d in run.decisions], ["MAT111", "CSE014", "CSE015"])
+
+    def test_partly_written_index(self):
+        """Test a cut-off entry at the end of an index is skipped"""
+        for student in ("a", "b"):
+            self.advise({"student_id": student, "cgpa": 3.0, "semester": "SPRING",
+                         "passed_courses": [], "failed_courses": []})
+        self.recorder.close()
+        (segment,) = segment_names(self.temp_dir)
+        with open(segment + ".idx", "rb") as fh:
+            raw = fh.read()
+        for size in range(len(raw) + 1):
+            with open(segment + ".idx", "wb") as fh:
+                fh.write(raw[:size])
+            students = [run.student_id for run in read_runs(self.temp_dir)]
+            self.assertIn(students, ([], ["a"], ["a", "b"]))
+        self.assertEqual(students, ["a", "b"])
+
+    def test_rotation_and_threads(self):
+        """Test segments rotate, old ones are deleted and threads do not mix runs"""
+        # self.recorder writes to the same directory; its segment must survive
+        live = os.path.join(self.temp_dir, self.recorder._segment)
+        recorder = TraceRecorder(self.temp_dir, capacity=16, segment_bytes=64, segments=2)
+        catalog = CompiledCatalog.from_records(COURSES)
+        policies = pd.DataFrame(TEST_POLICIES)
+
+        def advise(thread):
+            for i in range(20):
+                profile = {"student_id": f"{thread}-{i}", "cgpa": 3.0, "semester": "FALL",
+                           "passed_courses": ["MAT111"], "failed_courses": []}
+                engine = AdvisingEngine(catalog, profile, policies, recorder=recorder)
+                engine.reset()
+                engine.declare(StudentProfile(cgpa=3.0, semester="FALL", passed_courses=["MAT111"], failed_courses=[]))
+                engine.run()
+
+        threads = [threading.Thread(target=advise, args=(t,)) for t in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        recorder.close()
+        self.assertIn(live, segment_names(self.temp_dir))
+        self.assertLessEqual(len(segment_names(self.temp_dir)), 3)
+        runs = list(read_runs(self.temp_dir))
+        self.assertTrue(runs)
+        for run in runs:
+            self.assertEqual([(d.code, d.check) for d in run.decisions],
+                             [("CSE014", "selected"), ("CSE015", "semester"), ("PHY101", "selected")])
+
+    def test_cohort_runs_and_reader(self):
+        """Test batch runs are recorded under their student ids and shown by the reader"""
+        students = [{"student_id": 7, "cgpa": 3.5, "semester": "FALL", "passed_courses": [], "failed_courses": []}]
+        with mock.patch.dict(os.environ, {"KBS_DECISION_TRACE": os.path.join(self.temp_dir, "batch")}):
+            cohort_eligibility(COURSES, students, pd.DataFrame(TEST_POLICIES), catalog_version=5)
+        from integration.decision_trace import get_trace_recorder
+        get_trace_recorder(os.path.join(self.temp_dir, "batch")).flush()
+        with mock.patch("builtins.print") as output:
+            main([os.path.join(self.temp_dir, "batch"), "--student", "7"])
+        lines = [call.args[0] for call in output.call_args_list if call.args]
+        self.assertIn("student 7", lines[0])
+        self.assertIn("catalog v5", lines[0])
+        self.assertIn("no credit limit", lines[0])
+        self.assertTrue(lines[1].endswith("MAT111 is recommended."))
+        self.assertIn("3 cr", lines[1])
+
+    def test_timer_flushes_an_idle_recorder(self):
+        """Test a finished run is written out without another run or a flush"""
+        recorder = TraceRecorder(os.path.join(self.temp_dir, "idle"), flush_interval=0.05)
+        try:
+            engine = AdvisingEngine(self.catalog, {"student_id": "idle", "cgpa": 3.0, "semester": "FALL",
+                                                   "passed_courses": [], "failed_courses": []},
+                                    pd.DataFrame(TEST_POLICIES), recorder=recorder)
+            engine.reset()
+            engine.declare(StudentProfile(cgpa=3.0, semester="FALL", passed_courses=[], failed_courses=[]))
+            engine.run()
+            deadline = time.monotonic() + 5
+            while not list(read_runs(recorder.directory, "idle")) and time.monotonic() < deadline:
+                time.sleep(0.02)
+            (run,) = read_runs(recorder.directory, "idle")
+            self.assertEqual(run.reference, engine.trace_reference)
+        finally:
+            recorder.close()
+
+    def test_cached_advice_references_the_run(self):
+        """Test advice served from the cache is recorded with the run that computed it"""
+        courses = os.path.join(self.temp_dir, "kb", "courses.csv")
+        policies = os.path.join(self.temp_dir, "kb", "policies.csv")
+        os.makedirs(os.path.dirname(courses))
+        pd.DataFrame(COURSES).to_csv(courses, index=False)
+        pd.DataFrame(TEST_POLICIES).to_csv(policies, index=False)
+        profile = {"cgpa": 3.0, "semester": "FALL", "passed_courses": ["MAT111"], "failed_courses": []}
+        with mock.patch("Inference_engine_KBS.get_trace_recorder", return_value=self.recorder), \
+                mock.patch("integration.speculative_advisor.get_trace_recorder", return_value=self.recorder):
+            knowledge_base = LiveKnowledgeBase(courses, policies)
+            advisor = SpeculativeAdvisor(knowledge_base)
+            try:
+                first = advisor.result("s1", dict(profile, student_id="a"))
+                again = advisor.result("s2", dict(profile, student_id="b"))
+            finally:
+                advisor.shutdown()
+        self.assertTrue(first.trace)
+        self.assertEqual(again.trace, first.trace)
+        self.recorder.flush()
+        (computed,) = read_runs(self.temp_dir, "a")
+        (served,) = read_runs(self.temp_dir, "b")
+        self.assertEqual(computed.reference, first.trace)
+        self.assertIsNone(computed.served_from)
+        self.assertEqual(served.served_from, first.trace)
+        self.assertEqual(served.catalog_version, knowledge_base.version)
+        self.assertEqual(served.decisions, computed.decisions)
+        with mock.patch("builtins.print") as output:
+            main([self.temp_dir, "--student", "b"])
+        self.assertIn("served from the cache", output.call_args_list[1].args[0])
+
+if __name__ == '__main__':
+    unittest.main()
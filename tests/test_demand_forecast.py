@@ -0,0 +1,63 @@
+import unittest
+import pandas as pd
+import tempfile
+import shutil
+import os
+from integration.compiled_catalog import CompiledCatalog
+from integration.demand_forecast import forecast_demand, load_cohort, main, split_courses
+from tests.data.test_data import TEST_COURSES, TEST_POLICIES
+from Inference_engine_KBS import AdvisingEngine, StudentProfile
+
+COHORT = [
+    {"student_id": "1", "cgpa": 3.5, "semester": "FALL", "passed_courses": [], "failed_courses": []},
+    {"student_id": "2", "cgpa": 1.5, "semester": "SPRING", "passed_courses": ["CSE014"], "failed_courses": []},
+    {"student_id": "3", "cgpa": 2.5, "semester": "FALL", "passed_courses": ["MAT111"], "failed_courses": ["CSE014"]},
+    {"student_id": "4", "cgpa": 1.0, "semester": "SPRING", "passed_courses": [], "failed_courses": []},
+]
+
+class TestDemandForecast(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def test_split_courses(self):
+        """Test both separators are accepted in cohort files"""
+        self.assertEqual(split_courses("MAT111; CSE014,CSE015"), ["MAT111", "CSE014", "CSE015"])
+        self.assertEqual(split_courses(float("nan")), [])
+
+    def test_matches_engine(self):
+        """Test recommended counts equal the sum of individual engine runs"""
+        policies_df = pd.DataFrame(TEST_POLICIES)
+        report = forecast_demand(CompiledCatalog.from_records(TEST_COURSES), COHORT, policies_df, chunk_size=3)
+        expected = dict.fromkeys(report["Course Code"], 0)
+        for student in COHORT:
+            engine = AdvisingEngine(TEST_COURSES, student, policies_df)
+            engine.reset()
+            engine.declare(StudentProfile(**student))
+            engine.run()
+            for course in engine.recommended_courses:
+                expected[course["Course Code"]] += 1
+        self.assertEqual(dict(zip(report["Course Code"], report["Recommended"])), expected)
+        self.assertEqual(report["Eligible"].tolist(), [1, 2, 1])
+        self.assertEqual(report.attrs["students_per_band"], {12: 2, 20: 1, 22: 1})
+        self.assertEqual(report["Recommended (12 credit limit)"].tolist(), [0, 0, 1])
+
+    def test_command(self):
+        """Test the command reads a cohort file and writes the report"""
+        cohort_csv = os.path.join(self.temp_dir, "cohort.csv")
+        courses_csv = os.path.join(self.temp_dir, "courses.csv")
+        policies_csv = os.path.join(self.temp_dir, "policies.csv")
+        output = os.path.join(self.temp_dir, "report.csv")
+        pd.DataFrame([dict(s, passed_courses=";".join(s["passed_courses"]), failed_courses=";".join(s["failed_courses"]))
+                      for s in COHORT]).to_csv(cohort_csv, index=False)
+        pd.DataFrame(TEST_COURSES).to_csv(courses_csv, index=False)
+        pd.DataFrame(TEST_POLICIES).to_csv(policies_csv, index=False)
+        self.assertEqual(load_cohort(cohort_csv)[2]["failed_courses"], ["CSE014"])
+        main([cohort_csv, "--courses", courses_csv, "--policies", policies_csv, "--output", output])
+        report = pd.read_csv(output)
+        self.assertEqual(report["Course Code"].tolist(), ["MAT111", "CSE014", "CSE015"])
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import unittest
+import pandas as pd
+import tempfile
+import shutil
+import os
+from io import StringIO
+from contextlib import redirect_stdout
+from integration.impact import DependencyIndex, catalog_impact, main
+from integration.recommendation_cache import RecommendationCache
+from integration.speculative_advisor import Advice
+from tests.data.test_data import TEST_COURSES, TEST_POLICIES
+
+PROFILES = [
+    {"student_id": "1", "cgpa": 3.5, "semester": "FALL", "passed_courses": [], "failed_courses": []},
+    {"student_id": "2", "cgpa": 3.0, "semester": "SPRING", "passed_courses": ["CSE014"], "failed_courses": []},
+    {"student_id": "3", "cgpa": 2.5, "semester": "FALL", "passed_courses": ["MAT111", "CSE014"],
+     "failed_courses": []},
+]
+
+class TestImpact(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.old_df = pd.DataFrame(TEST_COURSES)
+        self.policies_df = pd.DataFrame(TEST_POLICIES)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def edited(self, code, **changes):
+        df = self.old_df.copy()
+        for column, value in changes.items():
+            df.loc[df["Course Code"] == code, column] = value
+        return df
+
+    def test_dependents(self):
+        """Test a course's dependents are the profiles that have not passed it"""
+        index = DependencyIndex(PROFILES)
+        self.assertEqual(index.dependents("CSE014").tolist(), [0])
+        self.assertEqual(index.dependents("CSE015").tolist(), [0, 1, 2])
+
+    def test_only_affected_students(self):
+        """Test only students whose eligibility changes are advised again"""
+        # CSE015 also offered in the fall: only student 3 is in the fall and has its prerequisite
+        report = catalog_impact(self.old_df, self.edited("CSE015", **{"Semester Offered": "BOTH"}),
+                                PROFILES, self.policies_df)
+        self.assertEqual(report.diff.changed, ("CSE015",))
+        self.assertEqual(report.affected, 1)
+        self.assertEqual(report.changes["Student"].tolist(), ["3"])
+        self.assertEqual(report.changes["Added"].tolist(), ["CSE015"])
+        self.assertEqual(report.changes["Credits after"].tolist(), [3])
+
+        # A renamed course changes nobody's eligibility
+        renamed = catalog_impact(self.old_df, self.edited("MAT111", **{"Course Name": "Calculus I"}),
+                                 PROFILES, self.policies_df)
+        self.assertEqual((renamed.affected, len(renamed.changes)), (0, 0))
+
+    def test_credits_and_removal(self):
+        """Test credit changes of open courses and removed courses"""
+        report = catalog_impact(self.old_df, self.edited("MAT111", **{"Credit Hours": 4}), PROFILES,
+                                self.policies_df)
+        self.assertEqual(report.affected, 1)
+        self.assertEqual(report.changes.iloc[0]["Credits before"], 6)
+        self.assertEqual(report.changes.iloc[0]["Credits after"], 7)
+
+        removed = self.old_df[self.old_df["Course Code"] != "CSE015"]
+        report = catalog_impact(self.old_df, removed, PROFILES, self.policies_df)
+        self.assertEqual(report.changes["Student"].tolist(), ["2"])
+        self.assertEqual(report.changes["Dropped"].tolist(), ["CSE015"])
+
+    def test_cli(self):
+        """Test the command line reads profiles from the recommendation cache"""
+        old = os.path.join(self.temp_dir, "old.csv")
+        new = os.path.join(self.temp_dir, "courses.csv")
+        policies = os.path.join(self.temp_dir, "policies.csv")
+        cache_path = os.path.join(self.temp_dir, "cache.sqlite3")
+        output = os.path.join(self.temp_dir, "impact.csv")
+        self.old_df.to_csv(old, index=False)
+        self.edited("CSE015", **{"Semester Offered": "BOTH"}).to_csv(new, index=False)
+        self.policies_df.to_csv(policies, index=False)
+        cache = RecommendationCache(cache_path)
+        for profile in PROFILES:
+            cache.put(("a", "b"), profile, Advice([], [], 0, 22))
+        self.assertEqual(len(cache.profiles()), 3)
+        cache.close()
+        with redirect_stdout(StringIO()) as out:
+            main([old, "--new", new, "--policies", policies, "--cache", cache_path, "--output", output])
+        self.assertIn("1 of 3 students re-advised, 1 get different recommendations", out.getvalue())
+        self.assertEqual(pd.read_csv(output)["Added"].tolist(), ["CSE015"])
+
+if __name__ == '__main__':
+    unittest.main()
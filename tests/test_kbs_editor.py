@@ -1,8 +1,12 @@
 import unittest
 import pandas as pd
-from kbsEditor import validate_course
+from kbsEditor import validate_course, validate_prerequisites
 import tempfile
 import os
+from integration.catalog_store import get_store
+from integration.ui_benchmark import EDITOR_PAGE, workspace
+
+POLICIES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "policies.csv")
 
 class TestKBSEditor(unittest.TestCase):
     def setUp(self):
@@ -80,6 +84,60 @@ class TestKBSEditor(unittest.TestCase):
         result = validate_course(None, existing_codes)
         self.assertEqual(result, [])
 
+    def test_validate_prerequisite_expressions(self):
+        """Test prerequisite expressions are checked for syntax and unknown codes"""
+        existing_codes = ["CSE101", "MAT101", "PHY101"]
+        self.assertEqual(validate_prerequisites("CSE101 OR MAT101", existing_codes), (None, []))
+        self.assertEqual(validate_prerequisites("2 OF (CSE101, MAT101, PHY102)", existing_codes), (None, ["PHY102"]))
+        error, invalid = validate_prerequisites("CSE101 OR (MAT101", existing_codes)
+        self.assertIn("')'", error)
+        self.assertEqual(invalid, [])
+        self.assertIsNotNone(validate_prerequisites("CSE101;MAT101", existing_codes)[0])
+
+    def test_concurrent_edit_is_reported(self):
+        """Test an edit is published on top of the version its form was loaded from"""
+        from streamlit.testing.v1 import AppTest
+
+        with workspace(pd.DataFrame(self.test_data), POLICIES):
+            at = AppTest.from_file(EDITOR_PAGE, default_timeout=60)
+            at.run()
+            at.sidebar.radio[0].set_value("Edit Course").run()
+            at.text_input[0].input("MAT101").run()
+            # Another editor renames the course after it was loaded here
+            store = get_store("data/courses.csv")
+            df = store.current().to_frame()
+            df.loc[df["Course Code"] == "MAT101", "Course Name"] = "Calculus"
+            store.publish(df)
+            at.text_input[1].input("Basic Math (edited)")
+            at.button[0].click().run()
+            self.assertIn("changed by another editor", at.error[0].value)
+            names = store.current().df.set_index("Course Code")["Course Name"]
+            self.assertEqual(names["MAT101"], "Calculus")
+
+            # The form is filled from the current version again and can be resubmitted
+            at.run()
+            self.assertEqual(at.text_input[1].value, "Calculus")
+            at.text_input[1].input("Calculus I")
+            at.button[0].click().run()
+            self.assertEqual(len(at.error), 0)
+            self.assertEqual(store.current().df.set_index("Course Code")["Course Name"]["MAT101"], "Calculus I")
+
+    def test_sort_choice_survives_a_search(self):
+        """Test typing a query keeps the chosen sort of the course list"""
+        from streamlit.testing.v1 import AppTest
+
+        with workspace(pd.DataFrame(self.test_data), POLICIES):
+            at = AppTest.from_file(EDITOR_PAGE, default_timeout=60)
+            at.run()
+            sort_by = at.selectbox(key="sort_by")
+            self.assertEqual(sort_by.value, "Relevance")
+            self.assertEqual(at.dataframe[0].value["Course Code"].tolist(), ["CSE101", "MAT101", "PHY101"])
+            sort_by.set_value("Credit Hours")
+            at.selectbox[1].set_value("Descending").run()
+            at.text_input[0].input("basics").run()
+            self.assertEqual(at.selectbox(key="sort_by").value, "Credit Hours")
+            self.assertEqual(at.dataframe[0].value["Course Code"].tolist(), ["PHY101", "CSE101", "MAT101"])
+
     def tearDown(self):
         # Clean up temporary files
         try:
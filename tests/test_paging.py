@@ -0,0 +1,55 @@
+import unittest
+import pandas as pd
+from integration.compiled_catalog import CompiledCatalog
+from integration.paging import group_explanations, paginate, sort_courses
+from tests.data.test_data import TEST_COURSES
+from Inference_engine_KBS import select_courses
+
+class TestPaging(unittest.TestCase):
+    def setUp(self):
+        self.df = pd.DataFrame({"Course Code": [f"C{i:03d}" for i in range(120)],
+                                "Credit Hours": [i % 4 + 1 for i in range(120)]})
+
+    def test_paginate_dataframe(self):
+        """Test pages cover the rows and the page number is clamped"""
+        page = paginate(self.df, 2, 50)
+        self.assertEqual((page.number, page.pages, page.total), (2, 3, 120))
+        self.assertEqual(list(page.rows["Course Code"])[:1], ["C050"])
+        self.assertEqual(page.describe(), "Showing 51-100 of 120 courses")
+        self.assertEqual(len(paginate(self.df, 3, 50).rows), 20)
+        self.assertEqual(paginate(self.df, 99, 50).number, 3)
+        self.assertEqual(paginate(self.df, 0, 50).number, 1)
+
+    def test_paginate_list_and_empty(self):
+        """Test lists page like DataFrames and empty input has one empty page"""
+        page = paginate(list(range(7)), 2, 5)
+        self.assertEqual(page.rows, [5, 6])
+        self.assertEqual(page.describe("decisions"), "Showing 6-7 of 7 decisions")
+        empty = paginate(self.df.iloc[:0], 4)
+        self.assertEqual((empty.number, empty.pages, len(empty.rows)), (1, 1, 0))
+        self.assertEqual(empty.describe(), "No courses")
+
+    def test_sort_courses(self):
+        """Test sorting is numeric for credit hours and stable"""
+        df = pd.DataFrame({"Course Code": ["b2", "A1", "c3"], "Credit Hours": ["10", "9", "10"]})
+        self.assertEqual(list(sort_courses(df, "Course Code")["Course Code"]), ["A1", "b2", "c3"])
+        self.assertEqual(list(sort_courses(df, "Credit Hours")["Course Code"]), ["A1", "b2", "c3"])
+        self.assertEqual(list(sort_courses(df, "Credit Hours", descending=True)["Course Code"]), ["b2", "c3", "A1"])
+        self.assertEqual(list(sort_courses(df, None, descending=True)["Course Code"]), ["c3", "A1", "b2"])
+
+    def test_group_explanations(self):
+        """Test every explanation of the engine lands in one group, in display order"""
+        catalog = CompiledCatalog.from_records(TEST_COURSES)
+        _, _, explanations = select_courses(catalog, catalog.mark(["CSE014"]), catalog.mark(["MAT111"]), "FALL", 22)
+        groups = group_explanations(explanations + ["X is something else."])
+        self.assertEqual(sorted(e for g in groups for e in g.explanations), sorted(explanations + ["X is something else."]))
+        titles = [g.title for g in groups]
+        self.assertEqual(titles[0], "Failed courses to retake")
+        self.assertEqual(titles[-1], "Other")
+        self.assertEqual(groups[0].codes, ["MAT111"])
+        self.assertTrue(groups[0].expanded)
+        offered = next(g for g in groups if g.title == "Not offered this semester")
+        self.assertEqual((offered.codes, len(offered), offered.expanded), (["CSE015"], 1, False))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+import unittest
+import pandas as pd
+import tempfile
+import shutil
+import os
+from integration.compiled_catalog import CompiledCatalog
+from integration.data_manager import DataManager
+from integration.demand_forecast import forecast_demand
+from integration.prerequisites import (PrerequisiteSyntaxError, check_prerequisites, is_expression,
+                                       parse_prerequisites, prerequisite_codes, render)
+from integration.shared_catalog import SharedCatalog, encode_catalog
+from tests.data.test_data import TEST_COURSES, TEST_POLICIES
+from Inference_engine_KBS import select_courses
+
+def course(code, prerequisites, credits=3):
+    return {"Course Code": code, "Course Name": code, "Description": "", "Prerequisites": prerequisites,
+            "Co-requisites": "", "Credit Hours": credits, "Semester Offered": "BOTH"}
+
+COURSES = TEST_COURSES + [
+    course("MAT112", "MAT111"),
+    course("MAT113", "MAT111"),
+    course("CSE101", "MAT112 or MAT113"),
+    course("CSE102", "2 of (MAT111, CSE014, CSE015)"),
+    course("CSE103", "MAT111, (MAT112 OR MAT113)"),
+    course("CSE104", "(CSE014, CSE015) or MAT113"),
+]
+
+class TestPrerequisites(unittest.TestCase):
+    def setUp(self):
+        self.catalog = CompiledCatalog.from_records(COURSES)
+
+    def check(self, code, passed):
+        course_id = [c.code for c in self.catalog].index(code)
+        return self.catalog.unmet_prerequisites(course_id, self.catalog.mark(passed))
+
+    def test_parse_and_render(self):
+        """Test precedence, grouping and the canonical text of expressions"""
+        self.assertEqual(parse_prerequisites("A, B or C"), ("and", ("A", ("or", ("B", "C")))))
+        self.assertEqual(parse_prerequisites("A and B or C"), ("or", (("and", ("A", "B")), "C")))
+        self.assertEqual(parse_prerequisites("A and (B | C)"), ("and", ("A", ("or", ("B", "C")))))
+        self.assertEqual(parse_prerequisites("2 OF (A, B, C)"), ("of", 2, ("A", "B", "C")))
+        self.assertIsNone(parse_prerequisites("  "))
+        self.assertEqual(render(parse_prerequisites("A AND B OR 1 of (C)")), "(A, B) or 1 of (C)")
+        self.assertEqual(prerequisite_codes("A or (B, A)"), ("A", "B"))
+        self.assertEqual(prerequisite_codes("A, B"), ("A", "B"))
+
+    def test_comma_entries_are_required(self):
+        """Test every comma-separated entry is required even next to "or" """
+        catalog = CompiledCatalog.from_records(TEST_COURSES + [course("MAT112", ""), course("MAT113", ""),
+                                                               course("CSE105", "MAT111, MAT112 or MAT113")])
+        course_id = len(catalog) - 1
+        self.assertEqual(catalog.unmet_prerequisites(course_id, catalog.mark(["MAT113"])), ["MAT111"])
+        self.assertEqual(catalog.unmet_prerequisites(course_id, catalog.mark(["MAT111", "MAT113"])), [])
+        self.assertEqual(catalog.requirements[course_id].parts[1][0], "(MAT112 or MAT113)")
+
+    def test_syntax_errors(self):
+        """Test malformed expressions are rejected with a message"""
+        for text in ("A or", "(A, B", "3 of (A, B)", "2 of (A, A)", "A;B", "A B", "2 of (A or B)"):
+            with self.assertRaises(PrerequisiteSyntaxError, msg=text):
+                check_prerequisites(text)
+        self.assertEqual(check_prerequisites("A or B"), ("A", "B"))
+
+    def test_plain_lists_are_not_expressions(self):
+        """Test comma lists and unparsable legacy values keep the plain scan"""
+        self.assertFalse(is_expression("MAT111, CSE014"))
+        self.assertFalse(is_expression("MAT111 and CSE014"))
+        self.assertTrue(is_expression("MAT111 or CSE014"))
+        with self.assertLogs("integration.prerequisites", "WARNING"):
+            catalog = CompiledCatalog.from_records([course("X1", "A, B"), course("X2", "A or B, (C")])
+        self.assertEqual(catalog.requirements, {})
+        self.assertEqual(catalog.codes_of(catalog.prerequisite_ids(1)), ("A or B", "(C"))
+
+    def test_evaluation(self):
+        """Test or, n-of-m and nested requirements against passed courses"""
+        self.assertEqual(self.check("CSE101", ["MAT113"]), [])
+        self.assertEqual(self.check("CSE101", ["MAT111"]), ["MAT112 or MAT113"])
+        self.assertEqual(self.check("CSE102", ["CSE014", "CSE015"]), [])
+        self.assertEqual(self.check("CSE102", ["CSE014"]), ["2 of (MAT111, CSE014, CSE015)"])
+        self.assertEqual(self.check("CSE103", ["MAT112"]), ["MAT111"])
+        self.assertEqual(self.check("CSE103", []), ["MAT111", "(MAT112 or MAT113)"])
+        self.assertEqual(self.check("CSE104", ["CSE014"]), ["(CSE014, CSE015) or MAT113"])
+        self.assertEqual(self.check("CSE104", ["CSE014", "CSE015"]), [])
+        self.assertEqual(self.check("CSE015", []), ["CSE014"])
+        requirement = self.catalog.requirements[[c.code for c in self.catalog].index("CSE104")]
+        self.assertTrue(requirement.satisfied(self.catalog.mark(["MAT113"])))
+        self.assertEqual(requirement.bits(self.catalog.mark(["CSE015", "MAT113"])), 0b110)
+
+    def test_advising_explanations(self):
+        """Test the advising rules name the unmet part and the passed alternative"""
+        passed = self.catalog.mark(["MAT111", "MAT113", "CSE014"])
+        selected, _, explanations = select_courses(self.catalog, passed, self.catalog.mark([]), "FALL", 22)
+        self.assertIn("CSE101 is recommended because you passed MAT113, its prerequisite(s).", explanations)
+        self.assertIn("CSE102 is recommended because you passed MAT111, CSE014, its prerequisite(s).", explanations)
+        self.assertEqual(self.catalog.course(5)["Prerequisites"], "MAT112 or MAT113")
+
+    def test_data_manager(self):
+        """Test DataManager validates selections with expressions"""
+        manager = DataManager(test_mode=True)
+        manager.courses_df = pd.DataFrame(COURSES)
+        self.assertTrue(manager.validate_course_selection("CSE101", ["MAT112"], "FALL")["valid"])
+        result = manager.validate_course_selection("CSE101", ["MAT111"], "FALL")
+        self.assertEqual(result["reason"], "Missing prerequisites: MAT112 or MAT113")
+        available = [c["Course Code"] for c in manager.get_available_courses(["MAT111", "CSE015"], "FALL", 3.0)]
+        self.assertIn("CSE102", available)
+        self.assertNotIn("CSE101", available)
+        self.assertEqual(manager.get_prerequisites("CSE103"), ["MAT111", "MAT112", "MAT113"])
+
+    def test_forecast_and_shared_image(self):
+        """Test the vectorized forecast and a mapped image evaluate expressions too"""
+        students = [{"cgpa": 3.0, "semester": "FALL", "passed_courses": passed, "failed_courses": []}
+                    for passed in (["MAT111", "MAT113"], ["CSE014"], ["CSE014", "CSE015"])]
+        forecast = forecast_demand(self.catalog, students, pd.DataFrame(TEST_POLICIES)).set_index("Course Code")
+        self.assertEqual(forecast.loc["CSE101", "Eligible"], 1)
+        self.assertEqual(forecast.loc["CSE102", "Eligible"], 1)
+        self.assertEqual(forecast.loc["CSE104", "Eligible"], 2)
+
+        temp_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(temp_dir, "courses.catalog")
+            with open(path, "wb") as fh:
+                fh.write(encode_catalog(self.catalog, 1, "test"))
+            shared = SharedCatalog(path).catalog
+            self.assertEqual({i: r.text for i, r in shared.requirements.items()},
+                             {i: r.text for i, r in self.catalog.requirements.items()})
+            passed = ["MAT111", "CSE014"]
+            self.assertEqual(select_courses(shared, shared.mark(passed), shared.mark([]), "FALL", 22),
+                             select_courses(self.catalog, self.catalog.mark(passed), self.catalog.mark([]), "FALL", 22))
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,142 @@
+import unittest
+from unittest import mock
+import pandas as pd
+import tempfile
+import shutil
+import os
+from integration import speculative_advisor
+from integration.catalog_watcher import LiveKnowledgeBase
+from integration.recommendation_cache import RecommendationCache, cache_key, main
+from integration.speculative_advisor import SpeculativeAdvisor, advise
+from tests.data.test_data import TEST_COURSES, TEST_POLICIES, TEST_STUDENT_PROFILES
+
+class TestRecommendationCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.courses = os.path.join(self.temp_dir, "courses.csv")
+        self.policies = os.path.join(self.temp_dir, "policies.csv")
+        pd.DataFrame(TEST_COURSES).to_csv(self.courses, index=False)
+        pd.DataFrame(TEST_POLICIES).to_csv(self.policies, index=False)
+        self.path = os.path.join(self.temp_dir, "recommendations.sqlite3")
+        self.kb = LiveKnowledgeBase(self.courses, self.policies)
+        self.cache = RecommendationCache(self.path)
+        self.profile = dict(TEST_STUDENT_PROFILES[1], passed_courses=["CSE014", "MAT111"])
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def edit_catalog(self):
+        edited = pd.DataFrame(TEST_COURSES)
+        edited.loc[0, "Credit Hours"] = 4
+        self.kb.courses_store.publish(edited)
+        self.kb.refresh()
+
+    def test_round_trip(self):
+        """Test stored advice comes back equal, for any order of the courses"""
+        advice = advise(self.kb, self.profile)
+        self.cache.put(self.kb.digests, self.profile, advice)
+        reordered = dict(self.profile, passed_courses=["MAT111 ", "CSE014"])
+        self.assertEqual(cache_key(self.kb.digests, reordered), cache_key(self.kb.digests, self.profile))
+        stored = self.cache.get(self.kb.digests, reordered)
+        self.assertEqual(stored.explanations, advice.explanations)
+        self.assertEqual(stored.recommended_courses, [dict(c) for c in advice.recommended_courses])
+        self.assertEqual((stored.total_credits, stored.credit_limit), (advice.total_credits, advice.credit_limit))
+        self.assertIsNone(self.cache.get(self.kb.digests, dict(self.profile, cgpa=1.5)))
+
+    def test_eviction(self):
+        """Test the least recently used entries are evicted beyond the bound"""
+        cache = RecommendationCache(self.path, max_entries=2)
+        advice = advise(self.kb, self.profile)
+        with mock.patch("integration.recommendation_cache.time.time", side_effect=range(100)):
+            for cgpa in (2.0, 2.5):
+                cache.put(self.kb.digests, dict(self.profile, cgpa=cgpa), advice)
+            cache.get(self.kb.digests, dict(self.profile, cgpa=2.0))
+            cache.put(self.kb.digests, dict(self.profile, cgpa=3.0), advice)
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get(self.kb.digests, dict(self.profile, cgpa=2.5)))
+        self.assertIsNotNone(cache.get(self.kb.digests, dict(self.profile, cgpa=2.0)))
+        cache.close()
+
+    def test_invalidated_by_content_change(self):
+        """Test a catalog edit drops old entries and returns their profiles"""
+        old = self.kb.digests
+        self.cache.put(old, self.profile, advise(self.kb, self.profile))
+        self.assertEqual(self.cache.invalidate(old), [])
+        self.edit_catalog()
+        self.assertNotEqual(self.kb.digests, old)
+        self.assertIsNone(self.cache.get(self.kb.digests, self.profile))
+        profiles = self.cache.invalidate(self.kb.digests)
+        self.assertEqual([p["passed_courses"] for p in profiles], [["CSE014", "MAT111"]])
+        self.assertEqual(len(self.cache), 0)
+        self.assertEqual(self.cache.warm(self.kb.digests, profiles, lambda p: advise(self.kb, p)), 1)
+        self.assertEqual(self.cache.get(self.kb.digests, self.profile).total_credits,
+                         advise(self.kb, self.profile).total_credits)
+
+    def test_revert_drops_newer_entries(self):
+        """Test reverting to earlier contents drops the entries of the later ones"""
+        old = self.kb.digests
+        self.cache.put(old, self.profile, advise(self.kb, self.profile))
+        self.edit_catalog()
+        new = self.kb.digests
+        self.assertEqual(len(self.cache.invalidate(new)), 1)
+        self.cache.put(new, dict(self.profile, cgpa=1.5), advise(self.kb, self.profile))
+        # The edit is undone: the catalog has its first contents again
+        self.kb.courses_store.publish(pd.DataFrame(TEST_COURSES))
+        self.kb.refresh()
+        self.assertEqual(self.kb.digests, old)
+        self.assertEqual([p["cgpa"] for p in self.cache.invalidate(old)], [1.5])
+        self.assertIsNone(self.cache.get(new, dict(self.profile, cgpa=1.5)))
+        self.assertEqual(len(self.cache), 0)
+
+    def test_advisor_survives_restart(self):
+        """Test a new advisor serves stored advice and re-advises after an edit"""
+        advisor = SpeculativeAdvisor(self.kb, store=self.cache)
+        expected = advisor.result("s1", self.profile)
+        advisor.shutdown()
+
+        restarted = SpeculativeAdvisor(self.kb, store=self.cache)
+        try:
+            with mock.patch.object(speculative_advisor, "advise") as run:
+                self.assertEqual(restarted.result("s1", self.profile).explanations, expected.explanations)
+            run.assert_not_called()
+            with mock.patch.object(restarted, "rewarm", wraps=restarted.rewarm) as rewarm:
+                self.edit_catalog()
+                rewarm.assert_called_once()
+            # The listener has re-advised the dropped profile on the warming thread
+            restarted._warm_executor.submit(lambda: None).result(5)
+            self.assertIsNotNone(self.cache.get(self.kb.digests, self.profile))
+        finally:
+            restarted.shutdown()
+
+    def test_edit_re_advises_only_affected_students(self):
+        """Test students who passed every edited course keep their stored advice"""
+        advisor = SpeculativeAdvisor(self.kb, store=self.cache)
+        newcomer = dict(self.profile, passed_courses=[])
+        try:
+            advisor.result("s1", self.profile)
+            advisor.result("s2", newcomer)
+            with mock.patch.object(speculative_advisor, "advise", wraps=speculative_advisor.advise) as run:
+                # MAT111, which only the first student has passed
+                self.edit_catalog()
+                advisor._warm_executor.submit(lambda: None).result(5)
+            self.assertEqual([call.args[1]["passed_courses"] for call in run.call_args_list], [[]])
+            self.assertEqual(len(self.cache), 2)
+            for profile in (self.profile, newcomer):
+                self.assertEqual(self.cache.get(self.kb.digests, profile).explanations,
+                                 advise(self.kb, profile).explanations)
+        finally:
+            advisor.shutdown()
+
+    def test_command_line_warm_up(self):
+        """Test the cohort warm-up script fills the cache"""
+        cohort = os.path.join(self.temp_dir, "cohort.csv")
+        pd.DataFrame([{"student_id": "1", "cgpa": 3.0, "semester": "FALL", "passed_courses": "MAT111",
+                       "failed_courses": ""}]).to_csv(cohort, index=False)
+        with mock.patch("builtins.print"):
+            main([cohort, "--courses", self.courses, "--policies", self.policies, "--cache", self.path])
+        profile = {"cgpa": 3.0, "semester": "FALL", "passed_courses": ["MAT111"], "failed_courses": []}
+        self.assertEqual(self.cache.get(self.kb.digests, profile).explanations, advise(self.kb, profile).explanations)
+
+if __name__ == '__main__':
+    unittest.main()
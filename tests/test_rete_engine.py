@@ -0,0 +1,106 @@
+import unittest
+import pandas as pd
+from integration.compiled_catalog import UnknownSemesterError
+from integration.rete_engine import ReteAdvisingEngine, benchmark
+from tests.data.test_data import TEST_COURSES, TEST_POLICIES, TEST_STUDENT_PROFILES
+from Inference_engine_KBS import AdvisingEngine, StudentProfile
+
+COURSES = TEST_COURSES + [
+    {"Course Code": "CSE016", "Course Name": "Programming Lab", "Description": "", "Prerequisites": "",
+     "Co-requisites": "CSE015", "Credit Hours": 1, "Semester Offered": "SPRING"},
+    {"Course Code": "MAT112", "Course Name": "Mathematics II", "Description": "", "Prerequisites": "MAT111",
+     "Co-requisites": "", "Credit Hours": 4, "Semester Offered": "BOTH"},
+    {"Course Code": "PHY101", "Course Name": "Physics", "Description": "", "Prerequisites": "",
+     "Co-requisites": "", "Credit Hours": 6, "Semester Offered": "SPRING"},
+]
+
+PROFILES = TEST_STUDENT_PROFILES + [
+    {"cgpa": 1.5, "semester": "SPRING", "passed_courses": ["MAT111"], "failed_courses": ["CSE015", "MAT112"]},
+    {"cgpa": 1.5, "semester": "FALL", "passed_courses": ["CSE014"], "failed_courses": ["CSE014", "MAT111"]},
+]
+
+def monolithic(profile, policies_df, courses=COURSES):
+    engine = AdvisingEngine(courses, profile, policies_df)
+    engine.reset()
+    engine.declare(StudentProfile(**profile))
+    engine.run()
+    return engine
+
+def result(engine):
+    return [c["Course Code"] for c in engine.recommended_courses], engine.explanations, engine.total_credits
+
+class TestReteEngine(unittest.TestCase):
+    def setUp(self):
+        self.policies_df = pd.DataFrame(TEST_POLICIES)
+
+    def test_matches_monolithic_rule(self):
+        """Test the fine-grained rules give the same advice and explanations"""
+        for profile in PROFILES:
+            engine = ReteAdvisingEngine(COURSES, profile, self.policies_df)
+            engine.reset()
+            engine.advise()
+            self.assertEqual(result(engine), result(monolithic(profile, self.policies_df)))
+            self.assertEqual(engine.credit_limit, monolithic(profile, self.policies_df).credit_limit)
+
+    def test_incremental_updates(self):
+        """Test updating a running session matches advising from scratch"""
+        engine = ReteAdvisingEngine(COURSES, PROFILES[2], self.policies_df)
+        engine.reset()
+        engine.advise()
+        engine.add_passed("CSE014")
+        engine.remove_failed("MAT112")
+        engine.advise()
+        expected = dict(PROFILES[2], passed_courses=["MAT111", "CSE014"], failed_courses=["CSE015"])
+        self.assertEqual(result(engine), result(monolithic(expected, self.policies_df)))
+        self.assertIn("CSE015", [c["Course Code"] for c in engine.recommended_courses])
+
+        engine.remove_passed("MAT111")
+        engine.set_cgpa(3.2)
+        engine.set_semester("FALL")
+        engine.advise()
+        expected = dict(expected, cgpa=3.2, semester="FALL", passed_courses=["CSE014"])
+        self.assertEqual(result(engine), result(monolithic(expected, self.policies_df)))
+
+    def test_update_only_touches_changed_courses(self):
+        """Test decisions before the first affected course are kept"""
+        engine = ReteAdvisingEngine(COURSES, PROFILES[1], self.policies_df)
+        engine.reset()
+        engine.advise()
+        kept = list(engine._log[:4])
+        engine.add_passed("PHY101")
+        engine.advise()
+        self.assertEqual(engine._log, kept)
+        expected = dict(PROFILES[1], passed_courses=["CSE014", "PHY101"])
+        self.assertEqual(result(engine), result(monolithic(expected, self.policies_df)))
+
+    def test_prerequisite_expressions(self):
+        """Test and/or prerequisites follow profile updates"""
+        courses = COURSES + [dict(COURSES[-1], **{"Course Code": "CSE020", "Prerequisites": "CSE015 or MAT112"})]
+        profile = dict(PROFILES[0], semester="SPRING", passed_courses=["CSE014"], failed_courses=[])
+        engine = ReteAdvisingEngine(courses, profile, self.policies_df)
+        engine.reset()
+        engine.advise()
+        self.assertIn("CSE020 is not recommended due to unmet prerequisite(s): CSE015 or MAT112.", engine.explanations)
+        engine.add_passed("MAT112")
+        engine.advise()
+        expected = dict(profile, passed_courses=["CSE014", "MAT112"])
+        self.assertEqual(result(engine), result(monolithic(expected, self.policies_df, courses)))
+        self.assertIn("CSE020", [c["Course Code"] for c in engine.recommended_courses])
+
+    def test_unknown_semester_is_rejected(self):
+        """Test a misspelled semester is an error, as in the monolithic rule"""
+        with self.assertRaises(UnknownSemesterError):
+            ReteAdvisingEngine(COURSES, dict(PROFILES[0], semester="FAL"), self.policies_df)
+        engine = ReteAdvisingEngine(COURSES, PROFILES[0], self.policies_df)
+        engine.reset()
+        with self.assertRaises(UnknownSemesterError):
+            engine.set_semester("WINTER")
+
+    def test_benchmark(self):
+        """Test the benchmark times both rule bases"""
+        timings = benchmark(COURSES, PROFILES[0], self.policies_df, ["MAT111"], repeat=1)
+        self.assertEqual(set(timings), {"monolithic: full run", "rete: full run",
+                                        "monolithic: per update", "rete: per update"})
+
+if __name__ == '__main__':
+    unittest.main()
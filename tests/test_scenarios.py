@@ -0,0 +1,54 @@
+import unittest
+import pandas as pd
+from integration.scenarios import apply_variation, evaluate_scenarios, side_by_side
+from tests.data.test_data import TEST_COURSES, TEST_POLICIES
+from Inference_engine_KBS import AdvisingEngine, StudentProfile
+
+BASE_PROFILE = {
+    "cgpa": 1.8,
+    "semester": "FALL",
+    "passed_courses": ["MAT111"],
+    "failed_courses": ["CSE014"]
+}
+
+VARIATIONS = [
+    {"cgpa": 3.2},
+    {"semester": "SPRING"},
+    {"also_passed": ["CSE014"]},
+    {"semester": "SPRING", "also_passed": ["CSE014"], "label": "Spring after retake"},
+]
+
+class TestScenarios(unittest.TestCase):
+    def test_apply_variation(self):
+        """Test variations override and extend the base profile"""
+        profile = apply_variation(BASE_PROFILE, {"also_passed": ["CSE014"], "cgpa": 3.0})
+        self.assertEqual(profile["passed_courses"], ["MAT111", "CSE014"])
+        self.assertEqual(profile["failed_courses"], [])
+        self.assertEqual(profile["cgpa"], 3.0)
+        self.assertEqual(BASE_PROFILE["failed_courses"], ["CSE014"])
+
+    def test_matches_separate_engine_runs(self):
+        """Test every scenario gives the same advice as its own engine run"""
+        policies_df = pd.DataFrame(TEST_POLICIES)
+        results = evaluate_scenarios(TEST_COURSES, BASE_PROFILE, VARIATIONS, policies_df)
+        self.assertEqual(len(results), len(VARIATIONS) + 1)
+        for result in results:
+            engine = AdvisingEngine(TEST_COURSES, result.profile, policies_df)
+            engine.reset()
+            engine.declare(StudentProfile(**result.profile))
+            engine.run()
+            self.assertEqual(result.recommended, tuple(c["Course Code"] for c in engine.recommended_courses))
+            self.assertEqual(result.explanations, engine.explanations)
+            self.assertEqual(result.credit_limit, engine.credit_limit)
+
+    def test_side_by_side(self):
+        """Test the comparison table has one column per scenario"""
+        results = evaluate_scenarios(TEST_COURSES, BASE_PROFILE, VARIATIONS, pd.DataFrame(TEST_POLICIES))
+        table = side_by_side(results)
+        self.assertEqual(list(table.columns), ["Base", "cgpa=3.2", "semester=SPRING", "passed CSE014", "Spring after retake"])
+        self.assertEqual(table.loc["CSE015", "Spring after retake"], "✓")
+        self.assertEqual(table.loc["CSE015", "Base"], "")
+        self.assertEqual(table.loc["Credit limit", "cgpa=3.2"], "22")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import unittest
+from unittest import mock
+import pandas as pd
+from integration.compiled_catalog import CompiledCatalog
+from integration.course_index import CourseIndex
+from integration.seat_allocator import CohortStudent, allocate_seats, cohort_eligibility, critical_path_values
+from tests.data.test_data import TEST_COURSES, TEST_POLICIES, TEST_STUDENT_PROFILES
+
+CREDITS = {"MAT111": 3, "CSE014": 3, "CSE015": 3, "PHY101": 4, "CSE016": 1}
+
+class TestSeatAllocator(unittest.TestCase):
+    def test_critical_path_values(self):
+        """Test a course's value is the length of the chain it unlocks"""
+        index = CourseIndex()
+        index.build(pd.DataFrame(TEST_COURSES))
+        self.assertEqual(critical_path_values(index), {"MAT111": 0, "CSE014": 1, "CSE015": 0})
+
+    def test_cohort_eligibility(self):
+        """Test eligible sets come from the advising rules without the credit cut-off"""
+        students = [dict(profile, student_id=i) for i, profile in enumerate(TEST_STUDENT_PROFILES)]
+        cohort = cohort_eligibility(TEST_COURSES, students, pd.DataFrame(TEST_POLICIES))
+        self.assertEqual(cohort[0].eligible, ("MAT111", "CSE014"))
+        self.assertEqual(cohort[0].credit_limit, 22)
+        self.assertEqual(cohort[1].eligible, ("CSE015",))
+
+    def test_cohort_catalog_is_compiled_once(self):
+        """Test the catalog is compiled once for the cohort, not per student"""
+        students = [dict(profile, student_id=i) for i, profile in enumerate(TEST_STUDENT_PROFILES)]
+        with mock.patch.object(CompiledCatalog, "from_records", wraps=CompiledCatalog.from_records) as compile_:
+            cohort_eligibility(TEST_COURSES, students * 3, pd.DataFrame(TEST_POLICIES))
+        self.assertEqual(compile_.call_count, 1)
+
+    def test_capacity_is_respected_and_shared(self):
+        """Test a full course is shared round-robin rather than first come first served"""
+        students = [CohortStudent(str(i), ("MAT111", "CSE014"), frozenset(), 22) for i in range(4)]
+        allocation = allocate_seats(students, CREDITS, {"MAT111": 2, "CSE014": 2})
+        placed = [code for courses in allocation.assignments.values() for code, _ in courses]
+        self.assertEqual(placed.count("MAT111"), 2)
+        self.assertEqual(placed.count("CSE014"), 2)
+        self.assertTrue(all(len(courses) == 1 for courses in allocation.assignments.values()))
+        self.assertEqual(allocation.seats_left, {"MAT111": 0, "CSE014": 0})
+
+    def test_failed_courses_first(self):
+        """Test a retake beats a first attempt for the last seat"""
+        students = [
+            CohortStudent("a", ("MAT111",), frozenset(), 22),
+            CohortStudent("b", ("MAT111",), frozenset({"MAT111"}), 22),
+        ]
+        allocation = allocate_seats(students, CREDITS, {"MAT111": 1})
+        self.assertEqual(allocation.assignments["b"], [("MAT111", 0)])
+        self.assertEqual(allocation.unassigned["a"], ["MAT111"])
+
+    def test_critical_path_priority(self):
+        """Test courses that unlock more are taken first within the credit limit"""
+        students = [CohortStudent("a", ("MAT111", "CSE014"), frozenset(), 3)]
+        allocation = allocate_seats(students, CREDITS, {}, {"CSE014": 1})
+        self.assertEqual(allocation.assignments["a"], [("CSE014", 0)])
+        self.assertEqual(allocation.unassigned["a"], ["MAT111"])
+
+    def test_credit_limit(self):
+        """Test no student exceeds their credit limit"""
+        students = [CohortStudent("a", ("MAT111", "CSE014", "PHY101"), frozenset(), 7)]
+        allocation = allocate_seats(students, CREDITS, {})
+        total = sum(CREDITS[code] for code, _ in allocation.assignments["a"])
+        self.assertLessEqual(total, 7)
+        self.assertEqual(len(allocation.assignments["a"]), 2)
+
+    def test_corequisites_are_placed_together(self):
+        """Test a course is only placed with its eligible co-requisites"""
+        corequisites = {"CSE016": ["CSE015"]}
+        students = [CohortStudent(str(i), ("CSE015", "CSE016"), frozenset(), 22) for i in range(2)]
+        allocation = allocate_seats(students, CREDITS, {"CSE015": 1}, {"CSE016": 2}, corequisites)
+        placed = sorted(sorted(code for code, _ in courses) for courses in allocation.assignments.values())
+        self.assertEqual(placed, [[], ["CSE015", "CSE016"]])
+        self.assertIn(["CSE016", "CSE015"], list(allocation.unassigned.values()))
+
+        # Both do not fit the credit limit: the co-requisite alone does
+        students = [CohortStudent("a", ("CSE015", "CSE016"), frozenset(), 3)]
+        allocation = allocate_seats(students, CREDITS, {}, {"CSE016": 2}, corequisites)
+        self.assertEqual(allocation.assignments["a"], [("CSE015", 0)])
+        self.assertEqual(allocation.unassigned["a"], ["CSE016"])
+
+    def test_sections_are_balanced(self):
+        """Test students are spread over the sections of a course"""
+        students = [CohortStudent(str(i), ("MAT111",), frozenset(), 22) for i in range(4)]
+        allocation = allocate_seats(students, CREDITS, {"MAT111": [2, 2]})
+        sections = sorted(courses[0][1] for courses in allocation.assignments.values())
+        self.assertEqual(sections, [0, 0, 1, 1])
+
+if __name__ == '__main__':
+    unittest.main()
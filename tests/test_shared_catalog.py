@@ -0,0 +1,81 @@
+import unittest
+import pandas as pd
+import subprocess
+import tempfile
+import shutil
+import sys
+import os
+from integration.catalog_store import CatalogStore
+from integration.compiled_catalog import CompiledCatalog
+from integration.shared_catalog import SharedCatalog, catalog_path, get_shared_catalog, read_header
+from tests.data.test_data import TEST_COURSES
+from Inference_engine_KBS import select_courses
+
+class TestSharedCatalog(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "courses.csv")
+        pd.DataFrame(TEST_COURSES).to_csv(self.path, index=False)
+        self.store = CatalogStore(self.path)
+
+    def test_round_trip(self):
+        """Test the mapped catalog equals a locally compiled one"""
+        shared = get_shared_catalog(self.store)
+        local = CompiledCatalog.from_records(TEST_COURSES)
+        self.assertEqual(shared.codes, local.codes)
+        self.assertEqual(shared.names, local.names)
+        self.assertEqual(shared.offered, local.offered)
+        for column in ("course_code_ids", "credits", "semesters", "prereq_indptr", "prereq_indices"):
+            self.assertEqual(shared.column(column).tolist(), local.column(column).tolist())
+        self.assertEqual(shared.description(2), "OOP concepts")
+        self.assertEqual(shared.course(2)["Prerequisites"], "CSE014")
+        passed = shared.mark(["CSE014"])
+        self.assertEqual(select_courses(shared, passed, shared.mark([]), "SPRING", 12),
+                         select_courses(local, local.mark(["CSE014"]), local.mark([]), "SPRING", 12))
+
+    def test_version_header(self):
+        """Test the image is reused per version and replaced on updates"""
+        first = get_shared_catalog(self.store)
+        self.assertIs(get_shared_catalog(self.store), first)
+        attached = SharedCatalog(catalog_path(self.store))
+        self.assertEqual(read_header(attached.path), (attached.version, attached.digest))
+        self.assertFalse(attached.is_stale())
+
+        df = self.store.current().to_frame()
+        df.loc[0, "Credit Hours"] = 4
+        self.store.publish(df)
+        second = get_shared_catalog(self.store)
+        self.assertTrue(attached.is_stale())
+        self.assertEqual(second.credits[0], 4)
+        # Catalogs already handed out keep their own mapping
+        self.assertEqual(first.credits[0], 3)
+        self.assertEqual(attached.catalog.credits[0], 3)
+
+    @unittest.skipUnless(os.name == "posix", "POSIX file permissions")
+    def test_image_is_readable_by_other_users(self):
+        """Test the image is not left with the private mode of a temporary file"""
+        get_shared_catalog(self.store)
+        self.assertEqual(os.stat(catalog_path(self.store)).st_mode & 0o777, 0o644)
+        os.chmod(catalog_path(self.store), 0o664)
+        self.store.publish(self.store.current().to_frame())
+        get_shared_catalog(self.store)
+        self.assertEqual(os.stat(catalog_path(self.store)).st_mode & 0o777, 0o664)
+
+    def test_other_process_attaches(self):
+        """Test a second process maps the published image instead of rebuilding it"""
+        get_shared_catalog(self.store)
+        mtime = os.stat(catalog_path(self.store)).st_mtime_ns
+        src = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+        script = ("import sys; from integration.catalog_store import CatalogStore; "
+                  "from integration.shared_catalog import get_shared_catalog; "
+                  "c = get_shared_catalog(CatalogStore(sys.argv[1])); print(type(c.credits).__name__, c.code(2))")
+        output = subprocess.run([sys.executable, "-c", script, self.path], capture_output=True, text=True,
+                                env=dict(os.environ, PYTHONPATH=src), check=True).stdout.split()
+        self.assertEqual(output, ["memoryview", "CSE015"])
+        self.assertEqual(os.stat(catalog_path(self.store)).st_mtime_ns, mtime)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    unittest.main()
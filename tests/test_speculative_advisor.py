@@ -0,0 +1,133 @@
+import unittest
+from unittest import mock
+import pandas as pd
+import tempfile
+import shutil
+import time
+import os
+from integration import speculative_advisor
+from integration.catalog_watcher import LiveKnowledgeBase, forget_knowledge_base, get_knowledge_base
+from integration.speculative_advisor import SpeculativeAdvisor, advise, get_speculative_advisor
+from tests.data.test_data import TEST_COURSES, TEST_POLICIES, TEST_STUDENT_PROFILES
+
+class TestSpeculativeAdvisor(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.courses = courses = os.path.join(self.temp_dir, "courses.csv")
+        self.policies = policies = os.path.join(self.temp_dir, "policies.csv")
+        pd.DataFrame(TEST_COURSES).to_csv(courses, index=False)
+        pd.DataFrame(TEST_POLICIES).to_csv(policies, index=False)
+        self.kb = LiveKnowledgeBase(courses, policies)
+        self.advisor = SpeculativeAdvisor(self.kb, settle=0.05)
+        self.profile = dict(TEST_STUDENT_PROFILES[1], passed_courses=["CSE014", "MAT111"])
+
+    def tearDown(self):
+        self.advisor.shutdown()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def wait(self, session):
+        job = self.advisor._jobs.get(session)
+        if job is not None:
+            job.done.wait(5)
+
+    def test_result_is_served_from_the_speculation(self):
+        """Test advice computed in the background is returned without rerunning"""
+        self.advisor.speculate("s1", self.profile)
+        self.wait("s1")
+        self.assertIsNotNone(self.advisor.cached(self.profile))
+        with mock.patch.object(speculative_advisor, "advise") as run:
+            result = self.advisor.result("s1", dict(self.profile, passed_courses=list(reversed(self.profile["passed_courses"]))))
+        run.assert_not_called()
+        expected = advise(self.kb, self.profile)
+        self.assertEqual(result.explanations, expected.explanations)
+        self.assertEqual(result.total_credits, expected.total_credits)
+
+    def test_changed_inputs_cancel_the_stale_job(self):
+        """Test a newer input of the same session cancels the pending one"""
+        advisor = SpeculativeAdvisor(self.kb, settle=5.0)
+        try:
+            advisor.speculate("s1", self.profile)
+            stale = advisor._jobs["s1"]
+            changed = dict(self.profile, cgpa=1.5)
+            advisor.speculate("s1", changed)
+            self.assertTrue(stale.cancelled)
+            self.assertTrue(stale.done.is_set())
+            self.assertIsNone(stale.future)
+            # Submitting does not wait for the settle delay
+            started = time.perf_counter()
+            self.assertEqual(advisor.result("s1", changed).credit_limit, 12)
+            self.assertLess(time.perf_counter() - started, 2.0)
+            self.assertIsNone(advisor.cached(self.profile))
+        finally:
+            advisor.shutdown()
+
+    def test_click_does_not_queue_behind_other_sessions(self):
+        """Test a job still waiting for a worker is advised inline on submit"""
+        real_advise = speculative_advisor.advise
+
+        def slow(knowledge_base, student_input):
+            if student_input["cgpa"] == 1.0:
+                time.sleep(1.0)
+            return real_advise(knowledge_base, student_input)
+
+        advisor = SpeculativeAdvisor(self.kb, max_workers=1, settle=0.0)
+        try:
+            with mock.patch.object(speculative_advisor, "advise", side_effect=slow):
+                advisor.speculate("busy", dict(self.profile, cgpa=1.0))
+                deadline = time.perf_counter() + 5
+                while not advisor._jobs["busy"].running and time.perf_counter() < deadline:
+                    time.sleep(0.01)
+                advisor.speculate("s1", self.profile)
+                started = time.perf_counter()
+                result = advisor.result("s1", self.profile)
+                self.assertLess(time.perf_counter() - started, 0.5)
+            self.assertEqual(result.explanations, advise(self.kb, self.profile).explanations)
+        finally:
+            advisor.shutdown()
+
+    def test_result_without_speculation(self):
+        """Test advice is computed on the spot when nothing was speculated"""
+        result = self.advisor.result("s2", self.profile)
+        self.assertEqual(result.explanations, advise(self.kb, self.profile).explanations)
+        self.assertIs(self.advisor.cached(self.profile), result)
+
+    def test_cache_is_keyed_by_catalog_version(self):
+        """Test a new catalog version does not reuse advice of the old one"""
+        self.advisor.result("s1", self.profile)
+        edited = pd.DataFrame(TEST_COURSES)
+        edited.loc[0, "Credit Hours"] = 4
+        self.kb.courses_store.publish(edited)
+        self.kb.refresh()
+        self.assertIsNone(self.advisor.cached(self.profile))
+        self.assertEqual(self.advisor.result("s1", self.profile).total_credits,
+                         advise(self.kb, self.profile).total_credits)
+
+    def test_advisor_goes_with_its_knowledge_base(self):
+        """Test forgetting a knowledge base shuts its process-wide advisor down"""
+        with mock.patch.dict(os.environ, {"KBS_RECOMMENDATION_CACHE": ""}):
+            kb = get_knowledge_base(self.courses, self.policies)
+            advisor = get_speculative_advisor(kb)
+            self.assertIs(get_speculative_advisor(kb), advisor)
+            forget_knowledge_base(self.courses, self.policies)
+            advisor._scheduler.join(5)
+            self.assertFalse(advisor._scheduler.is_alive())
+            # A new knowledge base of the same files gets an advisor of its own
+            kb = get_knowledge_base(self.courses, self.policies)
+            try:
+                self.assertIs(get_speculative_advisor(kb).knowledge_base, kb)
+            finally:
+                forget_knowledge_base(self.courses, self.policies)
+
+    def test_cache_is_bounded(self):
+        """Test the least recently used advice is evicted"""
+        advisor = SpeculativeAdvisor(self.kb, cache_size=2)
+        try:
+            for cgpa in (2.0, 2.5, 3.0):
+                advisor.result("s1", dict(self.profile, cgpa=cgpa))
+            self.assertIsNone(advisor.cached(dict(self.profile, cgpa=2.0)))
+            self.assertIsNotNone(advisor.cached(dict(self.profile, cgpa=3.0)))
+        finally:
+            advisor.shutdown()
+
+if __name__ == '__main__':
+    unittest.main()
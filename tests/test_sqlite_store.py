@@ -0,0 +1,103 @@
+import unittest
+from unittest import mock
+import pandas as pd
+import tempfile
+import shutil
+import os
+import time
+from integration.catalog_store import CatalogConflictError, get_store
+from integration.catalog_watcher import CatalogWatcher, LiveKnowledgeBase
+from integration.sqlite_store import SqliteCatalogStore, migrate_from_csv
+from tests.data.test_data import TEST_COURSES, TEST_POLICIES
+
+class TestSqliteStore(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.courses_csv = os.path.join(self.temp_dir, "courses.csv")
+        self.policies_csv = os.path.join(self.temp_dir, "policies.csv")
+        self.database = os.path.join(self.temp_dir, "kbs.sqlite3")
+        pd.DataFrame(TEST_COURSES).to_csv(self.courses_csv, index=False)
+        pd.DataFrame(TEST_POLICIES).to_csv(self.policies_csv, index=False)
+        self.counts = migrate_from_csv(self.courses_csv, self.policies_csv, self.database)
+        self.courses = SqliteCatalogStore(self.database, "courses")
+
+    def test_migration(self):
+        """Test the CSV knowledge base round-trips through SQLite"""
+        self.assertEqual(self.counts, {"courses": 3, "requisites": 1, "policies": 3})
+        df = self.courses.current().df
+        expected = pd.DataFrame(TEST_COURSES)
+        self.assertEqual(df["Course Code"].tolist(), expected["Course Code"].tolist())
+        self.assertEqual(df["Prerequisites"].tolist(), expected["Prerequisites"].tolist())
+        self.assertEqual(df["Credit Hours"].tolist(), expected["Credit Hours"].tolist())
+        policies = SqliteCatalogStore(self.database, "policies").current().df
+        self.assertEqual(policies["Condition"].tolist(), [p["Condition"] for p in TEST_POLICIES])
+
+    def test_indexed_lookups(self):
+        """Test lookups by code, semester and prerequisite"""
+        self.assertEqual(self.courses.get_course("CSE015")["Prerequisites"], "CSE014")
+        self.assertIsNone(self.courses.get_course("XXX000"))
+        self.assertEqual(self.courses.courses_offered("fall"), ["MAT111", "CSE014"])
+        self.assertEqual(self.courses.dependents("CSE014"), ["CSE015"])
+
+    def test_prerequisite_expression_round_trip(self):
+        """Test and/or prerequisites are stored as written and still indexed"""
+        df = self.courses.current().df
+        df.loc[2, "Prerequisites"] = "CSE014 OR MAT111"
+        self.courses.publish(df)
+        self.assertEqual(self.courses.current().df.loc[2, "Prerequisites"], "CSE014 OR MAT111")
+        self.assertEqual(self.courses.get_course("CSE015")["Prerequisites"], "CSE014 OR MAT111")
+        self.assertEqual(self.courses.dependents("MAT111"), ["CSE015"])
+
+    def test_publish_is_transactional_and_versioned(self):
+        """Test edits bump the version and stale writers are rejected"""
+        snapshot = self.courses.current()
+        df = snapshot.to_frame()
+        df.loc[df["Course Code"] == "CSE015", "Prerequisites"] = "CSE014, MAT111"
+        df = df[df["Course Code"] != "MAT111"]
+        published = self.courses.publish(df, expected_version=snapshot.version)
+        self.assertEqual(published.version, snapshot.version + 1)
+        self.assertEqual(published.df["Course Code"].tolist(), ["CSE014", "CSE015"])
+        self.assertEqual(self.courses.dependents("MAT111"), ["CSE015"])
+        with self.assertRaises(CatalogConflictError):
+            self.courses.publish(snapshot.to_frame(), expected_version=snapshot.version)
+        # The failed write left the table untouched
+        self.assertEqual(len(SqliteCatalogStore(self.database, "courses").current().df), 2)
+
+    def test_backend_is_selected_by_configuration(self):
+        """Test KBS_STORAGE=sqlite routes get_store to the database"""
+        with mock.patch.dict(os.environ, {"KBS_STORAGE": "sqlite", "KBS_DATABASE": self.database}):
+            store = get_store("data/courses.csv")
+            self.assertIsInstance(store, SqliteCatalogStore)
+            self.assertEqual(store.table, "courses")
+        self.assertNotIsInstance(get_store(self.courses_csv), SqliteCatalogStore)
+
+    def test_watcher_sees_commits_of_an_open_connection(self):
+        """Test hot reload while the editor keeps its connection (and the WAL) open"""
+        for use_inotify in (True, False):
+            with self.subTest(inotify=use_inotify), \
+                    mock.patch.dict(os.environ, {"KBS_STORAGE": "sqlite", "KBS_DATABASE": self.database}):
+                kb = LiveKnowledgeBase()
+                paths = kb.courses_store.watch_paths + kb.policies_store.watch_paths
+                watcher = CatalogWatcher(paths, kb.refresh, interval=0.05, use_inotify=use_inotify)
+                watcher.start()
+                try:
+                    time.sleep(0.2)
+                    before = kb.version
+                    # The writer's connection stays open: a WAL commit closes no file
+                    writer = SqliteCatalogStore(self.database, "courses")
+                    df = writer.current().to_frame()
+                    df.loc[df["Course Code"] == "MAT111", "Course Name"] = f"Calculus {use_inotify}"
+                    writer.publish(df)
+                    deadline = time.monotonic() + 3
+                    while kb.version == before and time.monotonic() < deadline:
+                        time.sleep(0.02)
+                    self.assertEqual(kb.version, before + 1)
+                finally:
+                    watcher.stop()
+                    watcher.join()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    unittest.main()
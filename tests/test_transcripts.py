@@ -0,0 +1,100 @@
+import unittest
+import pandas as pd
+import tempfile
+import shutil
+import os
+from io import StringIO
+from contextlib import redirect_stdout
+from integration.compiled_catalog import CompiledCatalog
+from integration.demand_forecast import load_cohort
+from integration.transcripts import (IngestReport, TranscriptOrderError, ingest_transcripts, main, retake_rules,
+                                     term_key)
+from tests.data.test_data import TEST_COURSES, TEST_POLICIES
+
+RETAKE_POLICY = {"Category": "Retaking Failed Courses", "Condition": "Grade = F", "max": "B+",
+                 "Policy Description": "Retaking a failed course is mandatory"}
+
+EXPORT = """student_id,course_code,term,grade,credits
+S1,cse 014,Fall 2022,F,3
+S1,MAT111,Fall 2022,A,3
+S1,CSE-014,Spring 2023,A,3
+S1,XYZ900,Spring 2023,B,3
+S2,MAT111,Fall 2023,W,3
+S2,MAT111,Spring 2024,F,
+S3,CSE015,Spring 2024,B,3
+S3,MAT111,Fall 2023,C,3
+S3,MAT111,Fall 2022,F,3
+"""
+
+class TestTranscripts(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.catalog = CompiledCatalog.from_records(TEST_COURSES)
+        self.policies_df = pd.DataFrame(TEST_POLICIES + [RETAKE_POLICY])
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def ingest(self, text=EXPORT, **kwargs):
+        profiles = ingest_transcripts(StringIO(text), self.catalog, self.policies_df, "fall", **kwargs)
+        return {profile["student_id"]: profile for profile in profiles}
+
+    def test_retake_rules(self):
+        """Test failing grades and the retake cap are read from the policies"""
+        rules = retake_rules(self.policies_df)
+        self.assertEqual(rules.failing, {"F"})
+        self.assertEqual(rules.cap, 3.3)
+        self.assertIsNone(retake_rules(pd.DataFrame(TEST_POLICIES)).cap)
+        self.assertLess(term_key("Fall 2022"), term_key("2023-SPRING"))
+        self.assertLess(term_key("Spring 2023"), term_key("Summer 2023"))
+
+    def test_latest_attempt_wins(self):
+        """Test passed and failed courses, normalized codes and the capped CGPA"""
+        report = IngestReport()
+        profiles = self.ingest(report=report)
+        self.assertEqual(profiles["S1"]["passed_courses"], ["CSE014", "MAT111", "XYZ900"])
+        self.assertEqual(profiles["S1"]["failed_courses"], [])
+        # The retaken CSE014 counts as B+: (3.3 + 4.0 + 3.0) / 3
+        self.assertEqual(profiles["S1"]["cgpa"], 3.43)
+        self.assertEqual(profiles["S1"]["semester"], "FALL")
+        # The withdrawal is not an attempt; missing credits come from the catalog
+        self.assertEqual(profiles["S2"]["failed_courses"], ["MAT111"])
+        self.assertEqual(profiles["S2"]["cgpa"], 0.0)
+        # Attempts are ordered by term, not by row
+        self.assertEqual(profiles["S3"]["passed_courses"], ["CSE015", "MAT111"])
+        self.assertEqual(profiles["S3"]["cgpa"], 2.5)
+        self.assertEqual((report.rows, report.students), (9, 3))
+        self.assertEqual(report.unknown_courses, {"XYZ900"})
+
+    def test_chunks_and_order(self):
+        """Test chunk boundaries do not change the result and ungrouped exports are detected"""
+        self.assertEqual(self.ingest(chunk_size=2), self.ingest())
+        lines = EXPORT.splitlines()
+        shuffled = "\n".join(lines[:1] + lines[5:] + lines[1:5]) + "\n" + "S2,CSE014,Fall 2023,A,3\n"
+        with self.assertRaises(TranscriptOrderError):
+            self.ingest(shuffled)
+        profiles = self.ingest(shuffled, grouped=False, chunk_size=3)
+        self.assertEqual(profiles["S1"], self.ingest()["S1"])
+        self.assertEqual(profiles["S2"]["passed_courses"], ["CSE014"])
+
+    def test_cli_writes_cohort(self):
+        """Test the command line writes a cohort file the other tools read"""
+        export = os.path.join(self.temp_dir, "export.csv")
+        courses = os.path.join(self.temp_dir, "courses.csv")
+        policies = os.path.join(self.temp_dir, "policies.csv")
+        output = os.path.join(self.temp_dir, "cohort.csv")
+        with open(export, "w") as fh:
+            fh.write(EXPORT)
+        pd.DataFrame(TEST_COURSES).to_csv(courses, index=False)
+        self.policies_df.to_csv(policies, index=False)
+        with redirect_stdout(StringIO()) as out:
+            main([export, "--semester", "SPRING", "--courses", courses, "--policies", policies,
+                  "--output", output, "--chunk-size", "4"])
+        self.assertIn("3 profiles from 9 rows", out.getvalue())
+        cohort = load_cohort(output)
+        self.assertEqual([s["student_id"] for s in cohort], ["S1", "S2", "S3"])
+        self.assertEqual(cohort[1]["failed_courses"], ["MAT111"])
+        self.assertEqual(cohort[0]["semester"], "SPRING")
+
+if __name__ == '__main__':
+    unittest.main()
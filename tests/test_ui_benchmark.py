@@ -0,0 +1,37 @@
+import unittest
+import os
+from integration.compiled_catalog import CompiledCatalog
+from integration.ui_benchmark import run_benchmark, synthetic_catalog
+
+POLICIES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "policies.csv")
+
+class TestUIBenchmark(unittest.TestCase):
+    def test_synthetic_catalog(self):
+        """Test generated catalogs only refer to courses listed before"""
+        df = synthetic_catalog(300)
+        self.assertEqual(len(df), 300)
+        self.assertTrue(df["Course Code"].is_unique)
+        seen = set()
+        for course in df.to_dict(orient="records"):
+            for column in ("Prerequisites", "Co-requisites"):
+                self.assertTrue({c.strip() for c in course[column].split(",") if c.strip()} <= seen)
+            seen.add(course["Course Code"])
+        self.assertEqual(len(CompiledCatalog.from_records(df.to_dict(orient="records"))), 300)
+        self.assertTrue(synthetic_catalog(50).equals(synthetic_catalog(50)))
+
+    def test_scripted_reruns(self):
+        """Test both pages are scripted end to end and reruns parse no CSV files"""
+        cwd = os.getcwd()
+        report = run_benchmark([40], POLICIES, passed=3, repeat=1)
+        self.assertEqual(os.getcwd(), cwd)
+        steps = report.set_index(["Page", "Step"])
+        self.assertEqual(steps.loc[("advisor", "select passed course"), "Reruns"], 6)
+        self.assertEqual(steps.loc[("editor", "find course"), "Reruns"], 4)
+        self.assertTrue((report["Mean (ms)"] > 0).all())
+        self.assertTrue((report["Peak memory (KiB)"] > 0).all())
+        # Only loading the page and publishing an edit parse the catalog
+        steady = report[~report["Step"].isin(["load", "add course", "edit course", "delete course"])]
+        self.assertEqual(steady["CSV parses"].sum(), 0)
+
+if __name__ == '__main__':
+    unittest.main()